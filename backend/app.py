@@ -1,10 +1,15 @@
 
-from flask import Flask, request, jsonify
+import time
+APP_IMPORT_STARTED = time.perf_counter() # Startup cost is reported by /api/health
+
+from flask import Flask, request, jsonify, g, Response
 from flask_cors import CORS
-import joblib
-import pandas as pd
+import numpy as np
 import os
 import sys
+import threading
+import json
+from datetime import datetime, timezone
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -13,8 +18,18 @@ api_key = os.getenv("OPENWEATHER_API_KEY")
 
 # Add services to path
 sys.path.append(os.path.join(os.path.dirname(__file__), 'services'))
+from process_stats import StartupTimer, memory_stats
+from metrics import registry, REQUEST_SECONDS, STAGE_SECONDS
+from profiler import SamplingProfiler, ProfileStore
 from weather_service import WeatherService
+from weather_prefetcher import WeatherPrefetcher
 from recommendation_engine import RecommendationEngine
+from model_registry import ModelManager, ModelRegistry
+from heat_features import heat_index
+from risk_scoring import FEATURE_COLUMNS, build_feature_row, score_probabilities, score_indices, risk_percentage
+from risk_map import GridTooLarge, parse_risk_map, header as risk_map_header, encode_binary, encode_json, binary_header_line
+from cache import TTLCache
+from audit_log import AuditLog
 
 app = Flask(__name__)
 CORS(app, resources={r"/*": {"origins": "*"}}) # Explicitly allow all origins
@@ -23,14 +38,182 @@ CORS(app, resources={r"/*": {"origins": "*"}}) # Explicitly allow all origins
 weather_service = WeatherService(api_key=api_key)
 recommendation_engine = RecommendationEngine()
 
+# Background prefetch of registered crew locations into a snapshot shared by all workers.
+# The scheduler thread is started per worker process (gunicorn.conf.py post_worker_init,
+# or the first request), never in the preloading master.
+weather_prefetcher = None
+if os.getenv("WEATHER_PREFETCH_LOCATIONS"):
+    weather_prefetcher = WeatherPrefetcher(weather_service)
+    weather_service.snapshot = weather_prefetcher.snapshot
+    app.extensions["weather_prefetcher"] = weather_prefetcher
+    print(f"Weather prefetch enabled for {len(weather_prefetcher.locations)} locations")
+
+# Observability: per-stage histograms at /metrics, and an opt-in per-request sampling
+# profiler (send "X-Profile: 1" when PROFILING_ENABLED=true, fetch /debug/profile/<id>).
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+profile_store = ProfileStore()
+registry.gauge_callback(
+    "heatshield_weather_cache_lookups_total", "Weather cache lookups by outcome.",
+    lambda: {(("outcome", k),): v for k, v in weather_service.cache_stats().items() if k in ("hits", "misses", "coalesced")},
+    metric_type="counter")
+registry.gauge_callback(
+    "heatshield_weather_cache_entries", "Entries currently held in the weather cache.",
+    lambda: weather_service.cache_stats()["size"])
+
+@app.before_request
+def start_request_timer():
+    model_manager.ensure_running()
+    if weather_prefetcher is not None:
+        weather_prefetcher.ensure_running()
+    if registry.enabled:
+        g.request_started = time.perf_counter()
+    if PROFILING_ENABLED and request.headers.get("X-Profile") == "1":
+        g.profiler = SamplingProfiler(threading.get_ident()).start()
+
+@app.after_request
+def record_request(response):
+    started = g.get("request_started")
+    if started is not None:
+        REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=request.url_rule.rule if request.url_rule else "unmatched",
+                                method=request.method, status=response.status_code)
+    profiler = g.pop("profiler", None)
+    if profiler is not None:
+        profiler.stop()
+        profile_id = profile_store.add(profiler, request.path)
+        response.headers["X-Profile-Id"] = profile_id
+        print(f"Profile {profile_id} for {request.path}: {profiler.summary(top=5)}")
+    return response
+
 # Load Model
-MODEL_PATH = os.path.join(os.path.dirname(__file__), 'ml_engine', 'model.pkl')
-try:
-    model = joblib.load(MODEL_PATH)
-    print("ML Model loaded successfully.")
-except Exception as e:
-    print(f"Error loading model: {e}")
-    model = None
+# Served through a ModelManager: the registry's CURRENT version (ml_engine/registry) if one
+# was published, else the artifacts in ml_engine/. Prefers the compiled array-backed model
+# (memory-mapped .npy buffers, no pandas/sklearn on the hot path) over the sklearn Pipeline.
+# Run gunicorn with preload_app (see gunicorn.conf.py) so this happens once in the master
+# and every forked worker shares the loaded pages. Each worker then watches the registry
+# and hot-swaps newly published versions without a restart.
+MODEL_DIR = os.path.join(os.path.dirname(__file__), 'ml_engine')
+MODEL_REGISTRY_DIR = os.getenv("MODEL_REGISTRY_DIR", os.path.join(MODEL_DIR, 'registry'))
+MODEL_RELOAD_INTERVAL = float(os.getenv("MODEL_RELOAD_INTERVAL", "30"))
+USE_COMPILED_MODEL = os.getenv("USE_COMPILED_MODEL", "true").lower() == "true"
+
+# Optional lookup-table serving mode: O(1) interpolated predictions from a precomputed,
+# memory-mapped table (built by ml_engine/build_risk_table.py). Only enabled if the
+# table's measured error against the live model is within bounds; otherwise the live model serves.
+USE_RISK_TABLE = os.getenv("USE_RISK_TABLE", "false").lower() == "true"
+RISK_TABLE_MIN_AGREEMENT = float(os.getenv("RISK_TABLE_MIN_AGREEMENT", "0.98"))
+RISK_TABLE_MAX_MEAN_ERROR = float(os.getenv("RISK_TABLE_MAX_MEAN_ERROR", "0.02"))
+RISK_TABLE_MAX_P99_ERROR = float(os.getenv("RISK_TABLE_MAX_P99_ERROR", "0.1"))
+RISK_TABLE_MAX_ABS_ERROR = float(os.getenv("RISK_TABLE_MAX_ABS_ERROR", "0.3"))
+
+# Scored once before a reloaded model takes traffic
+WARMUP_COLUMNS = {'temperature': [35.0], 'humidity': [50.0], 'exposure_hours': [4],
+                  'activity_level': ['moderate'], 'hydration_level': ['moderate'], 'age_group': ['26-35']}
+
+startup = StartupTimer()
+with startup.measure("model_load"):
+    model_manager = ModelManager(
+        ModelRegistry(MODEL_REGISTRY_DIR), MODEL_DIR, FEATURE_COLUMNS, WARMUP_COLUMNS,
+        interval=MODEL_RELOAD_INTERVAL,
+        load_options={
+            "use_compiled": USE_COMPILED_MODEL,
+            "use_risk_table": USE_RISK_TABLE,
+            "min_agreement": RISK_TABLE_MIN_AGREEMENT,
+            "max_mean_error": RISK_TABLE_MAX_MEAN_ERROR,
+            "max_p99_error": RISK_TABLE_MAX_P99_ERROR,
+            "max_abs_error": RISK_TABLE_MAX_ABS_ERROR
+        },
+        # Shadow mode: score a sample of traffic with another registry version, off the request path
+        shadow_version=os.getenv("MODEL_SHADOW_VERSION"),
+        shadow_sample=float(os.getenv("MODEL_SHADOW_SAMPLE", "0.05"))
+    )
+app.extensions["model_manager"] = model_manager
+
+startup.phases["app_import"] = round((time.perf_counter() - APP_IMPORT_STARTED) * 1000, 2)
+
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "500"))
+
+# Memoized /api/predict results, keyed on the model version, the weather quantized to
+# PREDICTION_CACHE_TEMP_STEP / _HUMIDITY_STEP, the inputs the model and rules look at and the
+# outcome of every rule threshold on the raw weather. The model scores the quantized weather
+# and the rules only see thresholds that are part of the key, so every request with the same
+# key gets the same answer, whichever request filled the entry. /api/predict can therefore
+# differ from the batch paths (which score the raw reading) by up to half a step of weather.
+# Only risk and recommendations are cached; factors and metadata are rebuilt per request.
+# Entries live as long as a weather reading (WEATHER_CACHE_TTL) unless set otherwise.
+PREDICTION_CACHE_ENABLED = os.getenv("PREDICTION_CACHE_ENABLED", "true").lower() == "true"
+PREDICTION_CACHE_TEMP_STEP = float(os.getenv("PREDICTION_CACHE_TEMP_STEP", "0.1"))
+PREDICTION_CACHE_HUMIDITY_STEP = float(os.getenv("PREDICTION_CACHE_HUMIDITY_STEP", "1"))
+prediction_cache = None
+if PREDICTION_CACHE_ENABLED:
+    prediction_cache = TTLCache(
+        maxsize=int(os.getenv("PREDICTION_CACHE_SIZE", "4096")),
+        ttl=float(os.getenv("PREDICTION_CACHE_TTL", weather_service.cache.ttl))
+    )
+    registry.gauge_callback(
+        "heatshield_prediction_cache_lookups_total", "Prediction cache lookups by outcome.",
+        lambda: {(("outcome", k),): v for k, v in prediction_cache.stats().items() if k in ("hits", "misses", "coalesced")},
+        metric_type="counter")
+
+# Shift timelines: exposure hours beyond the training range (1-12) are not scored
+MAX_SHIFT_HOURS = 12
+MAX_SEARCH_HOURS = 24
+
+# Risk map: cells per request, profiles per request, cells per model call (the unit of streaming)
+# and upstream weather fetches per request. The default resolution is the weather grid cell, so
+# a map cell reads its own grid cell when that is cached; at most RISK_MAP_MAX_FETCHES cold cells
+# are fetched and the rest borrow the nearest resolved cell's reading (see get_weather_many).
+RISK_MAP_MAX_CELLS = int(os.getenv("RISK_MAP_MAX_CELLS", "4096"))
+RISK_MAP_MAX_FETCHES = int(os.getenv("RISK_MAP_MAX_FETCHES", "64"))
+RISK_MAP_MAX_PROFILES = int(os.getenv("RISK_MAP_MAX_PROFILES", "8"))
+RISK_MAP_CHUNK_CELLS = int(os.getenv("RISK_MAP_CHUNK_CELLS", "2048"))
+RISK_MAP_RESOLUTION = float(os.getenv("RISK_MAP_RESOLUTION", os.getenv("WEATHER_GRID_CELL", "0.05")))
+
+# Append-only audit of every assessment (services/audit_log.py): requests only enqueue,
+# a background thread group-commits to daily SQLite files under AUDIT_LOG_DIR.
+audit_log = None
+if os.getenv("AUDIT_LOG_ENABLED", "true").lower() == "true":
+    audit_log = AuditLog()
+    registry.gauge_callback("heatshield_audit_queue_depth", "Assessments waiting for the audit writer.",
+                            lambda: audit_log.stats()["queued"])
+
+def audit(endpoint, inputs, weather, response, started):
+    """
+    Queues an /api/predict-shaped response for the audit log (started: perf_counter at request start).
+    """
+    if audit_log is not None:
+        audit_log.record(endpoint, inputs, weather, response["riskCategory"], response["riskPercentage"],
+                         response["metadata"]["modelVersion"], round((time.perf_counter() - started) * 1000, 3))
+
+def model_predict_proba(bundle, columns):
+    """
+    Runs the bundle's model (or risk table) on a {column: values} mapping.
+    A sample of calls is also scored by the shadow model, if one is configured.
+    """
+    probs = bundle.predict_proba(columns)
+    if model_manager.shadow is not None:
+        model_manager.shadow.maybe_submit(columns, probs, bundle.classes_)
+    return probs
+
+def build_response(risk_label, risk_score, inputs, weather, recommendations, timestamp, model_version):
+    hi = heat_index(weather['temperature'], weather['humidity'])
+    return {
+        "riskCategory": risk_label,
+        "riskPercentage": risk_percentage(risk_score),
+        "summary": f"Risk level is {risk_label.upper()} due to current conditions.",
+        "factors": [
+            {"label": "Temperature", "value": f"{weather['temperature']}°C", "severity": "high" if weather['temperature'] > 35 else "low"},
+            {"label": "Humidity", "value": f"{weather['humidity']}%", "severity": "high" if weather['humidity'] > 70 else "low"},
+            # Same bands as the training labels: Danger from 39°C, Caution from 27°C
+            {"label": "Heat Index", "value": f"{hi:.1f}°C", "severity": "high" if hi >= 39 else "moderate" if hi >= 27 else "low"}
+        ],
+        "recommendations": recommendations,
+        "metadata": {
+            "location": inputs.get('city'),
+            "timestamp": timestamp,
+            "modelVersion": model_version,
+            "environmentalSnapshot": f"{weather['temperature']}°C, {weather['humidity']}% Humidity"
+        }
+    }
 
 @app.route('/', methods=['GET'])
 def root():
@@ -40,10 +223,28 @@ def root():
     <p>👉 Please visit the Frontend at: <a href="http://localhost:8080">http://localhost:8080</a></p>
     """
 
+def health_payload():
+    bundle = model_manager.bundle
+    status = "healthy" if bundle is not None else "degraded (model missing)"
+    return {
+        "status": status,
+        "service": "Heat Guardian API",
+        "inference": dict(bundle.describe() if bundle is not None else {"model": None, "model_version": None},
+                          **model_manager.stats()),
+        "weather_cache": weather_service.cache_stats(),
+        "prediction_cache": prediction_cache.stats() if prediction_cache is not None else None,
+        "weather_grid": weather_service.grid_stats(),
+        "weather_prefetch": weather_prefetcher.stats() if weather_prefetcher is not None else None,
+        "audit_log": audit_log.stats() if audit_log is not None else None,
+        "process": {
+            "startup": startup.report(),
+            "memory": memory_stats()
+        }
+    }
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
-    status = "healthy" if model else "degraded (model missing)"
-    return jsonify({"status": status, "service": "Heat Guardian API"}), 200
+    return jsonify(health_payload()), 200
 
 @app.route('/api/weather', methods=['GET'])
 def get_weather():
@@ -57,11 +258,266 @@ def get_weather():
     data = weather_service.get_weather(location, lat, lon)
     return jsonify(data)
 
+def location_key(inputs):
+    return (inputs.get('city'), inputs.get('latitude'), inputs.get('longitude'))
+
+def score_prediction(inputs, weather):
+    """
+    CPU-only part of /api/predict (no I/O), shared with the async server in asgi.py.
+    """
+    with model_manager.acquire() as bundle:
+        if prediction_cache is None:
+            risk_label, risk_score, recommendations = predict_risk(bundle, inputs, weather)
+        else:
+            scored_weather = dict(weather, temperature=quantize(weather['temperature'], PREDICTION_CACHE_TEMP_STEP),
+                                  humidity=quantize(weather['humidity'], PREDICTION_CACHE_HUMIDITY_STEP))
+            key = (bundle.version, scored_weather['temperature'], scored_weather['humidity'],
+                   inputs['exposureDuration'], inputs['activityLevel'], inputs['hydrationLevel'], inputs['ageGroup'],
+                   recommendation_engine.input_key(inputs), recommendation_engine.weather_key(weather))
+            risk_label, risk_score, recommendations = prediction_cache.get_or_load(
+                key, lambda: predict_risk(bundle, inputs, weather, scored_weather))
+
+    return build_response(risk_label, risk_score, inputs, weather, list(recommendations),
+                          datetime.now().isoformat(), bundle.version)
+
+def predict_risk(bundle, inputs, weather, scored_weather=None):
+    """
+    Returns (risk_label, risk_score, recommendations) for one request.
+    The model scores scored_weather (default: weather); the rules always see weather.
+    """
+    with STAGE_SECONDS.time(stage="features"):
+        row = build_feature_row(inputs, scored_weather or weather)
+        features = {col: [row[col]] for col in FEATURE_COLUMNS}
+    
+    # Predict (labels are derived from the probabilities, one forest traversal)
+    with STAGE_SECONDS.time(stage="predict_proba"):
+        risk_probs = model_predict_proba(bundle, features)
+        risk_labels, risk_scores = score_probabilities(bundle.classes_, risk_probs)
+    
+    # Generate Recommendations
+    with STAGE_SECONDS.time(stage="recommendations"):
+        recommendations = recommendation_engine.generate_recommendations(risk_labels[0], inputs, weather)
+    
+    return risk_labels[0], float(risk_scores[0]), tuple(recommendations)
+
+def quantize(value, step):
+    return round(round(float(value) / step) * step, 6)
+
+def validate_batch(data):
+    """
+    Returns an (error, status) pair for an unusable batch body, else None.
+    """
+    if not isinstance(data, dict):
+        return "The request body must be a JSON object with an 'items' list", 400
+    items = data.get('items')
+    if not isinstance(items, list) or not items:
+        return "A non-empty 'items' list is required", 400
+    if len(items) > MAX_BATCH_SIZE:
+        return f"Batch size exceeds limit of {MAX_BATCH_SIZE}", 413
+    return None
+
+def batch_item(item):
+    """
+    (inputs, weather, error) of one batch item; error is set when its shape is unusable.
+    """
+    if item is None:
+        item = {}
+    if not isinstance(item, dict):
+        return None, None, "Each item must be an object with 'inputs' and optional 'weather'"
+    inputs, weather = item.get('inputs'), item.get('weather')
+    if (inputs and not isinstance(inputs, dict)) or (weather and not isinstance(weather, dict)):
+        return None, None, "'inputs' and 'weather' must be objects"
+    return inputs, weather, None
+
+def batch_locations(items):
+    """
+    Distinct locations of the batch items that did not bring their own weather.
+    """
+    locations = set()
+    for item in items:
+        inputs, weather, error = batch_item(item)
+        if inputs and not weather and not error:
+            locations.add(location_key(inputs))
+    return locations
+
+def score_batch(items, weather_by_location, started=None):
+    """
+    CPU-only part of /api/predict/batch: one feature matrix, one model call.
+    weather_by_location maps every key from batch_locations(items) to its weather.
+    started (perf_counter at request start) is the reference for the audited latency.
+    """
+    started = started or time.perf_counter()
+    results = [None] * len(items)
+    rows = []
+    scored = [] # (index, inputs, weather) for every valid item, in row order
+
+    for i, item in enumerate(items):
+        inputs, weather, error = batch_item(item)
+        if error:
+            results[i] = {"error": error}
+            continue
+
+        if not weather and inputs:
+            weather = weather_by_location.get(location_key(inputs))
+
+        if not inputs or not weather:
+            results[i] = {"error": "Missing inputs or weather data"}
+            continue
+
+        try:
+            rows.append(build_feature_row(inputs, weather))
+        except KeyError as e:
+            results[i] = {"error": f"Missing field: {e.args[0]}"}
+            continue
+        scored.append((i, inputs, weather))
+
+    if rows:
+        # Single columnar feature matrix and a single forest traversal for the whole batch
+        with STAGE_SECONDS.time(stage="batch_features"):
+            features = {col: [row[col] for row in rows] for col in FEATURE_COLUMNS}
+        with STAGE_SECONDS.time(stage="batch_predict_proba"), model_manager.acquire() as bundle:
+            risk_labels, risk_scores = score_probabilities(bundle.classes_, model_predict_proba(bundle, features))
+        timestamp = datetime.now().isoformat()
+
+        with STAGE_SECONDS.time(stage="batch_recommendations"):
+            all_recommendations = recommendation_engine.generate_batch(
+                risk_labels, [inputs for _, inputs, _ in scored], [weather for _, _, weather in scored])
+            for (i, inputs, weather), risk_label, risk_score, recommendations in zip(
+                    scored, risk_labels, risk_scores, all_recommendations):
+                results[i] = build_response(risk_label, risk_score, inputs, weather, recommendations, timestamp,
+                                            bundle.version)
+                audit("/api/predict/batch", inputs, weather, results[i], started)
+
+    return results
+
+def score_risk_map(grid, profiles, bundle):
+    """
+    Looks up the weather of the whole map in bulk (at most RISK_MAP_MAX_FETCHES upstream calls),
+    then yields one chunk of grid rows at a time, each scored in a single model call over every
+    (cell x profile) pair. Chunk arrays are cell-major; "risk" is in tenths of a percent and
+    "category" indexes bundle.classes_, both shaped (cells, profiles).
+    """
+    n_profiles = len(profiles)
+    lats, lons = grid.points(0, grid.rows)
+    with STAGE_SECONDS.time(stage="risk_map_weather"):
+        weathers = weather_service.get_weather_many(list(zip(lats.tolist(), lons.tolist())), RISK_MAP_MAX_FETCHES)
+    temperatures = np.array([w['temperature'] for w in weathers], dtype=np.float64)
+    humidities = np.array([w['humidity'] for w in weathers], dtype=np.float64)
+
+    chunk_rows = max(1, RISK_MAP_CHUNK_CELLS // grid.cols)
+    for row_start in range(0, grid.rows, chunk_rows):
+        rows = min(chunk_rows, grid.rows - row_start)
+        cells = slice(row_start * grid.cols, (row_start + rows) * grid.cols)
+        temperature, humidity = temperatures[cells], humidities[cells]
+        n_cells = len(temperature)
+
+        features = {
+            'temperature': np.repeat(temperature, n_profiles),
+            'humidity': np.repeat(humidity, n_profiles),
+            'exposure_hours': np.tile([float(p['exposureDuration']) for p in profiles], n_cells),
+            'activity_level': [p['activityLevel'] for p in profiles] * n_cells,
+            'hydration_level': [p['hydrationLevel'] for p in profiles] * n_cells,
+            'age_group': [p['ageGroup'] for p in profiles] * n_cells
+        }
+        # Straight to the bundle: a whole map is too large a sample for the shadow model
+        with STAGE_SECONDS.time(stage="risk_map_predict_proba"):
+            indices, scores = score_indices(bundle.classes_, bundle.predict_proba(features))
+        yield {
+            "row_start": row_start,
+            "rows": rows,
+            "temperature": temperature,
+            "humidity": humidity,
+            "risk": np.rint(scores * 1000).astype(np.uint16).reshape(n_cells, n_profiles),
+            "category": indices.astype(np.uint8).reshape(n_cells, n_profiles)
+        }
+
+def parse_shift(shift):
+    """
+    Validates the "shift" block of /api/predict/shift.
+    Returns (start, hours, search_hours); start is an aware datetime or None (next full hour).
+    """
+    hours = int(shift.get('hours', 8))
+    search_hours = int(shift.get('searchHours', 12))
+    if not 1 <= hours <= MAX_SHIFT_HOURS:
+        raise ValueError(f"shift.hours must be between 1 and {MAX_SHIFT_HOURS}")
+    if not 1 <= search_hours <= MAX_SEARCH_HOURS:
+        raise ValueError(f"shift.searchHours must be between 1 and {MAX_SEARCH_HOURS}")
+
+    start = shift.get('start')
+    if start:
+        start = datetime.fromisoformat(start)
+        if start.tzinfo is None:
+            start = start.replace(tzinfo=timezone.utc)
+    return start, hours, search_hours
+
+def score_shift(inputs, forecast, hours, search_hours):
+    """
+    Scores every hour of every candidate shift start in one model call.
+    Candidate k starts k hours after the requested start; within a shift the exposure
+    grows by one hour per hour worked. forecast["hours"] must cover search_hours + hours - 1 hours.
+    """
+    hourly = forecast["hours"]
+    offsets = [(k, h) for k in range(search_hours) for h in range(hours)]
+    features = {
+        'temperature': [hourly[k + h]['temperature'] for k, h in offsets],
+        'humidity': [hourly[k + h]['humidity'] for k, h in offsets],
+        'exposure_hours': [h + 1 for k, h in offsets],
+        'activity_level': [inputs['activityLevel']] * len(offsets),
+        'hydration_level': [inputs['hydrationLevel']] * len(offsets),
+        'age_group': [inputs['ageGroup']] * len(offsets)
+    }
+    with model_manager.acquire() as bundle:
+        risk_labels, risk_scores = score_probabilities(bundle.classes_, model_predict_proba(bundle, features))
+    scores = np.asarray(risk_scores).reshape(search_hours, hours)
+
+    # Requested shift = candidate 0
+    timeline = []
+    for h in range(hours):
+        timeline.append({
+            "hour": h + 1,
+            "time": hourly[h]['time'],
+            "temperature": hourly[h]['temperature'],
+            "humidity": hourly[h]['humidity'],
+            "exposureHours": h + 1,
+            "riskCategory": risk_labels[h],
+            "riskPercentage": risk_percentage(scores[0, h])
+        })
+    peak = max(timeline, key=lambda point: point["riskPercentage"])
+
+    # Safest start: lowest peak risk, ties broken by lowest mean risk, then earliest
+    peaks = scores.max(axis=1)
+    means = scores.mean(axis=1)
+    best = int(np.lexsort((np.arange(search_hours), means, peaks))[0])
+    best_peak_hour = int(scores[best].argmax())
+
+    peak_weather = {"temperature": peak["temperature"], "humidity": peak["humidity"]}
+    recommendations = recommendation_engine.generate_recommendations(peak["riskCategory"], inputs, peak_weather)
+
+    return {
+        "shift": {"start": hourly[0]['time'], "hours": hours},
+        "timeline": timeline,
+        "peakRisk": {"time": peak["time"], "riskCategory": peak["riskCategory"], "riskPercentage": peak["riskPercentage"]},
+        "safestStart": {
+            "start": hourly[best]['time'],
+            "peakRiskCategory": risk_labels[best * hours + best_peak_hour],
+            "peakRiskPercentage": risk_percentage(peaks[best]),
+            "meanRiskPercentage": risk_percentage(means[best])
+        },
+        "recommendations": recommendations,
+        "metadata": {
+            "location": inputs.get('city') or forecast.get("location_name"),
+            "timestamp": datetime.now().isoformat(),
+            "modelVersion": bundle.version,
+            "forecastSource": forecast.get("source")
+        }
+    }
+
 @app.route('/api/predict', methods=['POST'])
 def predict():
-    if not model:
+    if model_manager.bundle is None:
         return jsonify({"error": "Prediction service unavailable"}), 503
         
+    started = time.perf_counter()
     try:
         data = request.json
         inputs = data.get('inputs')
@@ -73,66 +529,166 @@ def predict():
         # Scenario 2: If Frontend didn't pass weather, backend should fetch it
         # (Assuming 'inputs' contains location info)
         if not weather and inputs:
-            weather = weather_service.get_weather(
-                location=inputs.get('city'),
-                lat=inputs.get('latitude'),
-                lon=inputs.get('longitude')
-            )
+            weather = weather_service.get_weather(*location_key(inputs))
         
         if not inputs or not weather:
             return jsonify({"error": "Missing inputs or weather data"}), 400
 
-        # Feature Engineering (Must match training data columns)
-        # Columns: ['temperature', 'humidity', 'exposure_hours', 'activity_level', 'hydration_level', 'age_group']
-        
-        # Create DataFrame for prediction
-        features = pd.DataFrame([{
-            'temperature': weather['temperature'],
-            'humidity': weather['humidity'],
-            'exposure_hours': inputs['exposureDuration'],
-            'activity_level': inputs['activityLevel'],
-            'hydration_level': inputs['hydrationLevel'],
-            'age_group': inputs['ageGroup']
-        }])
-        
-        # Predict
-        risk_label = model.predict(features)[0]
-        risk_probs = model.predict_proba(features)[0]
-        
-        # Calculate Weighted Risk Score (Severity) instead of just Confidence
-        # This prevents "Extreme Risk (48%)" confusion.
-        class_weights = {'low': 0.15, 'moderate': 0.45, 'high': 0.75, 'extreme': 0.95}
-        weighted_score = 0
-        for label, prob in zip(model.classes_, risk_probs):
-            weighted_score += prob * class_weights.get(label, 0)
-            
-        risk_score = weighted_score
-        
-        # Generate Recommendations
-        recommendations = recommendation_engine.generate_recommendations(risk_label, inputs, weather)
-        
-        # Construct Response
-        response = {
-            "riskCategory": risk_label,
-            "riskPercentage": round(risk_score * 100, 1),
-            "summary": f"Risk level is {risk_label.upper()} due to current conditions.",
-            "factors": [
-                {"label": "Temperature", "value": f"{weather['temperature']}°C", "severity": "high" if weather['temperature'] > 35 else "low"},
-                {"label": "Humidity", "value": f"{weather['humidity']}%", "severity": "high" if weather['humidity'] > 70 else "low"}
-            ],
-            "recommendations": recommendations,
-            "metadata": {
-                "location": inputs['city'],
-                "timestamp": pd.Timestamp.now().isoformat(),
-                "environmentalSnapshot": f"{weather['temperature']}°C, {weather['humidity']}% Humidity"
-            }
-        }
-        
-        return jsonify(response)
+        response = score_prediction(inputs, weather)
+        audit("/api/predict", inputs, weather, response, started)
+        with STAGE_SECONDS.time(stage="serialize"):
+            return jsonify(response)
         
     except Exception as e:
         print(f"Prediction Error: {e}")
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/predict/batch', methods=['POST'])
+def predict_batch():
+    """
+    Scores a whole crew in one model call.
+    Body: {"items": [{"inputs": {...}, "weather": {...optional}}, ...]}
+    Each result has the same shape as /api/predict; invalid items get an {"error": ...} entry.
+    """
+    if model_manager.bundle is None:
+        return jsonify({"error": "Prediction service unavailable"}), 503
+
+    started = time.perf_counter()
+    try:
+        data = request.json or {}
+        error = validate_batch(data)
+        if error:
+            return jsonify({"error": error[0]}), error[1]
+        items = data['items']
+
+        # One weather lookup per distinct location
+        weather_by_location = {key: weather_service.get_weather(*key) for key in batch_locations(items)}
+        results = score_batch(items, weather_by_location, started)
+
+        return jsonify({"results": results, "count": len(results)})
+
+    except Exception as e:
+        print(f"Batch Prediction Error: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/predict/shift', methods=['POST'])
+def predict_shift():
+    """
+    Hourly risk curve across a shift plus the safest start time, from the forecast.
+    Body: {"inputs": {...profile + city or latitude/longitude},
+           "shift": {"start": ISO time (optional), "hours": 8, "searchHours": 12}}
+    """
+    if model_manager.bundle is None:
+        return jsonify({"error": "Prediction service unavailable"}), 503
+
+    started = time.perf_counter()
+    try:
+        data = request.json or {}
+        inputs = data.get('inputs')
+        if not inputs:
+            return jsonify({"error": "Missing inputs"}), 400
+
+        try:
+            start, hours, search_hours = parse_shift(data.get('shift') or {})
+        except (TypeError, ValueError) as e:
+            return jsonify({"error": f"Invalid shift: {e}"}), 400
+
+        forecast = weather_service.get_hourly_forecast(*location_key(inputs), start=start,
+                                                       hours=search_hours + hours - 1)
+        try:
+            result = score_shift(inputs, forecast, hours, search_hours)
+        except KeyError as e:
+            return jsonify({"error": f"Missing field: {e.args[0]}"}), 400
+        # Audited as the shift's peak-risk hour
+        if audit_log is not None:
+            peak = next(point for point in result["timeline"] if point["time"] == result["peakRisk"]["time"])
+            audit_log.record("/api/predict/shift", dict(inputs, shift=data.get('shift')),
+                             {"temperature": peak["temperature"], "humidity": peak["humidity"],
+                              "time": peak["time"], "source": forecast.get("source")},
+                             peak["riskCategory"], peak["riskPercentage"], result["metadata"]["modelVersion"],
+                             round((time.perf_counter() - started) * 1000, 3))
+        return jsonify(result)
+
+    except Exception as e:
+        print(f"Shift Prediction Error: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/risk-map', methods=['POST'])
+def risk_map():
+    """
+    Heat-risk heatmap over a bounding box for a few worker profiles.
+    Body: {"bbox": {"south", "west", "north", "east"}, "resolution": degrees (optional),
+           "profiles": [{"name", "exposureDuration", "activityLevel", "hydrationLevel", "ageGroup"}] (optional),
+           "format": "json" | "ndjson" | "binary"}
+    json is one document of flat row-major arrays. ndjson streams a header line, then one line
+    per chunk of rows. binary streams a JSON header line, then one fixed-size record per cell
+    (see risk_map.record_dtype); the records read back as a (rows, cols) array.
+    """
+    if model_manager.bundle is None:
+        return jsonify({"error": "Prediction service unavailable"}), 503
+
+    try:
+        try:
+            grid, profiles, fmt = parse_risk_map(request.json or {}, RISK_MAP_MAX_CELLS, RISK_MAP_MAX_PROFILES,
+                                                 RISK_MAP_RESOLUTION)
+        except GridTooLarge as e:
+            return jsonify({"error": str(e)}), 413
+        except (TypeError, ValueError) as e:
+            return jsonify({"error": f"Invalid risk map request: {e}"}), 400
+
+        if fmt == 'json':
+            with model_manager.acquire() as bundle:
+                payload = risk_map_header(grid, profiles, bundle.classes_, bundle.version, fmt)
+                chunks = [encode_json(chunk) for chunk in score_risk_map(grid, profiles, bundle)]
+            for field in ("temperature", "humidity"):
+                payload[field] = [value for chunk in chunks for value in chunk[field]]
+            for field in ("riskPercentage", "riskCategory"):
+                payload[field] = [[value for chunk in chunks for value in chunk[field][p]] for p in range(len(profiles))]
+            return jsonify(payload)
+
+        def stream():
+            # The bundle stays pinned until the last chunk, even if a new model is published meanwhile
+            with model_manager.acquire() as bundle:
+                head = risk_map_header(grid, profiles, bundle.classes_, bundle.version, fmt)
+                if fmt == 'binary':
+                    yield binary_header_line(head)
+                    for chunk in score_risk_map(grid, profiles, bundle):
+                        yield encode_binary(chunk)
+                else:
+                    yield json.dumps(head) + "\n"
+                    for chunk in score_risk_map(grid, profiles, bundle):
+                        yield json.dumps(encode_json(chunk)) + "\n"
+
+        mimetype = "application/octet-stream" if fmt == 'binary' else "application/x-ndjson"
+        return Response(stream(), mimetype=mimetype)
+
+    except Exception as e:
+        print(f"Risk Map Error: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """
+    Prometheus text exposition of the in-process registry.
+    """
+    if not registry.enabled:
+        return Response("# metrics disabled (METRICS_ENABLED=false)\n", mimetype="text/plain"), 404
+    return Response(registry.render(), mimetype="text/plain; version=0.0.4")
+
+@app.route('/debug/profile/<profile_id>', methods=['GET'])
+def get_profile(profile_id):
+    """
+    Result of a request sent with "X-Profile: 1". Add ?format=collapsed for flamegraph input.
+    """
+    if not PROFILING_ENABLED:
+        return jsonify({"error": "Profiling is disabled"}), 404
+    entry = profile_store.get(profile_id)
+    if entry is None:
+        return jsonify({"error": "Unknown or expired profile id"}), 404
+    endpoint, profiler = entry
+    if request.args.get("format") == "collapsed":
+        return Response(profiler.collapsed() + "\n", mimetype="text/plain")
+    return jsonify(dict(profiler.summary(), endpoint=endpoint))
+
 if __name__ == '__main__':
     app.run(debug=True, port=5000, host='0.0.0.0')
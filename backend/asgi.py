@@ -0,0 +1,130 @@
+# Async serving mode:
+#   uvicorn backend.asgi:app --host 0.0.0.0 --port $PORT --limit-concurrency 500
+# /api/weather and /api/predict(/batch) run as native async handlers, so a slow
+# OpenWeatherMap only parks a coroutine instead of a worker thread. Every other route
+# is served by the Flask app from app.py.
+import asyncio
+import contextlib
+import functools
+import os
+import sys
+import time
+
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse
+from starlette.routing import Mount, Route
+
+sys.path.append(os.path.dirname(__file__))
+import app as api
+from async_weather_service import AsyncWeatherService
+from metrics import registry, REQUEST_SECONDS
+
+async_weather = AsyncWeatherService(api.weather_service)
+
+def timed(handler):
+    """
+    Records the native async routes in the same request histogram the Flask hooks feed.
+    """
+    @functools.wraps(handler)
+    async def wrapper(request):
+        if not registry.enabled:
+            return await handler(request)
+        start = time.perf_counter()
+        response = await handler(request)
+        REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint=request.url.path,
+                                method=request.method, status=response.status_code)
+        return response
+    return wrapper
+
+@timed
+async def get_weather(request):
+    location = request.query_params.get('location')
+    lat = request.query_params.get('lat')
+    lon = request.query_params.get('lon')
+
+    if not location and not (lat and lon):
+        return JSONResponse({"error": "Location or (lat, lon) is required"}, status_code=400)
+
+    return JSONResponse(await async_weather.get_weather(location, lat, lon))
+
+@timed
+async def predict(request):
+    if api.model_manager.bundle is None:
+        return JSONResponse({"error": "Prediction service unavailable"}, status_code=503)
+
+    started = time.perf_counter()
+    try:
+        data = await request.json()
+        inputs = data.get('inputs')
+        weather = data.get('weather') # Frontend might pass weather directly
+
+        if not weather and inputs:
+            weather = await async_weather.get_weather(*api.location_key(inputs))
+
+        if not inputs or not weather:
+            return JSONResponse({"error": "Missing inputs or weather data"}, status_code=400)
+
+        # Off the loop, like the batch: a cache miss may wait on a coalesced load or fall back
+        # to sklearn inference, and auditing may block (AUDIT_LOG_ON_FULL=block)
+        def score():
+            response = api.score_prediction(inputs, weather)
+            api.audit("/api/predict", inputs, weather, response, started)
+            return response
+
+        return JSONResponse(await run_in_threadpool(score))
+
+    except Exception as e:
+        print(f"Prediction Error: {e}")
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+@timed
+async def predict_batch(request):
+    if api.model_manager.bundle is None:
+        return JSONResponse({"error": "Prediction service unavailable"}, status_code=503)
+
+    started = time.perf_counter()
+    try:
+        data = await request.json() or {}
+        error = api.validate_batch(data)
+        if error:
+            return JSONResponse({"error": error[0]}, status_code=error[1])
+        items = data['items']
+
+        # All distinct locations are fetched concurrently
+        locations = list(api.batch_locations(items))
+        weathers = await asyncio.gather(*(async_weather.get_weather(*key) for key in locations))
+        results = await run_in_threadpool(api.score_batch, items, dict(zip(locations, weathers)), started)
+
+        return JSONResponse({"results": results, "count": len(results)})
+
+    except Exception as e:
+        print(f"Batch Prediction Error: {e}")
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+@timed
+async def health_check(request):
+    payload = api.health_payload()
+    payload["async_weather"] = async_weather.stats()
+    return JSONResponse(payload)
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    await async_weather.start()
+    api.model_manager.ensure_running()
+    if api.weather_prefetcher is not None:
+        api.weather_prefetcher.ensure_running()
+    yield
+    await async_weather.close()
+
+app = Starlette(
+    routes=[
+        Route('/api/health', health_check, methods=['GET']),
+        Route('/api/weather', get_weather, methods=['GET']),
+        Route('/api/predict', predict, methods=['POST']),
+        Route('/api/predict/batch', predict_batch, methods=['POST']),
+        Mount('/', app=WSGIMiddleware(api.app))
+    ],
+    lifespan=lifespan
+)
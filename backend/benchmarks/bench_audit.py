@@ -0,0 +1,86 @@
+# /api/predict latency with the audit log off vs on (in-process, mock weather). Rounds
+# alternate between the two modes so drift (CPU frequency, cache warm-up) hits both alike.
+# Run from the repo root:
+#   python backend/benchmarks/bench_audit.py
+# Exits non-zero if audited p99 is worse than unaudited p99 beyond --tolerance.
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from bench_backend import SAMPLE_INPUTS, load_app
+
+
+def percentiles(timings):
+    ms = np.asarray(timings) * 1000
+    return {f"p{q}_ms": round(float(np.percentile(ms, q)), 4) for q in (50, 95, 99)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Audit log overhead on /api/predict.")
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--requests", type=int, default=300, help="Requests per round and mode")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative p99 slowdown")
+    parser.add_argument("--min-delta-ms", type=float, default=0.5, help="Ignore slowdowns smaller than this")
+    args = parser.parse_args(argv)
+
+    api = load_app()
+    from audit_log import AuditLog
+
+    directory = tempfile.mkdtemp(prefix="heatshield_audit_")
+    audit_log = AuditLog(directory)
+    client = api.app.test_client()
+    # Distinct cities: every request is a different assessment with its own weather lookup
+    bodies = [{"inputs": dict(SAMPLE_INPUTS, city=f"Site-{i}")} for i in range(args.requests)]
+
+    def run():
+        timings = []
+        for body in bodies:
+            t0 = time.perf_counter()
+            response = client.post('/api/predict', json=body)
+            timings.append(time.perf_counter() - t0)
+            if response.status_code != 200:
+                raise RuntimeError(f"{response.status_code}: {response.get_data(as_text=True)[:200]}")
+        return timings
+
+    try:
+        timings = {"off": [], "on": []}
+        api.audit_log = None
+        run() # warm-up
+        for _ in range(args.rounds):
+            for mode in ("off", "on"):
+                api.audit_log = audit_log if mode == "on" else None
+                timings[mode].extend(run())
+        api.audit_log = None
+
+        start = time.perf_counter()
+        audit_log.flush()
+        drain_s = time.perf_counter() - start
+        stats = audit_log.stats()
+        # Include the WAL: the writer's connection is still open, so it has not been checkpointed
+        size = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+        audited = len(audit_log.query(limit=10 ** 9))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    off, on = percentiles(timings["off"]), percentiles(timings["on"])
+    print(f"{'':<12}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for mode, result in (("audit off", off), ("audit on", on)):
+        print(f"{mode:<12}{result['p50_ms']:>10}{result['p95_ms']:>10}{result['p99_ms']:>10}")
+    print(f"\nwritten {stats['written']:,} in {stats['batches']} batches, dropped {stats['dropped']}, "
+          f"read back {audited:,}; {size / max(1, stats['written']):.0f} bytes/record on disk; "
+          f"queue drained {drain_s * 1000:.0f}ms after the last request")
+
+    slower = on["p99_ms"] > off["p99_ms"] * (1 + args.tolerance) and on["p99_ms"] - off["p99_ms"] > args.min_delta_ms
+    if slower:
+        print(f"REGRESSION: audited p99 {off['p99_ms']} -> {on['p99_ms']} ms")
+    return 1 if slower or stats["dropped"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
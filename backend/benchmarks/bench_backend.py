@@ -0,0 +1,195 @@
+# In-process latency/throughput benchmarks for the backend hot paths (Flask test client,
+# mock weather, no network). Run from the repo root:
+#   python backend/benchmarks/bench_backend.py --save-baseline   # record a baseline
+#   python backend/benchmarks/bench_backend.py --compare         # flag regressions against it
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+results_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+sys.path.append(backend_dir)
+
+SAMPLE_INPUTS = {
+    "city": "Delhi",
+    "exposureDuration": 6,
+    "activityLevel": "heavy",
+    "hydrationLevel": "poor",
+    "ageGroup": "46-55"
+}
+SAMPLE_WEATHER = {"temperature": 38.5, "humidity": 62.0}
+
+def load_app():
+    import app as api
+    # Benchmarks never touch the network: WeatherService serves mock data without a key
+    api.weather_service.api_key = None
+    if api.model_manager.bundle is None:
+        raise SystemExit("No model found, run ml_engine/train.py first")
+    return api
+
+def build_cases(api, batch_size):
+    client = api.app.test_client()
+    batch_body = {"items": [{"inputs": dict(SAMPLE_INPUTS, city=f"Site-{i % 10}")} for i in range(batch_size)]}
+    single = {col: [value] for col, value in api.build_feature_row(SAMPLE_INPUTS, SAMPLE_WEATHER).items()}
+    rng = np.random.default_rng(0)
+    batch = {
+        'temperature': rng.uniform(20, 50, batch_size).round(1).tolist(),
+        'humidity': rng.uniform(10, 100, batch_size).round(1).tolist(),
+        'exposure_hours': rng.integers(1, 13, batch_size).tolist(),
+        'activity_level': ['heavy'] * batch_size,
+        'hydration_level': ['moderate'] * batch_size,
+        'age_group': ['26-35'] * batch_size
+    }
+
+    def check(response):
+        if response.status_code != 200:
+            raise RuntimeError(f"{response.status_code}: {response.get_data(as_text=True)[:200]}")
+
+    def uncached(fn):
+        # Every iteration posts the same inputs: without this, api_predict would time cache hits
+        def run():
+            cache, api.prediction_cache = api.prediction_cache, None
+            try:
+                return fn()
+            finally:
+                api.prediction_cache = cache
+        return run
+
+    predict = lambda: check(client.post('/api/predict', json={"inputs": SAMPLE_INPUTS}))
+    cases = {
+        "api_predict": uncached(predict),
+        "api_predict_batch": lambda: check(client.post('/api/predict/batch', json=batch_body)),
+        "api_weather": lambda: check(client.get('/api/weather?location=Delhi')),
+        "recommendations": lambda: api.recommendation_engine.generate_recommendations("high", SAMPLE_INPUTS, SAMPLE_WEATHER),
+        "model_inference_single": lambda: api.model_predict_proba(api.model_manager.bundle, single),
+        "model_inference_batch": lambda: api.model_predict_proba(api.model_manager.bundle, batch)
+    }
+    if api.prediction_cache is not None:
+        cases["api_predict_cached"] = predict
+    return cases
+
+def measure(fn, iterations, warmup):
+    for _ in range(warmup):
+        fn()
+
+    timings = np.empty(iterations)
+    start = time.perf_counter()
+    for i in range(iterations):
+        t0 = time.perf_counter()
+        fn()
+        timings[i] = time.perf_counter() - t0
+    elapsed = time.perf_counter() - start
+
+    # Separate pass: tracemalloc slows everything down, so it never overlaps with timing
+    alloc_samples = max(1, min(iterations, 50))
+    tracemalloc.start()
+    peak_bytes = []
+    blocks_before = len(tracemalloc.take_snapshot().traces)
+    for _ in range(alloc_samples):
+        baseline = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        fn()
+        peak_bytes.append(tracemalloc.get_traced_memory()[1] - baseline)
+    retained_blocks = len(tracemalloc.take_snapshot().traces) - blocks_before
+    tracemalloc.stop()
+
+    timings_ms = timings * 1000
+    return {
+        "iterations": iterations,
+        "p50_ms": round(float(np.percentile(timings_ms, 50)), 4),
+        "p95_ms": round(float(np.percentile(timings_ms, 95)), 4),
+        "p99_ms": round(float(np.percentile(timings_ms, 99)), 4),
+        "mean_ms": round(float(timings_ms.mean()), 4),
+        "requests_per_s": round(iterations / elapsed, 1),
+        # Transient memory a single call allocates on top of what was live before it
+        "alloc_peak_kb_per_request": round(float(np.median(peak_bytes)) / 1024, 2),
+        # Allocations still alive after the calls (growth = leak or cache fill)
+        "retained_blocks_per_request": round(retained_blocks / alloc_samples, 2)
+    }
+
+def compare(current, baseline, tolerance, min_delta_ms):
+    """
+    A case regresses when p50 or p99 grow, or throughput drops, by more than tolerance.
+    Changes smaller than min_delta_ms are timer noise on microsecond-scale cases and are ignored.
+    """
+    def slower(now, before):
+        return now > before * (1 + tolerance) and now - before > min_delta_ms
+
+    regressions = []
+    for name, result in current["cases"].items():
+        base = baseline["cases"].get(name)
+        if base is None:
+            continue
+        for metric in ("p50_ms", "p99_ms"):
+            if slower(result[metric], base[metric]):
+                regressions.append(f"{name}.{metric}: {base[metric]} -> {result[metric]}")
+        if (result["requests_per_s"] < base["requests_per_s"] * (1 - tolerance) and
+                result["mean_ms"] - base["mean_ms"] > min_delta_ms):
+            regressions.append(f"{name}.requests_per_s: {base['requests_per_s']} -> {result['requests_per_s']}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Backend latency/throughput benchmarks.")
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--cases", nargs="*", help="Subset of cases to run")
+    parser.add_argument("--output", default=os.path.join(results_dir, "latest.json"))
+    parser.add_argument("--baseline", default=os.path.join(results_dir, "baseline.json"))
+    parser.add_argument("--save-baseline", action="store_true", help="Also write the results as the new baseline")
+    parser.add_argument("--compare", action="store_true", help="Exit non-zero if any case regressed vs the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative slowdown (0.25 = 25%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=0.5, help="Ignore slowdowns smaller than this")
+    args = parser.parse_args()
+
+    api = load_app()
+    cases = build_cases(api, args.batch_size)
+    selected = args.cases or list(cases)
+
+    results = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "model": type(api.model_manager.bundle.model).__name__,
+        "batch_size": args.batch_size,
+        "cases": {}
+    }
+    for name in selected:
+        print(f"Running {name}...")
+        results["cases"][name] = measure(cases[name], args.iterations, args.warmup)
+        r = results["cases"][name]
+        print(f"  p50 {r['p50_ms']}ms  p95 {r['p95_ms']}ms  p99 {r['p99_ms']}ms  "
+              f"{r['requests_per_s']} req/s  {r['alloc_peak_kb_per_request']} KB/req")
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=4)
+    print(f"Results saved to {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=4)
+        print(f"Baseline saved to {args.baseline}")
+    elif args.compare:
+        if not os.path.exists(args.baseline):
+            print(f"No baseline at {args.baseline}, run with --save-baseline first")
+            return 1
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance, args.min_delta_ms)
+        if regressions:
+            print("REGRESSIONS:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"No regressions vs {args.baseline} (tolerance {args.tolerance:.0%})")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
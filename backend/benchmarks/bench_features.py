@@ -0,0 +1,87 @@
+# Throughput of the vectorized derived-feature functions (services/heat_features.py) against
+# the per-element scalar loop they replaced, plus a parity check against that original formula.
+# Run from the repo root:
+#   python backend/benchmarks/bench_features.py              # 10M-element arrays
+#   python backend/benchmarks/bench_features.py --size 1000000
+# Exits non-zero if the vectorized heat index drifts from the reference formula.
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'services')))
+from heat_features import dew_point, heat_index, wbgt
+
+
+def reference_heat_index(temp_c, humidity):
+    """
+    The scalar formula previously in dataset_generator.py / find_test_cases.py, verbatim.
+    """
+    T = (temp_c * 9/5) + 32
+    RH = humidity
+    HI = 0.5 * (T + 61.0 + ((T-68.0)*1.2) + (RH*0.094))
+    if HI >= 80:
+        HI = -42.379 + 2.04901523*T + 10.14333127*RH - .22475541*T*RH - .00683783*T*T - .05481717*RH*RH + .00122874*T*T*RH + .00085282*T*RH*RH - .00000199*T*T*RH*RH
+    return (HI - 32) * 5/9
+
+
+def check_parity(rng, n_samples, tolerance):
+    """
+    Compares heat_index with the reference on random points, a regular grid and the
+    80°F switch-over, for arrays and for scalars. Returns the largest absolute difference.
+    """
+    temps = np.concatenate([rng.uniform(-20, 60, n_samples), np.repeat(np.arange(-20, 60.5, 0.5), 101)])
+    hums = np.concatenate([rng.uniform(0, 100, n_samples), np.tile(np.arange(0, 101.0), 161)])
+    expected = np.array([reference_heat_index(t, h) for t, h in zip(temps.tolist(), hums.tolist())])
+
+    worst = float(np.abs(heat_index(temps, hums) - expected).max())
+    for t, h, e in zip(temps[:2000].tolist(), hums[:2000].tolist(), expected[:2000]):
+        worst = max(worst, abs(heat_index(t, h) - e))
+    # Broadcasting: one humidity for many temperatures
+    worst = max(worst, float(np.abs(heat_index(temps[:1000], 55.0) -
+                                    [reference_heat_index(t, 55.0) for t in temps[:1000].tolist()]).max()))
+    print(f"heat_index parity: max |diff| {worst:.2e} over {len(temps):,} points (tolerance {tolerance:.0e})")
+    return worst
+
+
+def throughput(fn, *args, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the vectorized heat stress features.")
+    parser.add_argument("--size", type=int, default=10_000_000, help="Array length for the vectorized runs")
+    parser.add_argument("--loop-size", type=int, default=200_000,
+                        help="Elements timed with the scalar loop (extrapolated to --size)")
+    parser.add_argument("--tolerance", type=float, default=1e-9)
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(0)
+    worst = check_parity(rng, 200_000, args.tolerance)
+
+    temps = rng.uniform(20, 50, args.size)
+    hums = rng.uniform(10, 100, args.size)
+    loop_t, loop_h = temps[:args.loop_size].tolist(), hums[:args.loop_size].tolist()
+
+    loop_s = throughput(lambda: [reference_heat_index(t, h) for t, h in zip(loop_t, loop_h)], repeat=1)
+    loop_rate = args.loop_size / loop_s
+    print(f"\n{'case':<28}{'seconds':>10}{'elements/s':>16}")
+    print(f"{'scalar loop (reference)':<28}{args.size / loop_rate:>10.3f}{loop_rate:>16,.0f}  (extrapolated)")
+    for name, fn in (("heat_index", heat_index), ("wbgt", wbgt), ("dew_point", dew_point)):
+        seconds = throughput(fn, temps, hums)
+        print(f"{name:<28}{seconds:>10.3f}{args.size / seconds:>16,.0f}")
+    hi_rate = args.size / throughput(heat_index, temps, hums)
+    print(f"\nheat_index speedup over the scalar loop: {hi_rate / loop_rate:,.0f}x")
+
+    return 1 if worst > args.tolerance else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,165 @@
+# Cold-start cost of a serving worker: `python -X importtime` in fresh interpreters.
+#   python backend/benchmarks/bench_startup.py --save-baseline   # record a baseline
+#   python backend/benchmarks/bench_startup.py --compare         # fail on regressions
+# Reports the import time of app.py (or asgi.py) and of its heaviest dependencies, the model
+# load phase, memory after startup, and fails if training-only modules reach the serving process.
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+results_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+# Never needed to serve the compiled model
+TRAINING_MODULES = ["pandas", "sklearn", "scipy", "joblib", "matplotlib", "seaborn"]
+
+PROBE = """
+import json, sys, time
+sys.path.insert(0, {backend_dir!r})
+start = time.perf_counter()
+import {module}
+import_ms = (time.perf_counter() - start) * 1000
+api = sys.modules["app"]
+from process_stats import memory_stats
+print(json.dumps({{
+    "import_ms": import_ms,
+    "phases_ms": api.startup.phases,
+    "memory": memory_stats(),
+    "modules": len(sys.modules),
+    "training_modules": sorted(name for name in {training!r} if name in sys.modules)
+}}))
+"""
+
+
+def parse_importtime(stderr):
+    """
+    {top-level package: self-time ms summed over its modules} from `-X importtime` output.
+    """
+    packages = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        package = name.strip().split(".")[0]
+        packages[package] = packages.get(package, 0) + int(self_us) / 1000
+    return packages
+
+
+def probe(module, env):
+    code = PROBE.format(backend_dir=backend_dir, module=module, training=TRAINING_MODULES)
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True,
+                          cwd=backend_dir, env=env)
+    wall_ms = (time.perf_counter() - start) * 1000
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    result["process_ms"] = wall_ms
+    result["packages_ms"] = parse_importtime(proc.stderr)
+    return result
+
+
+def summarize(runs, top):
+    """
+    Medians over runs: interpreter start-to-exit, app import, model load and the top packages.
+    """
+    def median(values):
+        return round(statistics.median(values), 2)
+
+    packages = {}
+    for run in runs:
+        for name, ms in run["packages_ms"].items():
+            packages.setdefault(name, []).append(ms)
+    packages = {name: median(values + [0] * (len(runs) - len(values))) for name, values in packages.items()}
+    return {
+        "process_ms": median([r["process_ms"] for r in runs]),
+        "import_ms": median([r["import_ms"] for r in runs]),
+        "model_load_ms": median([r["phases_ms"].get("model_load", 0) for r in runs]),
+        "rss_mb": median([r["memory"].get("rss_mb", r["memory"].get("max_rss_mb", 0)) for r in runs]),
+        "modules": runs[-1]["modules"],
+        "training_modules": runs[-1]["training_modules"],
+        "packages_ms": dict(sorted(packages.items(), key=lambda item: -item[1])[:top])
+    }
+
+
+def compare(current, baseline, tolerance, min_delta_ms):
+    regressions = []
+
+    def slower(now, before, floor):
+        return now > before * (1 + tolerance) and now - before > floor
+
+    for key, floor in (("import_ms", min_delta_ms), ("process_ms", min_delta_ms), ("rss_mb", 5)):
+        if slower(current[key], baseline[key], floor):
+            regressions.append(f"{key}: {baseline[key]} -> {current[key]}")
+    for name, ms in current["packages_ms"].items():
+        before = baseline["packages_ms"].get(name, 0)
+        if slower(ms, before, min_delta_ms):
+            regressions.append(f"package {name}: {before} -> {ms} ms")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serving worker import/startup time report.")
+    parser.add_argument("--module", default="app", choices=["app", "asgi"])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="Packages listed by self import time")
+    parser.add_argument("--output", default=os.path.join(results_dir, "startup_latest.json"))
+    parser.add_argument("--baseline", default=os.path.join(results_dir, "startup_baseline.json"))
+    parser.add_argument("--save-baseline", action="store_true", help="Also write the results as the new baseline")
+    parser.add_argument("--compare", action="store_true", help="Exit non-zero if startup regressed vs the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative slowdown (0.25 = 25%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=30, help="Ignore slowdowns smaller than this")
+    args = parser.parse_args(argv)
+
+    env = dict(os.environ)
+    probe(args.module, env) # warm the OS page cache and __pycache__
+    summary = summarize([probe(args.module, env) for _ in range(args.runs)], args.top)
+    results = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "module": args.module,
+        "runs": args.runs,
+        **summary
+    }
+
+    print(f"import {args.module}: {results['import_ms']} ms (interpreter start to exit {results['process_ms']} ms), "
+          f"model load {results['model_load_ms']} ms, RSS {results['rss_mb']} MB, {results['modules']} modules")
+    print(f"\n{'package':<24}{'self ms':>10}")
+    for name, ms in results["packages_ms"].items():
+        print(f"{name:<24}{ms:>10}")
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=4)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=4)
+        print(f"Baseline saved to {args.baseline}")
+
+    failed = False
+    if results["training_modules"]:
+        print(f"\nTraining-only modules imported by the serving process: {', '.join(results['training_modules'])}")
+        failed = True
+    if args.compare:
+        if not os.path.exists(args.baseline):
+            print(f"No baseline at {args.baseline}, run with --save-baseline first")
+            return 1
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance, args.min_delta_ms)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if not regressions:
+            print(f"\nNo startup regressions vs {args.baseline} (tolerance {args.tolerance:.0%})")
+        failed = failed or bool(regressions)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,118 @@
+# Compares sync (gunicorn) and async (uvicorn + asgi.py) serving while the upstream
+# weather API is slow. Run from the repo root:
+#   python backend/benchmarks/load_test.py --delay 0.5 --requests 400 --concurrency 50
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from stub_weather_server import StubWeatherServer
+
+repo_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def server_command(mode, port, workers):
+    if mode == "sync":
+        return [sys.executable, "-m", "gunicorn", "-w", str(workers), "-b", f"127.0.0.1:{port}",
+                "--timeout", "120", "backend.app:app"]
+    return [sys.executable, "-m", "uvicorn", "backend.asgi:app", "--host", "127.0.0.1", "--port", str(port),
+            "--workers", str(workers), "--log-level", "warning"]
+
+def wait_until_up(base, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"{base}/api/health", timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.25)
+    raise RuntimeError(f"Server at {base} did not come up")
+
+async def run_load(base, n_requests, concurrency, n_cities):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async def one(client, i):
+        nonlocal errors
+        inputs = {"city": f"Site-{i % n_cities}", "exposureDuration": 1 + i % 12, "activityLevel": "heavy",
+                  "hydrationLevel": "moderate", "ageGroup": "26-35"}
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                r = await client.post(f"{base}/api/predict", json={"inputs": inputs})
+                if r.status_code != 200:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(timeout=120, limits=limits) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(one(client, i) for i in range(n_requests)))
+        elapsed = time.perf_counter() - start
+
+    return {
+        "requests": n_requests,
+        "errors": errors,
+        "requests_per_s": round(n_requests / elapsed, 1),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 1),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 1),
+        "p99_ms": round(float(np.percentile(latencies, 99)), 1)
+    }
+
+def benchmark(mode, args, stub):
+    port = free_port()
+    env = dict(os.environ, OPENWEATHER_API_KEY="stub", OPENWEATHER_BASE_URL=stub.base_url,
+               WEATHER_TIMEOUT=str(args.delay + 5), WEATHER_QUEUE_TIMEOUT=str(args.delay + 5),
+               WEATHER_MAX_CONCURRENCY=str(args.concurrency))
+    proc = subprocess.Popen(server_command(mode, port, args.workers), cwd=repo_root, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        base = f"http://127.0.0.1:{port}"
+        wait_until_up(base)
+        upstream_before = stub.requests
+        result = asyncio.run(run_load(base, args.requests, args.concurrency, args.cities))
+        result["upstream_calls"] = stub.requests - upstream_before
+        return result
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync vs async serving under a slow weather upstream.")
+    parser.add_argument("--mode", choices=["sync", "async", "both"], default="both")
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--delay", type=float, default=0.5, help="Upstream latency in seconds")
+    parser.add_argument("--cities", type=int, default=10**9, help="Distinct locations (default: every request misses the cache)")
+    args = parser.parse_args()
+
+    modes = ["sync", "async"] if args.mode == "both" else [args.mode]
+    results = {}
+    with StubWeatherServer(delay=args.delay) as stub:
+        for mode in modes:
+            print(f"Running {mode} server...")
+            results[mode] = benchmark(mode, args, stub)
+            print(json.dumps(results[mode]))
+
+    if len(results) == 2:
+        print(f"Async throughput gain: {results['async']['requests_per_s'] / results['sync']['requests_per_s']:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class StubWeatherServer:
+    """
+    Local stand-in for the OpenWeatherMap /data/2.5/weather and /data/2.5/forecast endpoints.
+    delay adds latency to every response; status != 200 makes every call fail.
+    Use as a context manager; base_url is what OPENWEATHER_BASE_URL should point at.
+    """
+
+    def __init__(self, delay=0.0, status=200, port=0):
+        self.delay = delay
+        self.status = status
+        self.requests = 0
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with stub._lock:
+                    stub.requests += 1
+                if stub.delay:
+                    time.sleep(stub.delay)
+
+                query = parse_qs(urlparse(self.path).query)
+                name = query.get("q", [f"GP:{query.get('lat', ['0'])[0]},{query.get('lon', ['0'])[0]}"])[0]
+                seed = sum(ord(c) for c in name)
+                current = {
+                    "main": {"temp": 25 + seed % 17, "humidity": 30 + seed % 50},
+                    "wind": {"speed": seed % 15},
+                    "weather": [{"main": "Clear"}],
+                    "name": name
+                }
+                if urlparse(self.path).path.endswith("/forecast"):
+                    # 5 days of 3-hourly points starting at the current hour
+                    now = int(time.time()) // 3600 * 3600
+                    points = [{"dt": now + i * 10800, **current, "main": {"temp": current["main"]["temp"] + (i % 8) - 4,
+                                                                          "humidity": current["main"]["humidity"]}}
+                              for i in range(40)]
+                    body = json.dumps({"list": points, "city": {"name": name}}).encode()
+                else:
+                    body = json.dumps(current).encode()
+
+                self.send_response(stub.status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.server.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self.server.server_port}/data/2.5/weather"
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+        return False
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run a stub OpenWeatherMap server.")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--delay", type=float, default=0.5)
+    args = parser.parse_args()
+
+    with StubWeatherServer(delay=args.delay, port=args.port) as stub:
+        print(f"Stub weather API at {stub.base_url} (delay {args.delay}s)")
+        threading.Event().wait()
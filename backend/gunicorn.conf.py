@@ -0,0 +1,16 @@
+# gunicorn -c backend/gunicorn.conf.py backend.app:app
+import os
+
+# Import app.py (and load the model) once in the master, then fork.
+# Workers share the model pages copy-on-write instead of each unpickling their own copy.
+preload_app = True
+
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+
+def post_worker_init(worker):
+    # Background threads do not survive the fork, so each worker starts its own model registry
+    # watcher and weather prefetch scheduler (only the prefetcher holding the snapshot lease fetches).
+    extensions = getattr(worker.wsgi, "extensions", {})
+    for name in ("model_manager", "weather_prefetcher"):
+        if extensions.get(name) is not None:
+            extensions[name].ensure_running()
@@ -0,0 +1,47 @@
+import json
+import os
+import sys
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(script_dir, '..', 'services'))
+from heat_features import add_derived_features
+from inference_engine import CompiledModel
+from risk_table import build_risk_table, error_violations
+
+RISK_TABLE_DIR = os.path.join(script_dir, "risk_table")
+
+
+def export_risk_table(model, directory=RISK_TABLE_DIR, temperature=(20.0, 50.0, 1.0), humidity=(10.0, 100.0, 2.0)):
+    """
+    Builds the serving lookup table from a CompiledModel (same probabilities as the
+    sklearn Pipeline, without the per-call pandas overhead) or from any fitted Pipeline
+    with a 'preprocessor' whose 'cat' transformer exposes categories_.
+    The table is indexed by temperature/humidity; derived features follow from them.
+    """
+    if isinstance(model, CompiledModel):
+        categories = dict(zip(model.categorical_features, model.meta["categories"]))
+        predict_proba = lambda columns: model.predict_proba(add_derived_features(columns))
+    else:
+        import pandas as pd
+        preprocessor = model.named_steps['preprocessor']
+        cat_columns = preprocessor.transformers_[1][2]
+        categories = {col: [str(c) for c in cats]
+                      for col, cats in zip(cat_columns, preprocessor.named_transformers_['cat'].categories_)}
+        predict_proba = lambda columns: model.predict_proba(pd.DataFrame(add_derived_features(columns)))
+    return build_risk_table(predict_proba, model.classes_, categories, directory,
+                            temperature=temperature, humidity=humidity)
+
+
+if __name__ == "__main__":
+    # Grid resolution: TEMP_STEP in °C (default 1.0), HUMIDITY_STEP in % (default 2.0)
+    compiled = CompiledModel.load(os.path.join(script_dir, "model_compiled"))
+    risk_table = export_risk_table(
+        compiled,
+        temperature=(20.0, 50.0, float(os.getenv("TEMP_STEP", "1.0"))),
+        humidity=(10.0, 100.0, float(os.getenv("HUMIDITY_STEP", "2.0")))
+    )
+    print(f"Risk table {risk_table.table.shape} saved to {RISK_TABLE_DIR}")
+    print(json.dumps(risk_table.error_report, indent=4))
+    violations = error_violations(risk_table.error_report)
+    if violations:
+        print(f"Warning: out of the default serving bounds, the API will use the live model: {', '.join(violations)}")
@@ -0,0 +1,140 @@
+import json
+import os
+import sys
+import time
+import numpy as np
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(script_dir, '..', 'services'))
+from inference_engine import CompiledModel
+
+
+def compile_pipeline(clf):
+    """
+    Flattens a fitted preprocessor + RandomForest Pipeline into contiguous arrays.
+    Node indices are global across all trees; leaves loop back to themselves.
+    """
+    preprocessor = clf.named_steps['preprocessor']
+    forest = clf.named_steps['classifier']
+
+    num_name, scaler, numerical_features = preprocessor.transformers_[0]
+    cat_name, ohe, categorical_features = preprocessor.transformers_[1]
+
+    features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+    offset = 0
+    max_depth = 0
+    for estimator in forest.estimators_:
+        tree = estimator.tree_
+        is_leaf = tree.children_left == -1
+        node_ids = np.arange(tree.node_count)
+
+        roots.append(offset)
+        features.append(np.where(is_leaf, 0, tree.feature))
+        thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+        lefts.append(np.where(is_leaf, node_ids, tree.children_left) + offset)
+        rights.append(np.where(is_leaf, node_ids, tree.children_right) + offset)
+
+        value = tree.value[:, 0, :]
+        values.append(value / value.sum(axis=1, keepdims=True))
+
+        offset += tree.node_count
+        max_depth = max(max_depth, tree.max_depth)
+
+    left = np.concatenate(lefts).astype(np.int32)
+    right = np.concatenate(rights).astype(np.int32)
+    arrays = {
+        "mean": np.asarray(scaler.mean_, dtype=np.float64),
+        "scale": np.asarray(scaler.scale_, dtype=np.float64),
+        "feature": np.concatenate(features).astype(np.int32),
+        "threshold": np.concatenate(thresholds).astype(np.float64),
+        "children": np.column_stack([left, right]).ravel(),
+        "is_leaf": left == np.arange(offset),
+        "value": np.concatenate(values).astype(np.float64),
+        "roots": np.asarray(roots, dtype=np.int32)
+    }
+    meta = {
+        "classes": [str(c) for c in forest.classes_],
+        "numerical_features": list(numerical_features),
+        "categorical_features": list(categorical_features),
+        "categories": [[str(c) for c in cats] for cats in ohe.categories_],
+        "n_features": int(forest.n_features_in_),
+        "n_trees": len(forest.estimators_),
+        "n_nodes": int(offset),
+        "max_depth": int(max_depth)
+    }
+    return arrays, meta
+
+
+def export_compiled_model(clf, directory):
+    """
+    Writes one .npy per array plus meta.json, then reloads it memory-mapped exactly as the API will.
+    """
+    arrays, meta = compile_pipeline(clf)
+    CompiledModel(arrays, meta).save(directory)
+    return CompiledModel.load(directory)
+
+
+def measure_latency(fn, repeats):
+    """
+    p50/p99 wall time of fn() in milliseconds.
+    """
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        "p50_ms": round(float(np.percentile(timings, 50)), 4),
+        "p99_ms": round(float(np.percentile(timings, 99)), 4)
+    }
+
+
+def compare_with_sklearn(clf, compiled, X, repeats=200, batch_size=1000, atol=1e-9):
+    """
+    Checks the compiled model against clf.predict_proba on X (a DataFrame) and
+    reports single-row and batch latency of both paths.
+    Numeric columns are compared as float64, which is what the API feeds both paths.
+    """
+    X = X.astype({col: np.float64 for col in compiled.numerical_features})
+    expected = clf.predict_proba(X)
+    actual = compiled.predict_proba({col: X[col].to_numpy() for col in X.columns})
+    max_abs_diff = float(np.max(np.abs(expected - actual)))
+    if max_abs_diff > atol:
+        raise AssertionError(f"Compiled model diverges from sklearn (max |diff| = {max_abs_diff})")
+
+    single_df = X.iloc[:1]
+    single_cols = {col: [single_df[col].iloc[0]] for col in X.columns}
+    batch_df = X.iloc[:batch_size]
+    batch_cols = {col: batch_df[col].to_numpy() for col in X.columns}
+    batch_repeats = max(5, repeats // 10)
+
+    return {
+        "max_abs_diff": max_abs_diff,
+        "rows_checked": len(X),
+        "batch_size": len(batch_df),
+        "sklearn": {
+            "single": measure_latency(lambda: clf.predict_proba(single_df), repeats),
+            "batch": measure_latency(lambda: clf.predict_proba(batch_df), batch_repeats)
+        },
+        "compiled": {
+            "single": measure_latency(lambda: compiled.predict_proba(single_cols), repeats),
+            "batch": measure_latency(lambda: compiled.predict_proba(batch_cols), batch_repeats)
+        }
+    }
+
+
+if __name__ == "__main__":
+    # Re-export an already trained model.pkl without retraining
+    import joblib
+    import pandas as pd
+    from heat_features import add_derived_features
+    from train import FEATURES, categorical_features, input_features
+
+    clf = joblib.load(os.path.join(script_dir, "model.pkl"))
+    compiled = export_compiled_model(clf, os.path.join(script_dir, "model_compiled"))
+    df = pd.read_csv(os.path.join(script_dir, '..', 'data', 'heat_stress_dataset.csv'))
+    # Derived features computed the way the API does; the model's own column list decides
+    # which of them it was trained on
+    columns = add_derived_features({col: df[col].to_numpy() for col in input_features + categorical_features})
+    X = pd.DataFrame(columns)[[col for col in FEATURES if col in clf.feature_names_in_]]
+    print(json.dumps(compare_with_sklearn(clf, compiled, X), indent=4))
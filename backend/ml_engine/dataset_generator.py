@@ -1,109 +1,155 @@
 # d:/AIML/backend/ml_engine/dataset_generator.py
 import pandas as pd
 import numpy as np
-import random
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
 
-def calculate_heat_index(temp_c, humidity):
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'services'))
+from heat_features import heat_index
+
+ACTIVITIES = ['light', 'moderate', 'heavy', 'extreme']
+HYDRATIONS = ['well', 'moderate', 'poor']
+AGE_GROUPS = ['18-25', '26-35', '36-45', '46-55', '55+']
+
+def generate_synthetic_data(n_samples=2000, seed=None, temp_mean=32, temp_sd=5, humidity_mean=60, humidity_sd=15):
+    """
+    Vectorized generator: every column is drawn and derived over whole arrays.
+    seed may be an int, a np.random.SeedSequence or None (non-reproducible).
+    The temperature/humidity distribution can be shifted for location-specific scenarios.
+    """
+    rng = np.random.default_rng(seed)
+
+    # Semi-realistic weather distribution, clamped
+    temp = np.clip(rng.normal(temp_mean, temp_sd, n_samples), 20, 50)
+    humidity = np.clip(rng.normal(humidity_mean, humidity_sd, n_samples), 10, 100)
+
+    exposure = rng.integers(1, 13, n_samples) # 1 to 12 hours
+    activity_idx = rng.integers(0, len(ACTIVITIES), n_samples)
+    hydration_idx = rng.integers(0, len(HYDRATIONS), n_samples)
+    age_idx = rng.integers(0, len(AGE_GROUPS), n_samples)
+
+    # Calculate derived metrics
+    hi = heat_index(temp, humidity)
+
+    # Logical Risk Score Calculation (The "Ground Truth" logic)
+    # Base risk from Heat Index: Safe / Caution / Extreme Caution / Danger / Extreme Danger
+    score = np.select([hi < 27, hi < 32, hi < 39, hi < 48], [0.1, 0.25, 0.45, 0.7], default=0.9)
+
+    # Modifiers (indexed by position in ACTIVITIES / HYDRATIONS / AGE_GROUPS)
+    score += np.array([0.0, 0.1, 0.2, 0.35])[activity_idx]
+
+    score += np.where(exposure > 4, 0.1, 0.0)
+    score += np.where(exposure > 8, 0.2, 0.0)
+
+    score += np.array([0.0, 0.1, 0.25])[hydration_idx]
+
+    score += np.array([0.0, 0.0, 0.0, 0.15, 0.15])[age_idx]
+
+    # Normalize score 0-1
+    score = np.minimum(0.99, score)
+
+    # Add some noise/randomness
+    score = np.clip(score + rng.normal(0, 0.05, n_samples), 0, 1)
+
+    # Labeling
+    label = np.select([score < 0.4, score < 0.7, score < 0.85], ['low', 'moderate', 'high'], default='extreme')
+
+    return pd.DataFrame({
+        'temperature': np.round(temp, 1),
+        'humidity': np.round(humidity, 1),
+        'exposure_hours': exposure,
+        'activity_level': np.array(ACTIVITIES, dtype=object)[activity_idx],
+        'hydration_level': np.array(HYDRATIONS, dtype=object)[hydration_idx],
+        'age_group': np.array(AGE_GROUPS, dtype=object)[age_idx],
+        'heat_index': np.round(hi, 1),
+        'risk_score': np.round(score, 3),
+        'risk_label': label.astype(object)
+    })
+
+def _generate_chunk(args):
+    n_samples, seed, scenario = args
+    return generate_synthetic_data(n_samples, seed=seed, **scenario)
+
+def write_dataset(output_path, n_samples, chunk_size=1_000_000, seed=42, workers=1, fmt=None, **scenario):
     """
-    Calculates Heat Index (feel-like temperature) using NOAA formula adaptation.
+    Streams n_samples rows to CSV or Parquet chunk by chunk, so memory stays flat at
+    roughly one chunk per worker. Each chunk gets its own child seed, so the output is
+    identical for a given seed regardless of the number of workers.
     """
-    # Convert C to F for formula
-    T = (temp_c * 9/5) + 32
-    RH = humidity
-    
-    HI = 0.5 * (T + 61.0 + ((T-68.0)*1.2) + (RH*0.094))
-    
-    if HI >= 80:
-        HI = -42.379 + 2.04901523*T + 10.14333127*RH - .22475541*T*RH - .00683783*T*T - .05481717*RH*RH + .00122874*T*T*RH + .00085282*T*RH*RH - .00000199*T*T*RH*RH
-        
-    # Convert back to C
-    return (HI - 32) * 5/9
-
-def generate_synthetic_data(n_samples=2000):
-    data = []
-    
-    activities = ['light', 'moderate', 'heavy', 'extreme']
-    hydrations = ['well', 'moderate', 'poor']
-    age_groups = ['18-25', '26-35', '36-45', '46-55', '55+']
-    
-    for _ in range(n_samples):
-        # Semi-realistic weather distribution
-        temp = np.random.normal(32, 5) # Mean 32C, SD 5
-        humidity = np.random.normal(60, 15) # Mean 60%, SD 15
-        
-        # Clamp values
-        temp = max(20, min(50, temp))
-        humidity = max(10, min(100, humidity))
-        
-        exposure = np.random.randint(1, 13) # 1 to 12 hours
-        activity = np.random.choice(activities)
-        hydration = np.random.choice(hydrations)
-        age = np.random.choice(age_groups)
-        
-        # Calculate derived metrics
-        hi = calculate_heat_index(temp, humidity)
-        
-        # Logical Risk Score Calculation (The "Ground Truth" logic)
-        # Base risk from Heat Index
-        score = 0
-        
-        if hi < 27: score += 0.1 # Safe
-        elif hi < 32: score += 0.25 # Caution
-        elif hi < 39: score += 0.45 # Extreme Caution (shifted down from 0.6)
-        elif hi < 48: score += 0.7 # Danger
-        else: score += 0.9 # Extreme Danger
-        
-        # Modifiers
-        if activity == 'moderate': score += 0.1
-        elif activity == 'heavy': score += 0.2
-        elif activity == 'extreme': score += 0.35
-        
-        if exposure > 4: score += 0.1
-        if exposure > 8: score += 0.2
-        
-        if hydration == 'poor': score += 0.25
-        elif hydration == 'moderate': score += 0.1
-        
-        if age in ['46-55', '55+']: score += 0.15
-        
-        # Normalize score 0-1
-        score = min(0.99, score)
-        
-        # Add some noise/randomness
-        score += np.random.normal(0, 0.05)
-        score = max(0, min(1, score))
-        
-        # Labeling
-        if score < 0.4: label = 'low'
-        elif score < 0.7: label = 'moderate'
-        elif score < 0.85: label = 'high'
-        else: label = 'extreme'
-        
-        data.append({
-            'temperature': round(temp, 1),
-            'humidity': round(humidity, 1),
-            'exposure_hours': exposure,
-            'activity_level': activity,
-            'hydration_level': hydration,
-            'age_group': age,
-            'heat_index': round(hi, 1),
-            'risk_score': round(score, 3),
-            'risk_label': label
-        })
-        
-    return pd.DataFrame(data)
+    fmt = fmt or ('parquet' if output_path.endswith('.parquet') else 'csv')
+    n_chunks = (n_samples + chunk_size - 1) // chunk_size
+    seeds = np.random.SeedSequence(seed).spawn(n_chunks)
+    tasks = [(min(chunk_size, n_samples - i * chunk_size), seeds[i], scenario) for i in range(n_chunks)]
+
+    if fmt == 'parquet':
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Parquet output requires pyarrow (pip install pyarrow)")
+
+    writer = None
+    written = 0
+
+    def write(chunk):
+        nonlocal writer, written
+        if fmt == 'parquet':
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(output_path, table.schema)
+            writer.write_table(table)
+        else:
+            chunk.to_csv(output_path, mode='w' if written == 0 else 'a', header=written == 0, index=False)
+        written += len(chunk)
+        print(f"  {written:,}/{n_samples:,} rows")
+
+    try:
+        if workers > 1:
+            # Keep at most 2 chunks per worker in flight to bound memory
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                window = workers * 2
+                pending = [pool.submit(_generate_chunk, task) for task in tasks[:window]]
+                next_task = window
+                while pending:
+                    chunk = pending.pop(0).result()
+                    if next_task < len(tasks):
+                        pending.append(pool.submit(_generate_chunk, tasks[next_task]))
+                        next_task += 1
+                    write(chunk)
+        else:
+            for task in tasks:
+                write(_generate_chunk(task))
+    finally:
+        if writer is not None:
+            writer.close()
+
+    return written
 
 if __name__ == "__main__":
-    import os
-    print("Generating synthetic dataset...")
-    df = generate_synthetic_data(5000)
-    
     # Ensure we save to backend/data relative to this script
     script_dir = os.path.dirname(os.path.abspath(__file__))
-    output_dir = os.path.join(script_dir, '..', 'data')
-    os.makedirs(output_dir, exist_ok=True)
-    
-    output_path = os.path.join(output_dir, "heat_stress_dataset.csv")
-    df.to_csv(output_path, index=False)
-    print(f"Dataset saved to {output_path}")
-    print(df['risk_label'].value_counts())
+    default_output = os.path.join(script_dir, '..', 'data', "heat_stress_dataset.csv")
+
+    parser = argparse.ArgumentParser(description="Generate the synthetic heat stress dataset.")
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--output", default=default_output, help=".csv or .parquet")
+    parser.add_argument("--chunk-size", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--temp-mean", type=float, default=32)
+    parser.add_argument("--temp-sd", type=float, default=5)
+    parser.add_argument("--humidity-mean", type=float, default=60)
+    parser.add_argument("--humidity-sd", type=float, default=15)
+    args = parser.parse_args()
+
+    print("Generating synthetic dataset...")
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    write_dataset(args.output, args.rows, chunk_size=args.chunk_size, seed=args.seed, workers=args.workers,
+                  temp_mean=args.temp_mean, temp_sd=args.temp_sd,
+                  humidity_mean=args.humidity_mean, humidity_sd=args.humidity_sd)
+    print(f"Dataset saved to {args.output}")
+
+    if args.rows <= args.chunk_size and not args.output.endswith('.parquet'):
+        print(pd.read_csv(args.output)['risk_label'].value_counts())
@@ -0,0 +1,220 @@
+# Accuracy vs serving cost of candidate models, written to metrics.json["model_sweep"]:
+#   python backend/ml_engine/evaluate_models.py --trees 10 25 50 100 200 --depths none 8 12 16
+#   python backend/ml_engine/evaluate_models.py --min-accuracy 0.85 --select [--publish]
+# Every candidate is trained on the same split as train.py and measured the way the API would
+# serve it: RandomForests through the compiled array engine, other families through sklearn.
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import joblib
+import numpy as np
+from sklearn.model_selection import train_test_split
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(script_dir, '..', 'services'))
+from compile_model import export_compiled_model, measure_latency
+from inference_engine import CompiledModel
+from train import FEATURES, build_pipeline, load_dataset
+
+FAMILIES = ('rf', 'hgb', 'logreg')
+
+
+def candidate_configs(families, trees, depths):
+    """
+    One config per (family, trees, depth); logistic regression has neither, so it is a single config.
+    """
+    configs = []
+    for family in families:
+        if family == 'logreg':
+            configs.append({"name": "logreg", "backend": family, "n_estimators": None, "max_depth": None})
+            continue
+        for n_estimators in trees:
+            for max_depth in depths:
+                name = f"{family}-{n_estimators}" + (f"-d{max_depth}" if max_depth else "")
+                configs.append({"name": name, "backend": family, "n_estimators": n_estimators, "max_depth": max_depth})
+    return configs
+
+
+def directory_size(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+def evaluate(config, X_train, y_train, X_test, y_test, workdir, n_jobs=-1, repeats=200, batch_size=1000):
+    """
+    Fits one candidate and reports accuracy, fit time, single-row / batch inference latency,
+    serialized size and load time (load plus one prediction, as a worker does on startup).
+    """
+    clf = build_pipeline(config["backend"], n_jobs=n_jobs, n_estimators=config["n_estimators"] or 100,
+                         max_depth=config["max_depth"])
+    start = time.perf_counter()
+    clf.fit(X_train, y_train)
+    fit_s = time.perf_counter() - start
+    accuracy = float(np.mean(clf.predict(X_test) == y_test.to_numpy()))
+
+    pickle_path = os.path.join(workdir, f"{config['name']}.pkl")
+    joblib.dump(clf, pickle_path)
+
+    # The API feeds numeric columns as float64
+    X = X_test.astype({col: np.float64 for col in X_test.columns if X_test[col].dtype.kind == 'f'})
+    if config["backend"] == 'rf':
+        engine = "compiled"
+        artifact = os.path.join(workdir, config["name"])
+        model = export_compiled_model(clf, artifact)
+        single = {col: [X[col].iloc[0]] for col in X.columns}
+        batch = {col: X[col].to_numpy()[:batch_size] for col in X.columns}
+        load = lambda: CompiledModel.load(artifact).predict_proba(single)
+    else:
+        engine = "sklearn"
+        artifact = pickle_path
+        model = clf
+        single = X.iloc[:1]
+        batch = X.iloc[:batch_size]
+        load = lambda: joblib.load(artifact).predict_proba(single)
+
+    single_latency = measure_latency(lambda: model.predict_proba(single), repeats)
+    batch_latency = measure_latency(lambda: model.predict_proba(batch), max(5, repeats // 10))
+    load_ms = measure_latency(load, 5)["p50_ms"]
+
+    return dict(config, **{
+        "engine": engine,
+        "accuracy": round(accuracy, 4),
+        "fit_s": round(fit_s, 3),
+        "single_p50_ms": single_latency["p50_ms"],
+        "single_p99_ms": single_latency["p99_ms"],
+        "batch_p50_ms": batch_latency["p50_ms"],
+        "batch_rows": min(batch_size, len(X)),
+        "size_mb": round(directory_size(artifact) / 1e6, 3),
+        "pickle_mb": round(os.path.getsize(pickle_path) / 1e6, 3),
+        "load_ms": round(load_ms, 3)
+    })
+
+
+def pareto_front(results):
+    """
+    Names of the configs no other config beats on accuracy, single-row p50 latency and size at once.
+    """
+    def dominates(a, b):
+        no_worse = (a["accuracy"] >= b["accuracy"] and a["single_p50_ms"] <= b["single_p50_ms"]
+                    and a["size_mb"] <= b["size_mb"])
+        better = (a["accuracy"] > b["accuracy"] or a["single_p50_ms"] < b["single_p50_ms"]
+                  or a["size_mb"] < b["size_mb"])
+        return no_worse and better
+
+    return [r["name"] for r in results if not any(dominates(other, r) for other in results)]
+
+
+def select_model(results, min_accuracy, max_single_ms=None):
+    """
+    Smallest serialized model at or above min_accuracy (and within the single-row p50 latency
+    budget, if given); ties go to the faster one. None if no config qualifies.
+    """
+    eligible = [r for r in results if r["accuracy"] >= min_accuracy
+                and (max_single_ms is None or r["single_p50_ms"] <= max_single_ms)]
+    if not eligible:
+        return None
+    return min(eligible, key=lambda r: (r["size_mb"], r["single_p50_ms"]))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Accuracy vs latency / size sweep over candidate models.")
+    parser.add_argument("--data", default=os.path.join(script_dir, '..', 'data', 'heat_stress_dataset.csv'))
+    parser.add_argument("--families", nargs="+", choices=FAMILIES, default=list(FAMILIES))
+    parser.add_argument("--trees", nargs="+", type=int, default=[10, 25, 50, 100, 200],
+                        help="Trees (rf) / boosting iterations (hgb)")
+    parser.add_argument("--depths", nargs="+", default=["none", "8", "12", "16"], help="Max depths, 'none' = unlimited")
+    parser.add_argument("--test-size", type=float, default=0.2)
+    parser.add_argument("--n-jobs", type=int, default=-1)
+    parser.add_argument("--repeats", type=int, default=200, help="Single-row predictions timed per config")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--min-accuracy", type=float, default=None,
+                        help="Accuracy floor for picking the smallest model (default: best accuracy - 0.01)")
+    parser.add_argument("--max-single-ms", type=float, default=None,
+                        help="Only pick models whose single-row p50 latency is within this budget")
+    parser.add_argument("--select", action="store_true",
+                        help="Retrain the picked config with train.py (model.pkl, compiled model, risk table)")
+    parser.add_argument("--publish", action="store_true", help="With --select, publish it to the model registry")
+    args = parser.parse_args(argv)
+
+    depths = [None if d.lower() == "none" else int(d) for d in args.depths]
+    configs = candidate_configs(args.families, args.trees, depths)
+
+    df = load_dataset(args.data)
+    X_train, X_test, y_train, y_test = train_test_split(df[FEATURES], df['risk_label'].astype(str),
+                                                        test_size=args.test_size, random_state=42)
+    print(f"Evaluating {len(configs)} configs on {len(X_train):,} train / {len(X_test):,} test rows")
+
+    results = []
+    workdir = tempfile.mkdtemp(prefix="heatshield_sweep_")
+    try:
+        for config in configs:
+            result = evaluate(config, X_train, y_train, X_test, y_test, workdir, n_jobs=args.n_jobs,
+                              repeats=args.repeats, batch_size=args.batch_size)
+            results.append(result)
+            print(f"  {result['name']:<16} acc {result['accuracy']:.4f}  single p50 {result['single_p50_ms']:.3f}ms  "
+                  f"batch p50 {result['batch_p50_ms']:.2f}ms  {result['size_mb']:.2f}MB  load {result['load_ms']:.1f}ms")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    front = pareto_front(results)
+    min_accuracy = args.min_accuracy
+    if min_accuracy is None:
+        min_accuracy = round(max(r["accuracy"] for r in results) - 0.01, 4)
+    selected = select_model(results, min_accuracy, args.max_single_ms)
+
+    print("\nPareto front (accuracy / single-row latency / size):")
+    for r in sorted((r for r in results if r["name"] in front), key=lambda r: r["size_mb"]):
+        print(f"  {r['name']:<16} acc {r['accuracy']:.4f}  single p50 {r['single_p50_ms']:.3f}ms  {r['size_mb']:.2f}MB")
+    budget = f" and single p50 <= {args.max_single_ms}ms" if args.max_single_ms is not None else ""
+    if selected is None:
+        print(f"\nNo config reaches accuracy {min_accuracy}{budget}")
+    else:
+        print(f"\nSmallest model with accuracy >= {min_accuracy}{budget}: {selected['name']} "
+              f"({selected['accuracy']:.4f}, {selected['size_mb']:.2f}MB, single p50 {selected['single_p50_ms']:.3f}ms)")
+
+    sweep = {
+        "evaluated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "train_rows": len(X_train),
+        "test_rows": len(X_test),
+        "min_accuracy": min_accuracy,
+        "max_single_ms": args.max_single_ms,
+        "selected": selected["name"] if selected else None,
+        "pareto": front,
+        "configs": results
+    }
+
+    # Written before --select retrains: train.py keeps model_sweep when it rewrites metrics.json
+    metrics_path = os.path.join(script_dir, "metrics.json")
+    metrics = {}
+    if os.path.exists(metrics_path):
+        with open(metrics_path) as f:
+            metrics = json.load(f)
+    metrics["model_sweep"] = sweep
+    with open(metrics_path, 'w') as f:
+        json.dump(metrics, f, indent=4, default=str)
+    print(f"Sweep saved to {metrics_path}")
+
+    if args.select and selected is not None:
+        from train import main as train
+        train_args = ["--data", args.data, "--backend", selected["backend"], "--n-jobs", str(args.n_jobs),
+                      "--test-size", str(args.test_size)]
+        if selected["n_estimators"]:
+            train_args += ["--n-estimators", str(selected["n_estimators"])]
+        if selected["max_depth"]:
+            train_args += ["--max-depth", str(selected["max_depth"])]
+        if args.publish:
+            train_args.append("--publish")
+        print(f"\nTraining {selected['name']}: train.py {' '.join(train_args)}")
+        if train(train_args) != 0:
+            return 1
+    return 0 if selected is not None else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,43 @@
+# Publishes the artifacts of the last training run (model.pkl, model_compiled/, risk_table/,
+# metrics.json) as a new version in the model registry. Running servers pick it up without
+# a restart (MODEL_RELOAD_INTERVAL).
+#   python backend/ml_engine/publish_model.py                  # publish and activate
+#   python backend/ml_engine/publish_model.py --list
+#   python backend/ml_engine/publish_model.py --activate <version>   # roll back / forward
+import argparse
+import os
+import sys
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(script_dir, '..', 'services'))
+from model_registry import ModelRegistry
+
+REGISTRY_DIR = os.getenv("MODEL_REGISTRY_DIR", os.path.join(script_dir, "registry"))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage the versioned model registry.")
+    parser.add_argument("--registry", default=REGISTRY_DIR)
+    parser.add_argument("--source", default=script_dir, help="Directory holding the trained artifacts")
+    parser.add_argument("--no-activate", action="store_true", help="Publish without serving it (e.g. for shadow mode)")
+    parser.add_argument("--activate", metavar="VERSION", help="Serve an already published version")
+    parser.add_argument("--list", action="store_true")
+    args = parser.parse_args(argv)
+
+    registry = ModelRegistry(args.registry)
+    if args.list:
+        current = registry.current_version()
+        for version in registry.versions():
+            print(f"{'*' if version == current else ' '} {version}")
+        return 0
+    if args.activate:
+        registry.activate(args.activate)
+        print(f"Activated {args.activate}")
+        return 0
+
+    os.makedirs(args.registry, exist_ok=True)
+    version = registry.publish(args.source, activate=not args.no_activate)
+    print(f"Published {version}{'' if args.no_activate else ' (active)'} to {args.registry}")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,173 @@
+# Scores a historical exposure log (CSV, Parquet or NDJSON) with the served model, chunk by
+# chunk, for audits. Rows go through the same risk scoring as /api/predict, so the
+# riskCategory / riskPercentage columns match what the API returned for the same inputs.
+#   python backend/ml_engine/score_bulk.py exposures.csv scored.parquet --workers 4
+#   python backend/ml_engine/score_bulk.py exposures.ndjson -            # NDJSON on stdout
+# Input columns may use the API's request names (exposureDuration, activityLevel, ...) or the
+# model's feature names; every input column is passed through to the output.
+import argparse
+import contextlib
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(script_dir, '..', 'services'))
+from model_registry import ModelRegistry, load_current_bundle
+from risk_scoring import FEATURE_COLUMNS, INPUT_FIELDS, risk_percentage, score_probabilities
+
+REGISTRY_DIR = os.getenv("MODEL_REGISTRY_DIR", os.path.join(script_dir, "registry"))
+USE_RISK_TABLE = os.getenv("USE_RISK_TABLE", "false").lower() == "true"
+
+_bundle = None # per worker process
+
+
+def _format_of(path):
+    if path == '-' or path.endswith(('.ndjson', '.jsonl', '.json')):
+        return 'ndjson'
+    if path.endswith('.parquet'):
+        return 'parquet'
+    return 'csv'
+
+
+def read_chunks(path, chunk_size):
+    """
+    Yields DataFrames of at most chunk_size rows; the whole file is never in memory.
+    """
+    fmt = _format_of(path)
+    if fmt == 'parquet':
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Parquet input requires pyarrow (pip install pyarrow)")
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    elif fmt == 'ndjson':
+        yield from pd.read_json(sys.stdin if path == '-' else path, lines=True, chunksize=chunk_size)
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size)
+
+
+def _init_worker(registry_dir, load_options):
+    global _bundle
+    # Keep stdout clean for '-' output
+    with contextlib.redirect_stdout(sys.stderr):
+        _bundle = load_current_bundle(ModelRegistry(registry_dir), script_dir, FEATURE_COLUMNS, **load_options)
+
+
+def _worker_version():
+    return _bundle.version
+
+
+def score_chunk(chunk):
+    """
+    Adds riskCategory and riskPercentage to a chunk, using the worker's model bundle.
+    """
+    features = chunk.rename(columns={field: column for field, column in INPUT_FIELDS.items()
+                                     if column not in chunk.columns})
+    missing = [column for column in FEATURE_COLUMNS if column not in features.columns]
+    if missing:
+        raise ValueError(f"Input is missing columns: {', '.join(missing)}")
+
+    columns = {column: features[column].tolist() for column in FEATURE_COLUMNS}
+    risk_labels, risk_scores = score_probabilities(_bundle.classes_, _bundle.predict_proba(columns))
+    chunk = chunk.copy()
+    chunk['riskCategory'] = risk_labels
+    chunk['riskPercentage'] = [risk_percentage(score) for score in risk_scores]
+    return chunk
+
+
+def score_file(input_path, output_path, chunk_size=100_000, workers=1, registry_dir=REGISTRY_DIR,
+               load_options=None):
+    """
+    Streams input_path through the model into output_path. With workers > 1, chunks are
+    scored in a process pool with at most 2 chunks per worker in flight, and written in
+    input order. Returns (rows, model version).
+    """
+    # The compiled engine is tuned for request-sized batches; on 100k-row chunks the sklearn
+    # pipeline is ~3x faster and returns the same probabilities. The reported version is the
+    # one the API reports for the same artifacts either way (see load_bundle)
+    load_options = load_options or {"use_compiled": False, "use_risk_table": USE_RISK_TABLE}
+    fmt = _format_of(output_path)
+    if fmt == 'parquet':
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Parquet output requires pyarrow (pip install pyarrow)")
+
+    writer = None
+    written = 0
+    started = time.perf_counter()
+    out = sys.stdout if output_path == '-' else None
+
+    def write(chunk):
+        nonlocal writer, written
+        if fmt == 'parquet':
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(output_path, table.schema)
+            writer.write_table(table)
+        elif fmt == 'ndjson':
+            text = chunk.to_json(orient='records', lines=True)
+            if out is not None:
+                out.write(text if text.endswith('\n') else text + '\n')
+            else:
+                with open(output_path, 'w' if written == 0 else 'a') as f:
+                    f.write(text if text.endswith('\n') else text + '\n')
+        else:
+            chunk.to_csv(output_path, mode='w' if written == 0 else 'a', header=written == 0, index=False)
+        written += len(chunk)
+        elapsed = time.perf_counter() - started
+        print(f"  {written:,} rows ({written / elapsed:,.0f} rows/s)", file=sys.stderr)
+
+    chunks = read_chunks(input_path, chunk_size)
+    try:
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(registry_dir, load_options)) as pool:
+                version = pool.submit(_worker_version).result()
+                window = workers * 2
+                pending = []
+                for chunk in chunks:
+                    pending.append(pool.submit(score_chunk, chunk))
+                    if len(pending) >= window:
+                        write(pending.pop(0).result())
+                while pending:
+                    write(pending.pop(0).result())
+        else:
+            _init_worker(registry_dir, load_options)
+            version = _bundle.version
+            for chunk in chunks:
+                write(score_chunk(chunk))
+    finally:
+        if writer is not None:
+            writer.close()
+
+    return written, version
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score a historical exposure log with the served model.")
+    parser.add_argument("input", help="CSV, Parquet or NDJSON file ('-' reads NDJSON from stdin)")
+    parser.add_argument("output", help="Output file, format from the extension ('-' writes NDJSON to stdout)")
+    parser.add_argument("--chunk-size", type=int, default=100_000)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--registry", default=REGISTRY_DIR)
+    parser.add_argument("--compiled", action="store_true", help="Use the compiled inference engine instead of model.pkl")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    rows, version = score_file(args.input, args.output, args.chunk_size, args.workers, args.registry,
+                               {"use_compiled": args.compiled, "use_risk_table": USE_RISK_TABLE})
+    elapsed = time.perf_counter() - started
+    print(f"Scored {rows:,} rows in {elapsed:.1f}s ({rows / max(elapsed, 1e-9):,.0f} rows/s) "
+          f"with model {version}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -2,125 +2,337 @@
 import pandas as pd
 import numpy as np
 from sklearn.model_selection import train_test_split
-from sklearn.ensemble import RandomForestClassifier
+from sklearn.ensemble import RandomForestClassifier, HistGradientBoostingClassifier
+from sklearn.linear_model import LogisticRegression
 from sklearn.compose import ColumnTransformer
-from sklearn.preprocessing import OneHotEncoder, StandardScaler
+from sklearn.preprocessing import OneHotEncoder, OrdinalEncoder, StandardScaler
 from sklearn.pipeline import Pipeline
 from sklearn.metrics import classification_report
 import joblib
 
+import argparse
+import json
 import os
+import resource
+import shutil
+import sys
+import time
 
-# Load Data
 script_dir = os.path.dirname(os.path.abspath(__file__))
-data_path = os.path.join(script_dir, '..', 'data', 'heat_stress_dataset.csv')
-print(f"Loading data from {data_path}...")
-try:
-    df = pd.read_csv(data_path)
-except FileNotFoundError:
-    print("Error: Dataset not found. Run dataset_generator.py first.")
-    exit(1)
+sys.path.append(os.path.join(script_dir, '..', 'services'))
+from dataset_generator import ACTIVITIES, HYDRATIONS, AGE_GROUPS
+from heat_features import DERIVED_FEATURES, derived_features
 
 # Features and Target
-X = df[['temperature', 'humidity', 'exposure_hours', 'activity_level', 'hydration_level', 'age_group']]
-y = df['risk_label']
-
-# Preprocessing
 categorical_features = ['activity_level', 'hydration_level', 'age_group']
-numerical_features = ['temperature', 'humidity', 'exposure_hours']
+input_features = ['temperature', 'humidity', 'exposure_hours']
+# Heat index / WBGT are recomputed from temperature and humidity with the same functions the API
+# uses rather than read from the dataset. Training feeds them the float32 columns and serving
+# the raw float64 reading, so values agree to float32 precision (~1e-5 °C), not bit for bit
+numerical_features = input_features + DERIVED_FEATURES
+FEATURES = numerical_features + categorical_features
+RISK_LABELS = ['low', 'moderate', 'high', 'extreme']
+
+# Explicit dtypes: fixed categories keep chunks concatenable without falling back to object,
+# float32 halves the footprint of the continuous columns.
+DTYPES = {
+    'temperature': np.float32,
+    'humidity': np.float32,
+    'exposure_hours': np.int8,
+    'activity_level': pd.CategoricalDtype(ACTIVITIES),
+    'hydration_level': pd.CategoricalDtype(HYDRATIONS),
+    'age_group': pd.CategoricalDtype(AGE_GROUPS),
+    'risk_label': pd.CategoricalDtype(RISK_LABELS)
+}
+COLUMNS = input_features + categorical_features + ['risk_label']
+
+def load_dataset(path, chunksize=1_000_000):
+    """
+    Loads only the training columns with compact dtypes.
+    CSV is read in chunks so the parser never holds the whole file as object strings;
+    Parquet is read through a memory map. Derived features are added as float32 columns.
+    """
+    if path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        df = pq.read_table(path, columns=COLUMNS, memory_map=True).to_pandas().astype(DTYPES)
+    else:
+        chunks = pd.read_csv(path, usecols=COLUMNS, dtype=DTYPES, chunksize=chunksize)
+        df = pd.concat(chunks, ignore_index=True)
 
-preprocessor = ColumnTransformer(
-    transformers=[
-        ('num', StandardScaler(), numerical_features),
-        ('cat', OneHotEncoder(handle_unknown='ignore'), categorical_features)
+    derived = derived_features(df['temperature'].to_numpy(np.float64), df['humidity'].to_numpy(np.float64))
+    for name, values in derived.items():
+        df[name] = values.astype(np.float32)
+    return df
+
+def build_pipeline(backend='rf', n_jobs=-1, n_estimators=100, max_depth=None, random_state=42):
+    """
+    rf and hgb grow n_estimators trees (boosting iterations for hgb) of at most max_depth;
+    logreg is a multinomial logistic regression on the same scaled / one-hot features.
+    """
+    if backend == 'hgb':
+        # Histogram gradient boosting: native categorical splits, scales to millions of rows
+        preprocessor = ColumnTransformer(
+            transformers=[
+                ('num', 'passthrough', numerical_features),
+                ('cat', OrdinalEncoder(handle_unknown='use_encoded_value', unknown_value=-1), categorical_features)
+            ])
+        classifier = HistGradientBoostingClassifier(
+            max_iter=n_estimators,
+            max_depth=max_depth,
+            categorical_features=list(range(len(numerical_features), len(FEATURES))),
+            random_state=random_state)
+    else:
+        preprocessor = ColumnTransformer(
+            transformers=[
+                ('num', StandardScaler(), numerical_features),
+                ('cat', OneHotEncoder(handle_unknown='ignore'), categorical_features)
+            ])
+        if backend == 'logreg':
+            classifier = LogisticRegression(max_iter=1000, random_state=random_state)
+        else:
+            classifier = RandomForestClassifier(n_estimators=n_estimators, max_depth=max_depth,
+                                                n_jobs=n_jobs, random_state=random_state)
+
+    return Pipeline(steps=[
+        ('preprocessor', preprocessor),
+        ('classifier', classifier)
     ])
 
-# Model Pipeline
-clf = Pipeline(steps=[
-    ('preprocessor', preprocessor),
-    ('classifier', RandomForestClassifier(n_estimators=100, random_state=42))
-])
-
-# Train
-print("Training Random Forest model...")
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-clf.fit(X_train, y_train)
-
-# Evaluate
-score = clf.score(X_test, y_test)
-print(f"Model Accuracy: {score:.4f}")
-y_pred = clf.predict(X_test)
-print(classification_report(y_test, y_pred))
-
-# --- AI/ML UPGRADE SECTION ---
-import matplotlib.pyplot as plt
-import seaborn as sns
-import json
-from sklearn.metrics import confusion_matrix
-
-# Ensure plots directory exists
-plots_dir = os.path.join(script_dir, "plots")
-os.makedirs(plots_dir, exist_ok=True)
-
-# 1. Feature Importance
-try:
-    # Access the classifier step
-    rf_model = clf.named_steps['classifier']
-    
-    # Access the preprocessor step
-    preprocessor = clf.named_steps['preprocessor']
-    
-    # Get feature names from OneHotEncoder
-    ohe = preprocessor.named_transformers_['cat']
-    ohe_feature_names = ohe.get_feature_names_out(categorical_features)
-    
-    # Combine with numerical features
-    all_feature_names = numerical_features + list(ohe_feature_names)
-    
-    importances = rf_model.feature_importances_
-    
-    # Create DataFrame for plotting
-    feature_imp_df = pd.DataFrame({'Feature': all_feature_names, 'Importance': importances})
-    feature_imp_df = feature_imp_df.sort_values(by='Importance', ascending=False)
-    
-    plt.figure(figsize=(10, 6))
-    sns.barplot(x='Importance', y='Feature', data=feature_imp_df, palette='viridis')
-    plt.title('Feature Importance (What drives Heat Stress?)')
-    plt.tight_layout()
-    plt.savefig(os.path.join(plots_dir, "feature_importance.png"))
-    print("Saved Feature Importance plot.")
-    
-except Exception as e:
-    print(f"Warning: Could not plot feature importance: {e}")
-
-# 2. Confusion Matrix
-try:
-    cm = confusion_matrix(y_test, y_pred, labels=['low', 'moderate', 'high', 'extreme'])
-    plt.figure(figsize=(8, 6))
-    sns.heatmap(cm, annot=True, fmt='d', cmap='Blues', 
-                xticklabels=['low', 'moderate', 'high', 'extreme'],
-                yticklabels=['low', 'moderate', 'high', 'extreme'])
-    plt.title('Confusion Matrix (Prediction Accuracy)')
-    plt.ylabel('Actual Risk')
-    plt.xlabel('Predicted Risk')
-    plt.tight_layout()
-    plt.savefig(os.path.join(plots_dir, "confusion_matrix.png"))
-    print("Saved Confusion Matrix plot.")
-except Exception as e:
-    print(f"Warning: Could not plot confusion matrix: {e}")
-
-# 3. Save Metrics
-metrics = {
-    "accuracy": score,
-    "classification_report": classification_report(y_test, y_pred, output_dict=True),
-    "model_params": rf_model.get_params()
-}
-metrics_path = os.path.join(script_dir, "metrics.json")
-with open(metrics_path, 'w') as f:
-    json.dump(metrics, f, indent=4)
-print(f"Metrics saved to {metrics_path}")
-
-# Save Model
-model_path = os.path.join(script_dir, "model.pkl")
-joblib.dump(clf, model_path)
-print(f"Model saved to {model_path}")
+def peak_memory_mb():
+    # ru_maxrss is in KB on Linux
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return round(max(own, children) / 1024, 1)
+
+def save_plots(clf, y_test, y_pred, plots_dir):
+    # Plotting libraries are only needed here
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    from sklearn.metrics import confusion_matrix
+
+    # Ensure plots directory exists
+    os.makedirs(plots_dir, exist_ok=True)
+
+    # 1. Feature Importance
+    try:
+        # Access the classifier step
+        rf_model = clf.named_steps['classifier']
+
+        # Access the preprocessor step
+        preprocessor = clf.named_steps['preprocessor']
+
+        # Get feature names from OneHotEncoder
+        ohe = preprocessor.named_transformers_['cat']
+        ohe_feature_names = ohe.get_feature_names_out(categorical_features)
+
+        # Combine with numerical features
+        all_feature_names = numerical_features + list(ohe_feature_names)
+
+        importances = rf_model.feature_importances_
+
+        # Create DataFrame for plotting
+        feature_imp_df = pd.DataFrame({'Feature': all_feature_names, 'Importance': importances})
+        feature_imp_df = feature_imp_df.sort_values(by='Importance', ascending=False)
+
+        plt.figure(figsize=(10, 6))
+        sns.barplot(x='Importance', y='Feature', data=feature_imp_df, palette='viridis')
+        plt.title('Feature Importance (What drives Heat Stress?)')
+        plt.tight_layout()
+        plt.savefig(os.path.join(plots_dir, "feature_importance.png"))
+        print("Saved Feature Importance plot.")
+
+    except Exception as e:
+        print(f"Warning: Could not plot feature importance: {e}")
+
+    # 2. Confusion Matrix
+    try:
+        cm = confusion_matrix(y_test, y_pred, labels=RISK_LABELS)
+        plt.figure(figsize=(8, 6))
+        sns.heatmap(cm, annot=True, fmt='d', cmap='Blues',
+                    xticklabels=RISK_LABELS,
+                    yticklabels=RISK_LABELS)
+        plt.title('Confusion Matrix (Prediction Accuracy)')
+        plt.ylabel('Actual Risk')
+        plt.xlabel('Predicted Risk')
+        plt.tight_layout()
+        plt.savefig(os.path.join(plots_dir, "confusion_matrix.png"))
+        print("Saved Confusion Matrix plot.")
+    except Exception as e:
+        print(f"Warning: Could not plot confusion matrix: {e}")
+
+def export_serving_artifacts(clf, backend, X_test, build_table=True):
+    """
+    Saves model.pkl, compiles the forest for the array-backed inference engine and (optionally)
+    precomputes the risk lookup table. Returns the compiled model / table reports for metrics.json.
+    The previous model's model_compiled/ and risk_table/ are removed before the new model.pkl
+    replaces the old one, and each new directory is written to a staging directory and only
+    moved into place once it was built and checked. Whenever this stops, ml_engine/ therefore
+    holds one model's artifacts, never a new model.pkl next to an old compiled model or table.
+    """
+    from build_risk_table import export_risk_table, RISK_TABLE_DIR
+    from risk_table import error_violations
+
+    compiled_path = os.path.join(script_dir, "model_compiled")
+    for path in (compiled_path, RISK_TABLE_DIR):
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+            print(f"Removed the previous model's {os.path.basename(path)}/")
+
+    # Written whole, then swapped in: a crash never leaves a truncated model.pkl
+    model_path = os.path.join(script_dir, "model.pkl")
+    joblib.dump(clf, model_path + ".tmp")
+    os.replace(model_path + ".tmp", model_path)
+    print(f"Model saved to {model_path}")
+
+    compiled_report = None
+    compiled = None
+    if backend == 'rf':
+        staging = os.path.join(script_dir, ".model_compiled.tmp")
+        try:
+            from compile_model import export_compiled_model, compare_with_sklearn
+            shutil.rmtree(staging, ignore_errors=True)
+            compiled = export_compiled_model(clf, staging)
+            compiled_report = compare_with_sklearn(clf, compiled, X_test)
+            os.rename(staging, compiled_path)
+            print(f"Compiled model saved to {compiled_path} "
+                  f"(max |diff| = {compiled_report['max_abs_diff']}, "
+                  f"single-row p50 {compiled_report['sklearn']['single']['p50_ms']}ms -> "
+                  f"{compiled_report['compiled']['single']['p50_ms']}ms)")
+        except Exception as e:
+            shutil.rmtree(staging, ignore_errors=True)
+            compiled, compiled_report = None, None
+            print(f"Warning: Could not compile model, model.pkl will be served: {e}")
+    else:
+        print("Only RandomForest can be compiled, model.pkl will be served")
+
+    risk_table_report = None
+    if build_table:
+        staging = os.path.join(os.path.dirname(RISK_TABLE_DIR), ".risk_table.tmp")
+        try:
+            print("Building risk lookup table...")
+            shutil.rmtree(staging, ignore_errors=True)
+            risk_table_report = export_risk_table(compiled if compiled is not None else clf, staging).error_report
+            os.rename(staging, RISK_TABLE_DIR)
+            print(f"Risk table saved to {RISK_TABLE_DIR} (label agreement {risk_table_report['label_agreement']:.4f}, "
+                  f"p99 |diff| {risk_table_report['p99_abs_error']}, max |diff| {risk_table_report['max_abs_error']})")
+            violations = error_violations(risk_table_report)
+            if violations:
+                print(f"Warning: risk table out of the default serving bounds, the API will use the live model: "
+                      f"{', '.join(violations)}")
+        except Exception as e:
+            shutil.rmtree(staging, ignore_errors=True)
+            risk_table_report = None
+            print(f"Warning: Could not build risk table: {e}")
+
+    return compiled_report, risk_table_report
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the heat stress risk model.")
+    parser.add_argument("--data", default=os.path.join(script_dir, '..', 'data', 'heat_stress_dataset.csv'),
+                        help="CSV (read in chunks) or Parquet (memory-mapped)")
+    parser.add_argument("--backend", choices=['rf', 'hgb', 'logreg'], default='rf',
+                        help="rf = RandomForest (default), hgb = HistGradientBoosting for large datasets, "
+                             "logreg = LogisticRegression")
+    parser.add_argument("--n-estimators", type=int, default=100, help="Trees (rf) or boosting iterations (hgb)")
+    parser.add_argument("--max-depth", type=int, default=None)
+    parser.add_argument("--n-jobs", type=int, default=-1, help="-1 uses all cores")
+    parser.add_argument("--chunksize", type=int, default=1_000_000)
+    parser.add_argument("--test-size", type=float, default=0.2)
+    parser.add_argument("--no-plots", action="store_true")
+    parser.add_argument("--no-risk-table", action="store_true")
+    parser.add_argument("--publish", action="store_true",
+                        help="Publish the artifacts to the model registry; running servers hot-reload it")
+    args = parser.parse_args(argv)
+
+    timings = {}
+    total_start = time.perf_counter()
+
+    # Load Data
+    print(f"Loading data from {args.data}...")
+    start = time.perf_counter()
+    try:
+        df = load_dataset(args.data, chunksize=args.chunksize)
+    except FileNotFoundError:
+        print("Error: Dataset not found. Run dataset_generator.py first.")
+        return 1
+    timings["load"] = time.perf_counter() - start
+    n_rows = len(df)
+    print(f"Loaded {n_rows:,} rows in {timings['load']:.2f}s")
+
+    X = df[FEATURES]
+    y = df['risk_label'].astype(str)
+    del df
+
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=args.test_size, random_state=42)
+
+    # Train
+    clf = build_pipeline(args.backend, n_jobs=args.n_jobs, n_estimators=args.n_estimators, max_depth=args.max_depth)
+    print(f"Training {type(clf.named_steps['classifier']).__name__} model on {len(X_train):,} rows...")
+    start = time.perf_counter()
+    clf.fit(X_train, y_train)
+    timings["fit"] = time.perf_counter() - start
+
+    # Evaluate
+    start = time.perf_counter()
+    y_pred = clf.predict(X_test)
+    timings["evaluate"] = time.perf_counter() - start
+    score = float(np.mean(y_pred == y_test.to_numpy()))
+    print(f"Model Accuracy: {score:.4f}")
+    print(classification_report(y_test, y_pred))
+
+    # --- AI/ML UPGRADE SECTION ---
+    if not args.no_plots:
+        save_plots(clf, y_test, y_pred, os.path.join(script_dir, "plots"))
+
+    # Serving artifacts: model.pkl, compiled forest + risk lookup table
+    start = time.perf_counter()
+    compiled_report, risk_table_report = export_serving_artifacts(clf, args.backend, X_test,
+                                                                  build_table=not args.no_risk_table)
+    timings["export"] = time.perf_counter() - start
+    timings["total"] = time.perf_counter() - total_start
+
+    # Save Metrics
+    training = {
+        "backend": args.backend,
+        "rows": n_rows,
+        "train_rows": len(X_train),
+        "n_jobs": args.n_jobs,
+        "wall_time_s": {stage: round(seconds, 3) for stage, seconds in timings.items()},
+        "peak_memory_mb": peak_memory_mb(),
+        "throughput_rows_per_s": {
+            "load": round(n_rows / timings["load"]),
+            "fit": round(len(X_train) / timings["fit"]),
+            "predict": round(len(X_test) / timings["evaluate"])
+        }
+    }
+    print(f"Training stats: {training['wall_time_s']}, peak memory {training['peak_memory_mb']} MB")
+
+    metrics = {
+        "accuracy": score,
+        "trained_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "classification_report": classification_report(y_test, y_pred, output_dict=True),
+        "model_params": clf.named_steps['classifier'].get_params(),
+        "training": training,
+        "compiled_model": compiled_report,
+        "risk_table": risk_table_report
+    }
+    metrics_path = os.path.join(script_dir, "metrics.json")
+    # Keep the last evaluate_models.py sweep next to the model it was used to choose
+    if os.path.exists(metrics_path):
+        with open(metrics_path) as f:
+            sweep = json.load(f).get("model_sweep")
+        if sweep is not None:
+            metrics["model_sweep"] = sweep
+    with open(metrics_path, 'w') as f:
+        json.dump(metrics, f, indent=4, default=str)
+    print(f"Metrics saved to {metrics_path}")
+
+    if args.publish:
+        from publish_model import main as publish
+        publish([])
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
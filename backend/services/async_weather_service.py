@@ -0,0 +1,126 @@
+import asyncio
+import os
+import time
+
+import httpx
+
+from circuit_breaker import CircuitBreaker
+from metrics import WEATHER_SECONDS
+
+
+class AsyncWeatherService:
+    """
+    Non-blocking counterpart of WeatherService for the ASGI server (asgi.py).
+    Shares the sync service's cache, cache keys, request/parse logic and mock fallback, and adds:
+    - a pooled httpx.AsyncClient,
+    - a semaphore capping concurrent upstream calls (waiting longer than queue_timeout
+      falls back to mock data instead of piling up),
+    - a circuit breaker that skips the upstream entirely while it keeps failing.
+    """
+
+    def __init__(self, weather_service, max_concurrency=None, queue_timeout=None,
+                 failure_threshold=None, reset_timeout=None):
+        self.sync = weather_service
+        self.max_concurrency = max_concurrency or int(os.getenv("WEATHER_MAX_CONCURRENCY", "20"))
+        self.queue_timeout = queue_timeout or float(os.getenv("WEATHER_QUEUE_TIMEOUT", "1"))
+        self.breaker = CircuitBreaker(
+            failure_threshold=failure_threshold or int(os.getenv("WEATHER_BREAKER_FAILURES", "5")),
+            reset_timeout=reset_timeout or float(os.getenv("WEATHER_BREAKER_RESET", "30"))
+        )
+        self.client = None
+        self._semaphore = None
+        self._inflight = {} # cache key -> asyncio.Future, coalesces concurrent misses
+        self.fallbacks = 0
+
+    async def start(self):
+        self.client = httpx.AsyncClient(
+            timeout=self.sync.timeout,
+            limits=httpx.Limits(max_connections=self.max_concurrency, max_keepalive_connections=self.max_concurrency)
+        )
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+    async def close(self):
+        if self.client is not None:
+            await self.client.aclose()
+
+    async def get_weather(self, location=None, lat=None, lon=None):
+        start = time.perf_counter()
+        if not self.sync.api_key:
+            weather = self.sync._get_mock_weather(location, lat, lon)
+            WEATHER_SECONDS.observe(time.perf_counter() - start, source="mock_data", cache="disabled")
+            return weather
+
+        try:
+            grid = self.sync.grid
+            if grid is not None and lat and lon:
+                self.sync._ensure_refresher()
+                weather = grid.nearest(lat, lon)
+                if weather is not None:
+                    WEATHER_SECONDS.observe(time.perf_counter() - start, source=weather["source"], cache="grid")
+                    return dict(weather)
+
+            key = self.sync._cache_key(location, lat, lon)
+            if self.sync.snapshot is not None:
+                # SQLite read: off the event loop
+                cached = await asyncio.to_thread(self.sync.snapshot.get, key)
+                if cached is not None:
+                    weather, age = cached
+                    self.sync._store_grid(key, weather, age)
+                    WEATHER_SECONDS.observe(time.perf_counter() - start, source=weather["source"], cache="snapshot")
+                    return weather
+
+            cached = self.sync.cache.get(key)
+            if cached is not None:
+                WEATHER_SECONDS.observe(time.perf_counter() - start, source=cached["source"], cache="hit")
+                return dict(cached)
+
+            pending = self._inflight.get(key)
+            outcome = "coalesced"
+            if pending is None:
+                outcome = "miss"
+                self.sync.cache.record_miss()
+                pending = asyncio.ensure_future(self._fetch_weather(key))
+                self._inflight[key] = pending
+                pending.add_done_callback(lambda _: self._inflight.pop(key, None))
+            weather = await asyncio.shield(pending)
+            WEATHER_SECONDS.observe(time.perf_counter() - start, source=weather["source"], cache=outcome)
+            return dict(weather)
+        except Exception as e:
+            self.fallbacks += 1
+            print(f"Weather API Error: {e!r}")
+            WEATHER_SECONDS.observe(time.perf_counter() - start, source="mock_data", cache="error")
+            return self.sync._get_mock_weather(location, lat, lon)
+
+    async def _fetch_weather(self, key):
+        # Checked before queueing for a slot, so an open circuit fails fast
+        if not self.breaker.allow():
+            raise RuntimeError("circuit open")
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.breaker.cancel()
+            raise RuntimeError("upstream concurrency limit reached")
+
+        try:
+            try:
+                response = await self.client.get(self.sync.base_url, params=self.sync._request_params(key))
+                response.raise_for_status()
+                weather = self.sync._parse_weather(response.json())
+            except Exception:
+                self.breaker.record_failure()
+                raise
+            self.breaker.record_success()
+        finally:
+            self._semaphore.release()
+
+        self.sync.cache.set(key, weather)
+        self.sync._store_grid(key, weather)
+        return weather
+
+    def stats(self):
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": len(self._inflight),
+            "fallbacks": self.fallbacks,
+            "circuit_breaker": self.breaker.stats()
+        }
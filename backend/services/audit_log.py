@@ -0,0 +1,274 @@
+import atexit
+import glob
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+
+from metrics import AUDIT_RECORDS
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS audit (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    endpoint TEXT NOT NULL,
+    model_version TEXT,
+    risk_label TEXT,
+    risk_percentage REAL,
+    latency_ms REAL,
+    location TEXT,
+    inputs TEXT NOT NULL,
+    weather TEXT,
+    pid INTEGER
+);
+CREATE INDEX IF NOT EXISTS audit_ts ON audit (ts);
+"""
+POLICIES = ("block", "drop")
+
+
+class AuditLog:
+    """
+    Append-only record of every risk assessment, kept off the request path.
+    record() only puts a tuple on a bounded in-memory queue; a background writer wakes every
+    flush_interval (or once batch_size records are waiting) and drains it in batches, one
+    SQLite transaction (group commit) per batch, into one file per UTC day
+    (audit-YYYY-MM-DD.sqlite in `directory`, WAL mode so several workers can append).
+    When the queue is full, on_full decides: "drop" (default) drops immediately, "block" waits
+    up to block_timeout seconds for room before dropping (only for threaded workers: never
+    call record() on an event loop with it). Dropped records are counted in stats()
+    and the heatshield_audit_records_total metric.
+    """
+
+    def __init__(self, directory=None, max_queue=None, batch_size=None, flush_interval=None,
+                 on_full=None, block_timeout=None):
+        self.directory = directory or os.getenv("AUDIT_LOG_DIR", os.path.join(os.path.dirname(__file__), '..', 'audit'))
+        self.max_queue = max_queue or int(os.getenv("AUDIT_LOG_QUEUE_SIZE", "10000"))
+        self.batch_size = batch_size or int(os.getenv("AUDIT_LOG_BATCH_SIZE", "500"))
+        self.flush_interval = flush_interval or float(os.getenv("AUDIT_LOG_FLUSH_INTERVAL", "1.0"))
+        self.on_full = on_full or os.getenv("AUDIT_LOG_ON_FULL", "drop")
+        self.block_timeout = block_timeout if block_timeout is not None else float(os.getenv("AUDIT_LOG_BLOCK_TIMEOUT", "0.5"))
+        if self.on_full not in POLICIES:
+            raise ValueError(f"AUDIT_LOG_ON_FULL must be one of {', '.join(POLICIES)}")
+
+        self._queue = None
+        self._wake = threading.Event()
+        self._pid = None
+        self._lock = threading.Lock()
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self.last_error = None
+
+    def record(self, endpoint, inputs, weather, risk_label, risk_percentage, model_version, latency_ms):
+        """
+        Queues one assessment. Never raises; the caller's dicts must not be mutated afterwards.
+        """
+        try:
+            self._ensure_writer()
+        except Exception as e:
+            # e.g. the directory cannot be created: the assessment is still served
+            with self._lock:
+                self.dropped += 1
+                self.last_error = str(e)
+            AUDIT_RECORDS.inc(outcome="dropped")
+            return
+        item = (time.time(), endpoint, model_version, risk_label, risk_percentage, latency_ms, inputs, weather)
+        try:
+            if self.on_full == "block":
+                self._queue.put(item, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(item)
+            # The writer is not woken per record: a thread switch per request costs more than the put
+            if self._queue.qsize() >= self.batch_size:
+                self._wake.set()
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            AUDIT_RECORDS.inc(outcome="dropped")
+
+    def flush(self, timeout=None):
+        """
+        Waits until every queued record is on disk. Returns False on timeout.
+        """
+        if self._queue is None or self._pid != os.getpid():
+            return True
+        deadline = None if timeout is None else time.monotonic() + timeout
+        self._wake.set()
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def query(self, start=None, end=None, endpoint=None, model_version=None, risk_label=None,
+              location=None, limit=1000):
+        """
+        Records with start <= ts < end (datetimes or epoch seconds), oldest first, as dicts.
+        Only the daily files overlapping the range are opened, read-only.
+        """
+        start_ts, end_ts = _epoch(start), _epoch(end)
+        clauses, params = [], []
+        for column, op, value in (("ts", ">=", start_ts), ("ts", "<", end_ts), ("endpoint", "=", endpoint),
+                                  ("model_version", "=", model_version), ("risk_label", "=", risk_label),
+                                  ("location", "=", location)):
+            if value is not None:
+                clauses.append(f"{column} {op} ?")
+                params.append(value)
+        sql = "SELECT * FROM audit" + (" WHERE " + " AND ".join(clauses) if clauses else "") + " ORDER BY ts LIMIT ?"
+
+        results = []
+        for path in self.files(start_ts, end_ts):
+            conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, timeout=5)
+            conn.row_factory = sqlite3.Row
+            try:
+                for row in conn.execute(sql, params + [limit - len(results)]):
+                    entry = dict(row)
+                    entry["inputs"] = json.loads(entry["inputs"])
+                    entry["weather"] = json.loads(entry["weather"]) if entry["weather"] else None
+                    results.append(entry)
+            finally:
+                conn.close()
+            if len(results) >= limit:
+                break
+        return results
+
+    def files(self, start_ts=None, end_ts=None):
+        """
+        Daily files in date order, restricted to those that can hold records in [start_ts, end_ts).
+        """
+        first = _day(start_ts) if start_ts is not None else ""
+        last = _day(end_ts) if end_ts is not None else "9999"
+        return [path for path in sorted(glob.glob(os.path.join(self.directory, "audit-*.sqlite")))
+                if first <= os.path.basename(path)[6:16] <= last]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "directory": os.path.abspath(self.directory),
+                "queued": self._queue.qsize() if self._queue is not None else 0,
+                "max_queue": self.max_queue,
+                "on_full": self.on_full,
+                "written": self.written,
+                "dropped": self.dropped,
+                "batches": self.batches,
+                "last_error": self.last_error
+            }
+
+    def _ensure_writer(self):
+        # One queue and writer per process: threads (and queued records) do not survive gunicorn's fork
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            self._queue = queue.Queue(self.max_queue)
+            threading.Thread(target=self._run, args=(self._queue,), name="audit-writer", daemon=True).start()
+            atexit.register(self.flush, timeout=5)
+            self._pid = os.getpid()
+
+    def _run(self, records):
+        connections = {} # day -> connection
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            # Drain everything queued so far, batch_size records per transaction (group commit)
+            while True:
+                batch = []
+                try:
+                    while len(batch) < self.batch_size:
+                        batch.append(records.get_nowait())
+                except queue.Empty:
+                    pass
+                if not batch:
+                    break
+                self._commit(connections, records, batch)
+
+    def _commit(self, connections, records, batch):
+        try:
+            self._write(connections, batch)
+            outcome = "written"
+        except Exception as e:
+            print(f"Audit log write failed ({len(batch)} records): {e}")
+            self.last_error = str(e)
+            outcome = "dropped"
+        with self._lock:
+            if outcome == "written":
+                self.written += len(batch)
+                self.batches += 1
+            else:
+                self.dropped += len(batch)
+        AUDIT_RECORDS.inc(len(batch), outcome=outcome)
+        for _ in batch:
+            records.task_done()
+
+    def _write(self, connections, batch):
+        pid = os.getpid()
+        by_day = {}
+        for ts, endpoint, version, label, percentage, latency, inputs, weather in batch:
+            location = inputs.get('city') if isinstance(inputs, dict) else None
+            by_day.setdefault(_day(ts), []).append((
+                ts, endpoint, version, label, percentage, latency, location,
+                json.dumps(inputs, separators=(',', ':'), default=str),
+                json.dumps(weather, separators=(',', ':'), default=str) if weather else None, pid))
+
+        for day, rows in by_day.items():
+            conn = connections.get(day)
+            if conn is None:
+                # Yesterday's file is finished once a new day starts
+                for old in list(connections):
+                    connections.pop(old).close()
+                conn = connections[day] = self._connect(day)
+            with conn:
+                conn.executemany(
+                    "INSERT INTO audit (ts, endpoint, model_version, risk_label, risk_percentage, latency_ms, "
+                    "location, inputs, weather, pid) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def _connect(self, day):
+        conn = sqlite3.connect(os.path.join(self.directory, f"audit-{day}.sqlite"), timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        # Survives process crashes; the last group commits may be lost on power failure
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        return conn
+
+
+def _day(ts):
+    return datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%d")
+
+
+def _epoch(value):
+    if value is None or isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+if __name__ == "__main__":
+    # Audit queries, one JSON record per line:
+    #   python backend/services/audit_log.py --since 2026-10-01 --until 2026-10-08 --label extreme
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Query the risk assessment audit log.")
+    parser.add_argument("--dir", default=None, help="Audit directory (default: AUDIT_LOG_DIR)")
+    parser.add_argument("--since", help="ISO date/time, UTC unless an offset is given")
+    parser.add_argument("--until")
+    parser.add_argument("--endpoint")
+    parser.add_argument("--model-version")
+    parser.add_argument("--label")
+    parser.add_argument("--city")
+    parser.add_argument("--limit", type=int, default=1000)
+    args = parser.parse_args()
+
+    log = AuditLog(args.dir)
+    for entry in log.query(args.since, args.until, args.endpoint, args.model_version, args.label,
+                           args.city, args.limit):
+        print(json.dumps(entry))
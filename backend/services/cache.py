@@ -0,0 +1,148 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    Bounded in-process cache with per-entry TTL and LRU eviction.
+    Concurrent misses for the same key are coalesced: only one caller runs the loader,
+    the others wait for its result (or its exception). "misses" counts loader runs, so
+    coalesced waiters and get() misses are not misses.
+    """
+
+    def __init__(self, maxsize=1024, ttl=600, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._data = OrderedDict() # key -> (expires_at, value)
+        self._inflight = {} # key -> _Pending
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        """
+        The cached value or default. A miss here is not counted: a caller that then loads the
+        value itself reports it with record_miss().
+        """
+        with self._lock:
+            value = self._lookup(key)
+        return default if value is _MISSING else value
+
+    def record_miss(self):
+        with self._lock:
+            self.misses += 1
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._store(key, value, ttl)
+
+    def get_or_load(self, key, loader, ttl=None):
+        """
+        Returns the cached value for key, calling loader() at most once per key on a miss.
+        Exceptions from loader are propagated to every waiting caller and nothing is cached.
+        """
+        return self.lookup(key, loader, ttl)[0]
+
+    def lookup(self, key, loader, ttl=None):
+        """
+        Same as get_or_load, but returns (value, outcome) where outcome is
+        "hit", "miss" (this caller ran the loader) or "coalesced" (waited on another caller's load).
+        """
+        with self._lock:
+            value = self._lookup(key)
+            if value is not _MISSING:
+                return value, "hit"
+            pending = self._inflight.get(key)
+            if pending is None:
+                pending = self._inflight[key] = _Pending()
+                self.misses += 1
+                leader = True
+            else:
+                self.coalesced += 1
+                leader = False
+
+        if not leader:
+            return pending.wait(), "coalesced"
+
+        try:
+            value = loader()
+        except BaseException as e:
+            with self._lock:
+                del self._inflight[key]
+            pending.fail(e)
+            raise
+
+        with self._lock:
+            self._store(key, value, ttl)
+            del self._inflight[key]
+        pending.resolve(value)
+        return value, "miss"
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+    def __len__(self):
+        return len(self._data)
+
+    # --- internals, caller must hold self._lock ---
+
+    def _lookup(self, key):
+        entry = self._data.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > self._clock():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._data[key]
+        return _MISSING
+
+    def _store(self, key, value, ttl):
+        self._data[key] = (self._clock() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+
+class _Pending:
+    def __init__(self):
+        self._event = threading.Event()
+        self._value = None
+        self._error = None
+
+    def resolve(self, value):
+        self._value = value
+        self._event.set()
+
+    def fail(self, error):
+        self._error = error
+        self._event.set()
+
+    def wait(self):
+        self._event.wait()
+        if self._error is not None:
+            raise self._error
+        return self._value
+
+
+_MISSING = object()
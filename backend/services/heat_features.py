@@ -0,0 +1,118 @@
+import numpy as np
+
+# Derived weather features the model is trained on, computed from temperature/humidity
+DERIVED_FEATURES = ['heat_index', 'wbgt']
+
+# Rothfusz regression (°F, %RH), grouped by powers of RH:
+# HI = (a0 + a1 T + a2 T²) + RH (b0 + b1 T + b2 T²) + RH² (c0 + c1 T + c2 T²)
+_A = (-42.379, 2.04901523, -.00683783)
+_B = (10.14333127, -.22475541, .00122874)
+_C = (-.05481717, .00085282, -.00000199)
+
+
+def heat_index(temp_c, humidity):
+    """
+    Heat Index (feel-like temperature, °C) using the NOAA formula adaptation:
+    Steadman's simple formula, switching to the Rothfusz regression at 80°F and above.
+    Works element-wise on scalars or NumPy arrays, like a ufunc; scalars return a float.
+    """
+    if np.ndim(temp_c) == 0 and np.ndim(humidity) == 0:
+        # Plain float arithmetic: the per-request path should not pay for 0-d array ops
+        T = float(temp_c) * 9 / 5 + 32
+        RH = float(humidity)
+        HI = 1.1 * T - 10.3 + 0.047 * RH
+        if HI >= 80:
+            HI = _rothfusz(T, RH)
+        return (HI - 32) * 5 / 9
+
+    T, RH = np.broadcast_arrays(np.asarray(temp_c, dtype=np.float64), np.asarray(humidity, dtype=np.float64))
+    T = T * 1.8
+    T += 32
+    HI = 1.1 * T
+    HI -= 10.3
+    HI += 0.047 * RH
+
+    # Evaluating the regression everywhere and selecting is cheaper than gathering the hot rows;
+    # the in-place updates keep the temporaries to a handful of arrays
+    T2 = T * T
+    rh2 = _C[2] * T2
+    rh2 += _C[1] * T
+    rh2 += _C[0]
+    rh2 *= RH
+    rh = _B[2] * T2
+    rh += _B[1] * T
+    rh += _B[0]
+    rh += rh2
+    rh *= RH
+    full = _A[2] * T2
+    full += _A[1] * T
+    full += _A[0]
+    full += rh
+    np.copyto(HI, full, where=HI >= 80)
+    HI -= 32
+    HI *= 5 / 9
+    return HI
+
+
+def vapour_pressure(temp_c, humidity):
+    """
+    Water vapour pressure in hPa (Magnus formula over water).
+    """
+    temp_c = np.asarray(temp_c, dtype=np.float64)
+    e = np.asarray(humidity, dtype=np.float64) / 100 * 6.105 * np.exp(17.27 * temp_c / (237.7 + temp_c))
+    return float(e) if e.ndim == 0 else e
+
+
+def wbgt(temp_c, humidity):
+    """
+    Wet-bulb globe temperature estimate (°C) for shaded, moderate-wind conditions,
+    from air temperature and humidity only (Australian Bureau of Meteorology approximation).
+    Works element-wise on scalars or NumPy arrays.
+    """
+    if np.ndim(temp_c) == 0 and np.ndim(humidity) == 0:
+        t = float(temp_c)
+        e = float(humidity) / 100 * 6.105 * np.exp(17.27 * t / (237.7 + t))
+        return 0.567 * t + 0.393 * float(e) + 3.94
+    temp_c = np.asarray(temp_c, dtype=np.float64)
+    return 0.567 * temp_c + 0.393 * vapour_pressure(temp_c, humidity) + 3.94
+
+
+def dew_point(temp_c, humidity):
+    """
+    Dew point (°C), Magnus formula. Humidity is clamped to 0.1% to keep the logarithm finite.
+    """
+    temp_c = np.asarray(temp_c, dtype=np.float64)
+    gamma = np.log(np.maximum(np.asarray(humidity, dtype=np.float64), 0.1) / 100) + 17.62 * temp_c / (243.12 + temp_c)
+    td = 243.12 * gamma / (17.62 - gamma)
+    return float(td) if td.ndim == 0 else td
+
+
+FUNCTIONS = {'heat_index': heat_index, 'wbgt': wbgt, 'dew_point': dew_point}
+
+
+def derived_features(temperature, humidity, names=DERIVED_FEATURES):
+    """
+    {name: values} for the requested derived features.
+    """
+    return {name: FUNCTIONS[name](temperature, humidity) for name in names}
+
+
+def add_derived_features(columns, names=DERIVED_FEATURES):
+    """
+    Returns a copy of a {column: values} mapping with the derived features that are not
+    already present computed from its 'temperature' and 'humidity' columns.
+    """
+    missing = [name for name in names if name not in columns]
+    if not missing:
+        return columns
+    columns = dict(columns)
+    columns.update(derived_features(np.asarray(columns['temperature'], dtype=np.float64),
+                                     np.asarray(columns['humidity'], dtype=np.float64), missing))
+    return columns
+
+
+def _rothfusz(T, RH):
+    T2 = T * T
+    return (_A[0] + _A[1] * T + _A[2] * T2
+            + RH * ((_B[0] + _B[1] * T + _B[2] * T2)
+                    + RH * (_C[0] + _C[1] * T + _C[2] * T2)))
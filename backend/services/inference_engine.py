@@ -0,0 +1,99 @@
+import json
+import os
+import numpy as np
+
+
+class CompiledModel:
+    """
+    Array-backed replacement for the sklearn Pipeline exported by ml_engine/compile_model.py.
+    Applies the fitted StandardScaler / OneHotEncoder parameters and walks all trees of the
+    forest at once with NumPy, so neither pandas nor sklearn is needed at inference time.
+    Every array is its own .npy file and is memory-mapped read-only on load, so loading is
+    near-instant and all gunicorn workers share the same physical pages.
+    """
+
+    ARRAYS = ("mean", "scale", "feature", "threshold", "children", "is_leaf", "value", "roots")
+    META_FILE = "meta.json"
+
+    def __init__(self, arrays, meta):
+        self.meta = meta
+        self.classes_ = np.array(meta["classes"], dtype=object)
+        self.numerical_features = meta["numerical_features"]
+        self.categorical_features = meta["categorical_features"]
+        self.n_features = meta["n_features"]
+
+        self.mean = arrays["mean"]
+        self.scale = arrays["scale"]
+        self.feature = arrays["feature"]
+        self.threshold = arrays["threshold"]
+        self.children = arrays["children"] # [left0, right0, left1, right1, ...]
+        self.is_leaf = arrays["is_leaf"]
+        self.value = arrays["value"]
+        self.roots = arrays["roots"]
+
+        # category -> column index in the transformed matrix, per categorical feature
+        offset = len(self.numerical_features)
+        self.category_maps = []
+        for categories in meta["categories"]:
+            self.category_maps.append({cat: offset + i for i, cat in enumerate(categories)})
+            offset += len(categories)
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        with open(os.path.join(directory, cls.META_FILE)) as f:
+            meta = json.load(f)
+        arrays = {
+            name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode='r' if mmap else None, allow_pickle=False)
+            for name in cls.ARRAYS
+        }
+        return cls(arrays, meta)
+
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        for name in self.ARRAYS:
+            np.save(os.path.join(directory, f"{name}.npy"), np.ascontiguousarray(getattr(self, name)))
+        with open(os.path.join(directory, self.META_FILE), 'w') as f:
+            json.dump(self.meta, f, indent=4)
+
+    def transform(self, X):
+        """
+        X is any column mapping (dict of sequences or a DataFrame) with the training columns.
+        Returns the float32 matrix the trees were fitted on.
+        """
+        numeric = np.column_stack([np.asarray(X[col], dtype=np.float64) for col in self.numerical_features])
+        n = numeric.shape[0]
+
+        Xt = np.zeros((n, self.n_features), dtype=np.float32)
+        Xt[:, :numeric.shape[1]] = (numeric - self.mean) / self.scale
+
+        # Unknown categories leave every one-hot column at 0 (handle_unknown='ignore')
+        rows = np.arange(n)
+        for col, mapping in zip(self.categorical_features, self.category_maps):
+            idx = np.fromiter((mapping.get(v, -1) for v in X[col]), dtype=np.intp, count=n)
+            known = idx >= 0
+            Xt[rows[known], idx[known]] = 1.0
+        return Xt
+
+    def predict_proba(self, X):
+        Xt = self.transform(X)
+        n = Xt.shape[0]
+        n_trees = len(self.roots)
+
+        # One pointer per (tree, row) pair. Every step advances only the pairs that have not
+        # reached a leaf yet, so the work is the total path length rather than
+        # n_trees * n_rows * max_depth.
+        flat = Xt.ravel()
+        node = np.repeat(self.roots, n)
+        row_offset = np.tile(np.arange(n) * self.n_features, n_trees)
+        active = np.arange(node.size)
+        while active.size:
+            current = node[active]
+            go_right = flat[row_offset[active] + self.feature[current]] > self.threshold[current]
+            current = self.children[2 * current + go_right]
+            node[active] = current
+            active = active[~self.is_leaf[current]]
+
+        return self.value[node].reshape(n_trees, n, -1).mean(axis=0)
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
@@ -0,0 +1,183 @@
+import bisect
+import os
+import threading
+import time
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class MetricsRegistry:
+    """
+    Minimal in-process metrics registry rendered in the Prometheus text exposition format.
+    When disabled, Histogram.time() hands out a shared no-op context manager and observe()
+    returns immediately, so instrumented code pays one attribute check per span.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._metrics = []
+        self._callbacks = []
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        metric = Histogram(self, name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        metric = Counter(self, name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def gauge_callback(self, name, documentation, fn, metric_type="gauge"):
+        """
+        Registers a metric whose value(s) are read at scrape time.
+        fn returns a number or a {labels_dict_as_tuple_pairs: number} mapping.
+        """
+        self._callbacks.append((name, documentation, fn, metric_type))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for name, documentation, fn, metric_type in self._callbacks:
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            value = fn()
+            if isinstance(value, dict):
+                for labels, v in value.items():
+                    lines.append(f"{name}{_format_labels(dict(labels))} {_format_value(v)}")
+            else:
+                lines.append(f"{name} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+class Histogram:
+    def __init__(self, registry, name, documentation, labelnames, buckets):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {} # label values -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def time(self, **labels):
+        if not self.registry.enabled:
+            return _NOOP_TIMER
+        return _Timer(self, labels)
+
+    def observe(self, value, **labels):
+        if not self.registry.enabled:
+            return
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = {key: list(series) for key, series in self._series.items()}
+        for key, series in sorted(snapshot.items()):
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{self.name}_bucket{_format_labels(dict(labels, le=le))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {cumulative}")
+        return lines
+
+
+class Counter:
+    def __init__(self, registry, name, documentation, labelnames):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        if not self.registry.enabled:
+            return
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            snapshot = dict(self._values)
+        for key, value in sorted(snapshot.items()):
+            lines.append(f"{self.name}{_format_labels(dict(zip(self.labelnames, key)))} {_format_value(value)}")
+        return lines
+
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "start")
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+class _NoopTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP_TIMER = _NoopTimer()
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    pairs = ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+    return "{" + pairs + "}"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+# Process-wide registry shared by app.py and the services
+registry = MetricsRegistry(enabled=os.getenv("METRICS_ENABLED", "true").lower() == "true")
+
+REQUEST_SECONDS = registry.histogram(
+    "heatshield_request_duration_seconds", "End-to-end request latency.", ["endpoint", "method", "status"])
+STAGE_SECONDS = registry.histogram(
+    "heatshield_stage_duration_seconds", "Time spent in each prediction stage.", ["stage"])
+WEATHER_SECONDS = registry.histogram(
+    "heatshield_weather_fetch_duration_seconds", "Weather lookup latency by data source and cache outcome.",
+    ["source", "cache"])
+SHADOW_SECONDS = registry.histogram(
+    "heatshield_shadow_inference_duration_seconds", "Candidate model inference latency in shadow mode.")
+SHADOW_PREDICTIONS = registry.counter(
+    "heatshield_shadow_predictions_total", "Rows scored by the shadow model, by agreement with the serving model.",
+    ["agree"])
+AUDIT_RECORDS = registry.counter(
+    "heatshield_audit_records_total", "Risk assessments handed to the audit log, by outcome (written/dropped).",
+    ["outcome"])
@@ -0,0 +1,439 @@
+import contextlib
+import hashlib
+import json
+import os
+import queue
+import random
+import shutil
+import threading
+import time
+
+import numpy as np
+
+from heat_features import DERIVED_FEATURES, add_derived_features
+from inference_engine import CompiledModel
+from metrics import SHADOW_SECONDS, SHADOW_PREDICTIONS
+from risk_table import RiskTable, error_violations
+
+# Files making up one model version (only the ones present are copied/loaded)
+ARTIFACTS = ("model.pkl", "model_compiled", "risk_table", "metrics.json")
+
+
+class ModelBundle:
+    """
+    One loaded model version: the model, its optional risk table and metadata.
+    Counts the requests currently using it, so a replaced version can be retired
+    once they have finished. Callers pass the request feature columns; derived features
+    (heat index, WBGT) are computed here for models trained on them.
+    """
+
+    def __init__(self, model, version, feature_columns, risk_table=None, metadata=None, source=None):
+        self.model = model
+        self.version = version
+        self.feature_columns = feature_columns
+        self.risk_table = risk_table
+        self.metadata = metadata or {}
+        self.source = source
+        self.loaded_at = time.time()
+        self.classes_ = model.classes_
+        self.derived_features = [name for name in DERIVED_FEATURES if name in _model_inputs(model)]
+        self._inflight = 0
+        self._idle = threading.Condition()
+
+    @contextlib.contextmanager
+    def acquire(self):
+        with self._idle:
+            self._inflight += 1
+        try:
+            yield self
+        finally:
+            with self._idle:
+                self._inflight -= 1
+                if not self._inflight:
+                    self._idle.notify_all()
+
+    def wait_idle(self, timeout=None):
+        with self._idle:
+            return self._idle.wait_for(lambda: self._inflight == 0, timeout)
+
+    def predict_proba(self, columns):
+        """
+        Runs the model on a {column: values} mapping.
+        With a risk table, rows inside the table's domain are answered by lookup and
+        only the remaining rows go to the live model.
+        """
+        if self.risk_table is None:
+            return self.live_predict_proba(columns)
+
+        probs, covered = self.risk_table.predict_proba(columns)
+        if not covered.all():
+            missing = np.flatnonzero(~covered)
+            probs[missing] = self.live_predict_proba({col: [columns[col][i] for i in missing]
+                                                      for col in self.feature_columns})
+        return probs
+
+    def live_predict_proba(self, columns):
+        if self.derived_features:
+            columns = add_derived_features(columns, self.derived_features)
+        # Only the sklearn Pipeline needs a DataFrame; the compiled model reads the columns directly
+        if isinstance(self.model, CompiledModel):
+            return self.model.predict_proba(columns)
+        import pandas as pd
+        return self.model.predict_proba(pd.DataFrame(columns, columns=self.feature_columns + self.derived_features))
+
+    def describe(self):
+        return {
+            "model": type(self.model).__name__,
+            "model_version": self.version,
+            "source": self.source,
+            "loaded_at": round(self.loaded_at, 3),
+            "metadata": self.metadata,
+            "derived_features": self.derived_features,
+            "risk_table": self.risk_table.error_report if self.risk_table is not None else None
+        }
+
+
+def _model_inputs(model):
+    if isinstance(model, CompiledModel):
+        return model.numerical_features + model.categorical_features
+    return list(getattr(model, "feature_names_in_", ()))
+
+
+def load_bundle(directory, feature_columns, version=None, use_compiled=True, use_risk_table=False,
+                **error_bounds):
+    """
+    Loads the model stored in directory (ml_engine/ or a registry version).
+    Prefers the compiled array-backed model (memory-mapped .npy buffers, no pandas/sklearn on
+    the hot path) and falls back to the sklearn Pipeline in model.pkl. The risk table is only
+    attached if its measured error against the model is within error_bounds (see
+    risk_table.error_violations); otherwise the live model serves.
+    Without an explicit version, the version is a hash of all the model artifacts in directory
+    (model.pkl and model_compiled/), so it does not depend on which of them was loaded: the API
+    and ml_engine/score_bulk.py report the same version for the same training run.
+    """
+    compiled_path = os.path.join(directory, "model_compiled")
+    model_path = os.path.join(directory, "model.pkl")
+    model = None
+    if use_compiled and os.path.isdir(compiled_path):
+        try:
+            model = CompiledModel.load(compiled_path)
+            print(f"Compiled ML Model loaded successfully from {compiled_path}.")
+        except Exception as e:
+            print(f"Error loading compiled model: {e}")
+    if model is None:
+        try:
+            import joblib
+        except ImportError as e:
+            raise ImportError(f"No usable compiled model in {directory}, and model.pkl needs the training "
+                              "dependencies (pip install -r backend/requirements.txt)") from e
+        model = joblib.load(model_path)
+        print(f"ML Model loaded successfully from {model_path}.")
+
+    risk_table = None
+    if use_risk_table:
+        try:
+            risk_table = RiskTable.load(os.path.join(directory, "risk_table"))
+            report = risk_table.error_report or {}
+            if list(risk_table.classes_) != list(model.classes_):
+                raise ValueError("table classes do not match the loaded model")
+            violations = error_violations(report, **error_bounds)
+            if violations:
+                raise ValueError(f"table error out of bounds: {', '.join(violations)}")
+            print(f"Risk lookup table loaded {risk_table.table.shape}.")
+        except Exception as e:
+            print(f"Risk table disabled, using live model: {e}")
+            risk_table = None
+
+    return ModelBundle(model, version or content_hash(artifact_paths(directory)), feature_columns, risk_table,
+                       read_metadata(directory), source=directory)
+
+
+def load_current_bundle(registry, fallback_dir, feature_columns, **load_options):
+    """
+    The registry's CURRENT version, or the artifacts in fallback_dir if nothing was published.
+    """
+    version = registry.current_version()
+    if version:
+        return load_bundle(registry.path(version), feature_columns, version=version, **load_options)
+    return load_bundle(fallback_dir, feature_columns, **load_options)
+
+
+def artifact_paths(directory):
+    """
+    The model files of a training run: model.pkl, then model_compiled/ in name order.
+    """
+    paths = [os.path.join(directory, "model.pkl")]
+    compiled_path = os.path.join(directory, "model_compiled")
+    if os.path.isdir(compiled_path):
+        paths += [os.path.join(compiled_path, name) for name in sorted(os.listdir(compiled_path))]
+    return [path for path in paths if os.path.isfile(path)]
+
+
+def content_hash(paths):
+    """
+    Short sha256 of the given files, used as the version of unregistered models.
+    """
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+
+def read_metadata(directory):
+    """
+    Summary of the training run from metrics.json, if the version has one.
+    """
+    try:
+        with open(os.path.join(directory, "metrics.json")) as f:
+            metrics = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    training = metrics.get("training") or {}
+    return {
+        "accuracy": metrics.get("accuracy"),
+        "backend": training.get("backend"),
+        "rows": training.get("rows"),
+        "trained_at": metrics.get("trained_at")
+    }
+
+
+class ModelRegistry:
+    """
+    Versioned model artifacts on disk:
+        <root>/<version>/{model.pkl, model_compiled/, risk_table/, metrics.json}
+        <root>/CURRENT   name of the version to serve
+    publish() copies a finished training run in under a new version and flips CURRENT with an
+    atomic rename, so a watcher never sees a half-written model.
+    """
+
+    CURRENT_FILE = "CURRENT"
+
+    def __init__(self, root):
+        self.root = root
+
+    def current_version(self):
+        try:
+            with open(os.path.join(self.root, self.CURRENT_FILE)) as f:
+                return f.read().strip() or None
+        except OSError:
+            return None
+
+    def path(self, version):
+        return os.path.join(self.root, version)
+
+    def versions(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name for name in os.listdir(self.root)
+                      if not name.startswith(".") and os.path.isdir(self.path(name)))
+
+    def publish(self, source_dir, activate=True):
+        paths = [os.path.join(source_dir, "model.pkl")]
+        if not os.path.exists(paths[0]):
+            raise FileNotFoundError(f"No model.pkl in {source_dir}")
+        version = time.strftime("%Y%m%d-%H%M%S") + "-" + content_hash(paths)[:8]
+        staging = self.path(f".{version}.tmp")
+        os.makedirs(staging)
+        for name in ARTIFACTS:
+            src = os.path.join(source_dir, name)
+            if os.path.isdir(src):
+                shutil.copytree(src, os.path.join(staging, name))
+            elif os.path.exists(src):
+                shutil.copy2(src, os.path.join(staging, name))
+        os.rename(staging, self.path(version))
+        if activate:
+            self.activate(version)
+        return version
+
+    def activate(self, version):
+        if not os.path.isdir(self.path(version)):
+            raise ValueError(f"Unknown model version {version}")
+        tmp = os.path.join(self.root, f".{self.CURRENT_FILE}.tmp")
+        with open(tmp, "w") as f:
+            f.write(version + "\n")
+        os.replace(tmp, os.path.join(self.root, self.CURRENT_FILE))
+
+
+class ModelManager:
+    """
+    Serves the current ModelBundle and hot-swaps it when the registry's CURRENT changes.
+    A background thread polls the registry every `interval` seconds; a new version is loaded
+    and warmed up off the request path, then swapped in with a single reference assignment.
+    Requests hold the bundle they started with (acquire()), and the old version is retired
+    once they have all finished. Without a registry version, the model in fallback_dir is served.
+    """
+
+    def __init__(self, registry, fallback_dir, feature_columns, warmup_columns, interval=30,
+                 load_options=None, shadow_version=None, shadow_sample=0.0):
+        self.registry = registry
+        self.fallback_dir = fallback_dir
+        self.feature_columns = feature_columns
+        self.warmup_columns = warmup_columns
+        self.interval = interval
+        self.load_options = load_options or {}
+        self.bundle = None
+        self.previous_version = None
+        self.reloads = 0
+        self.last_error = None
+        self._lock = threading.Lock()
+        self._pid = None
+
+        try:
+            self.bundle = load_current_bundle(registry, fallback_dir, feature_columns, **self.load_options)
+            self.bundle.predict_proba(warmup_columns)
+        except Exception as e:
+            print(f"Error loading model: {e}")
+            self.last_error = str(e)
+
+        self.shadow = None
+        if shadow_version and shadow_sample > 0:
+            try:
+                self.shadow = ShadowScorer(self._load(shadow_version), shadow_sample)
+                print(f"Shadow scoring {shadow_sample:.0%} of traffic with model {shadow_version}")
+            except Exception as e:
+                print(f"Shadow model disabled: {e}")
+
+    @contextlib.contextmanager
+    def acquire(self):
+        """
+        Yields the current bundle (or None) and keeps it alive until the block exits.
+        """
+        bundle = self.bundle
+        if bundle is None:
+            yield None
+            return
+        with bundle.acquire():
+            yield bundle
+
+    def reload(self):
+        """
+        Swaps in the registry's CURRENT version if it changed. Returns True on a swap.
+        """
+        with self._lock:
+            version = self.registry.current_version()
+            current = self.bundle
+            if not version or (current is not None and current.version == version):
+                return False
+            try:
+                bundle = self._load(version)
+            except Exception as e:
+                self.last_error = f"{version}: {e}"
+                print(f"Model reload failed, still serving {current.version if current else None}: {e}")
+                return False
+
+            self.bundle = bundle
+            self.previous_version = current.version if current is not None else None
+            self.reloads += 1
+            self.last_error = None
+            print(f"Serving model {version} (was {self.previous_version})")
+
+        if current is not None:
+            threading.Thread(target=self._retire, args=(current,), daemon=True).start()
+        return True
+
+    def ensure_running(self):
+        """
+        Starts the registry watcher once per process (threads do not survive gunicorn's fork).
+        """
+        if self.interval <= 0 or self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        threading.Thread(target=self._watch, name="model-reload", daemon=True).start()
+
+    def stats(self):
+        return {
+            "registry": self.registry.root,
+            "registry_version": self.registry.current_version(),
+            "previous_version": self.previous_version,
+            "reloads": self.reloads,
+            "reload_interval_s": self.interval,
+            "last_error": self.last_error,
+            "shadow": self.shadow.stats() if self.shadow is not None else None
+        }
+
+    def _load(self, version):
+        bundle = load_bundle(self.registry.path(version), self.feature_columns, version=version, **self.load_options)
+        # Warm-up: first inference touches the mmap'd pages and lazily initialised code paths
+        bundle.predict_proba(self.warmup_columns)
+        return bundle
+
+    def _retire(self, bundle):
+        if bundle.wait_idle(timeout=300):
+            print(f"Retired model {bundle.version}")
+        else:
+            print(f"Model {bundle.version} still had requests in flight after 300s")
+
+    def _watch(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.reload()
+            except Exception as e:
+                print(f"Model watcher error: {e}")
+
+
+class ShadowScorer:
+    """
+    Scores a random sample of live requests with a candidate model on a background thread
+    and records its latency and how often it disagrees with the serving model.
+    Samples are dropped instead of queued when the thread falls behind.
+    """
+
+    def __init__(self, bundle, sample_rate, max_pending=100):
+        self.bundle = bundle
+        self.sample_rate = sample_rate
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.scored = 0
+        self.disagreements = 0
+        self.dropped = 0
+        self.abs_diff_sum = 0.0
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def maybe_submit(self, columns, probs, classes):
+        if random.random() >= self.sample_rate:
+            return
+        if self._pid != os.getpid():
+            # Started lazily in the serving process: threads from a preloaded master do not survive fork
+            self._pid = os.getpid()
+            threading.Thread(target=self._run, name="model-shadow", daemon=True).start()
+        try:
+            self.queue.put_nowait((columns, probs, classes))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "version": self.bundle.version,
+                "sample_rate": self.sample_rate,
+                "scored_rows": self.scored,
+                "disagreements": self.disagreements,
+                "disagreement_rate": round(self.disagreements / self.scored, 4) if self.scored else 0.0,
+                "mean_abs_prob_diff": round(self.abs_diff_sum / self.scored, 4) if self.scored else 0.0,
+                "dropped": self.dropped
+            }
+
+    def _run(self):
+        while True:
+            columns, probs, classes = self.queue.get()
+            try:
+                start = time.perf_counter()
+                candidate = self.bundle.predict_proba(columns)
+                SHADOW_SECONDS.observe(time.perf_counter() - start)
+                if list(self.bundle.classes_) != list(classes):
+                    raise ValueError("shadow model classes differ from the serving model")
+                primary_labels = np.argmax(probs, axis=1)
+                candidate_labels = np.argmax(candidate, axis=1)
+                agree = primary_labels == candidate_labels
+                SHADOW_PREDICTIONS.inc(int(agree.sum()), agree="true")
+                SHADOW_PREDICTIONS.inc(int((~agree).sum()), agree="false")
+                with self._lock:
+                    self.scored += len(agree)
+                    self.disagreements += int((~agree).sum())
+                    self.abs_diff_sum += float(np.abs(candidate - probs).max(axis=1).sum())
+            except Exception as e:
+                print(f"Shadow scoring error: {e}")
@@ -0,0 +1,62 @@
+import os
+import resource
+import time
+
+
+def memory_stats():
+    """
+    Resident memory of the current process in MB.
+    pss_mb splits shared pages (mmap'd model arrays, pre-fork heap) between the processes
+    sharing them, so it is the honest per-worker cost; falls back to peak RSS off Linux.
+    """
+    stats = {}
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                parts = line.split()
+                if parts[0] in ("Rss:", "Pss:", "Shared_Clean:", "Shared_Dirty:", "Private_Clean:", "Private_Dirty:"):
+                    stats[parts[0][:-1]] = int(parts[1]) / 1024
+        return {
+            "rss_mb": round(stats["Rss"], 1),
+            "pss_mb": round(stats["Pss"], 1),
+            "shared_mb": round(stats["Shared_Clean"] + stats["Shared_Dirty"], 1),
+            "private_mb": round(stats["Private_Clean"] + stats["Private_Dirty"], 1)
+        }
+    except (OSError, KeyError, IndexError):
+        return {"max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)}
+
+
+class StartupTimer:
+    """
+    Records named startup phases (e.g. model load) in milliseconds.
+    """
+
+    def __init__(self):
+        self.phases = {}
+        self.loaded_in_pid = os.getpid()
+
+    def measure(self, name):
+        return _Phase(self, name)
+
+    def report(self):
+        return {
+            "phases_ms": dict(self.phases),
+            "loaded_in_pid": self.loaded_in_pid,
+            "worker_pid": os.getpid(),
+            # True when the app was imported in the gunicorn master and forked (preload_app)
+            "preloaded": self.loaded_in_pid != os.getpid()
+        }
+
+
+class _Phase:
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.timer.phases[self.name] = round((time.perf_counter() - self.start) * 1000, 2)
+        return False
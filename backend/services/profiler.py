@@ -0,0 +1,86 @@
+import collections
+import itertools
+import sys
+import threading
+import time
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler for a single request: a background thread samples the request
+    thread's Python stack every `interval` seconds. Costs nothing unless started.
+    Results are collapsed stacks ("outer;inner;leaf count"), the input format of flamegraph tools.
+    """
+
+    def __init__(self, thread_id, interval=0.001):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = collections.Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self.started = None
+        self.duration = None
+
+    def start(self):
+        self.started = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.duration = time.perf_counter() - self.started
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{frame.f_lineno})")
+                frame = frame.f_back
+            self.samples[";".join(reversed(stack))] += 1
+
+    def collapsed(self):
+        return "\n".join(f"{stack} {count}" for stack, count in self.samples.most_common())
+
+    def summary(self, top=15):
+        total = sum(self.samples.values())
+        # Self time per leaf frame
+        leaves = collections.Counter()
+        for stack, count in self.samples.items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        return {
+            "duration_ms": round(self.duration * 1000, 3) if self.duration is not None else None,
+            "interval_ms": self.interval * 1000,
+            "samples": total,
+            "top_frames": [{"frame": frame, "samples": count, "share": round(count / total, 3)}
+                           for frame, count in leaves.most_common(top)]
+        }
+
+
+class ProfileStore:
+    """
+    Keeps the most recent profiles so they can be fetched after the profiled response.
+    """
+
+    def __init__(self, maxlen=20):
+        self._profiles = collections.OrderedDict()
+        self._maxlen = maxlen
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def add(self, profile, endpoint):
+        with self._lock:
+            profile_id = str(next(self._ids))
+            self._profiles[profile_id] = (endpoint, profile)
+            while len(self._profiles) > self._maxlen:
+                self._profiles.popitem(last=False)
+        return profile_id
+
+    def get(self, profile_id):
+        with self._lock:
+            return self._profiles.get(profile_id)
@@ -1,66 +1,179 @@
+import itertools
+import json
+import operator
+import os
+
+RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "recommendation_rules.json")
+
+COMPARISONS = {"gt": operator.gt, "gte": operator.ge, "lt": operator.lt, "lte": operator.le}
+OTHER = object() # any value of a field that no rule mentions
 
 
 class RecommendationEngine:
+    """
+    Declarative recommendation rules (recommendation_rules.json), compiled at startup.
+    Rules are organised in groups; each group contributes at most one recommendation, from
+    its first matching rule. For every group, all combinations of the categorical values its
+    rules mention (plus "anything else") are resolved ahead of time, so a request costs one
+    dict lookup per group; only weather thresholds are still evaluated per call.
+    Recommendations are pre-built read-only dicts shared by every response.
+    """
+
+    def __init__(self, rules_path=None):
+        self.rules_path = rules_path or os.getenv("RECOMMENDATION_RULES", RULES_PATH)
+        with open(self.rules_path) as f:
+            spec = json.load(f)
+        self.groups = [_compile_group(group) for group in spec["groups"]]
+        self.rule_count = sum(len(group["rules"]) for group in spec["groups"])
+
+        # Every field any rule looks at, with the values rules mention
+        self.fields = {}
+        for fields, values, _ in self.groups:
+            for field, known in zip(fields, values):
+                self.fields[field] = self.fields.get(field, frozenset()) | known
+        self.fields.setdefault("risk", frozenset())
+        self._request_fields = [(field, known) for field, known in self.fields.items() if field != "risk"]
+        self._key_fields = ["risk"] + [field for field, _ in self._request_fields]
+        # Resolved plans per normalised (risk, inputs) combination; bounded by the rule vocabulary
+        self._plans_by_key = {}
+
+        # Every distinct weather comparison any rule makes, in rule order
+        checks = []
+        for group in spec["groups"]:
+            for rule in group["rules"]:
+                for field, condition in rule.get("when", {}).items():
+                    if isinstance(condition, dict):
+                        checks.extend((field, op, threshold) for op, threshold in condition.items()
+                                      if (field, op, threshold) not in checks)
+        self._checks = [(field, COMPARISONS[op], threshold) for field, op, threshold in checks]
+
     def generate_recommendations(self, risk_label, inputs, weather):
         """
         Generates a list of recommendations based on risk label and specific inputs.
         """
-        recs = []
-        
-        # 1. Base Risk Recommendations
-        if risk_label == "extreme":
-            recs.append({
-                "title": "STOP WORK IMMEDIATELY",
-                "explanation": "Conditions are life-threatening. Seek shade and cool down now.",
-                "urgency": "high"
-            })
-        elif risk_label == "high":
-            recs.append({
-                "title": "Mandatory Rest Breaks",
-                "explanation": "Take a 15-minute break every hour in a cool area.",
-                "urgency": "high"
-            })
-        elif risk_label == "moderate":
-            recs.append({
-                "title": "Monitor Condition",
-                "explanation": "Conditions are worsening. Watch for signs of fatigue.",
-                "urgency": "medium"
-            })
-        else:
-            recs.append({
-                "title": "Safe to Work",
-                "explanation": "Standard safety precautions apply.",
-                "urgency": "low"
-            })
-            
-        # 2. Hydration Logic
-        if inputs.get("hydration_level") == "poor":
-            recs.append({
-                "title": "Critical Hydration Needed",
-                "explanation": "You are starting dehydrated. Drink 500ml water immediately.",
-                "urgency": "high"
-            })
-        elif weather["temperature"] > 35:
-            recs.append({
-                "title": "Increase Water Intake",
-                "explanation": "High heat requires drinking 1 cup of water every 20 mins.",
-                "urgency": "medium"
-            })
-            
-        # 3. Activity Logic
-        if inputs.get("activity_level") in ["heavy", "extreme"] and risk_label != "low":
-            recs.append({
-                "title": "Reduce Physical Exertion",
-                "explanation": "Consider rescheduling heavy tasks to cooler hours.",
-                "urgency": "high"
-            })
-            
-        # 4. Age Logic
-        if inputs.get("age_group") in ["46-55", "55+"] and risk_label in ["moderate", "high", "extreme"]:
-            recs.append({
-                "title": "High Vulnerability Alert",
-                "explanation": "Older age groups are at higher risk. Take extra precautions.",
-                "urgency": "high"
-            })
-            
-        return recs
+        return _resolve(self._plans(risk_label, inputs), weather)
+
+    def generate_batch(self, risk_labels, inputs_list, weathers):
+        """
+        Recommendations for many workers in one pass.
+        """
+        plans = self._plans
+        return [_resolve(plans(risk_label, inputs), weather)
+                for risk_label, inputs, weather in zip(risk_labels, inputs_list, weathers)]
+
+    def input_key(self, inputs):
+        """
+        The part of a request's inputs the rules can see, as a hashable tuple
+        (values no rule mentions collapse into one bucket). For caching generated results.
+        """
+        return tuple(_value(known, inputs.get(field)) for field, known in self._request_fields)
+
+    def weather_key(self, weather):
+        """
+        The outcome of every weather threshold the rules compare, as a hashable tuple: readings
+        with the same key get the same recommendations for the same risk and input_key.
+        """
+        return tuple(compare(weather[name], threshold) for name, compare, threshold in self._checks)
+
+    def _plans(self, risk_label, inputs):
+        key = [_value(self.fields["risk"], risk_label)]
+        for field, known in self._request_fields:
+            key.append(_value(known, inputs.get(field)))
+        key = tuple(key)
+        plans = self._plans_by_key.get(key)
+        if plans is None:
+            values = dict(zip(self._key_fields, key))
+            plans = []
+            for fields, known, index in self.groups:
+                plan = index.get(tuple(_value(k, values[field]) for field, k in zip(fields, known)))
+                if plan is not None:
+                    plans.append(plan)
+            plans = self._plans_by_key[key] = tuple(plans)
+        return plans
+
+
+class Recommendation(dict):
+    """
+    Read-only recommendation shared between responses (still a dict for JSON encoding).
+    """
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("Recommendation objects are shared and read-only")
+
+    __setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = _readonly
+
+
+def _value(known, value):
+    try:
+        return value if value in known else OTHER
+    except TypeError: # unhashable input never matches a rule
+        return OTHER
+
+
+def _resolve(plans, weather):
+    recs = []
+    for plan in plans:
+        if type(plan) is Recommendation:
+            recs.append(plan)
+            continue
+        for checks, rec in plan:
+            if all(compare(weather[name], threshold) for name, compare, threshold in checks):
+                recs.append(rec)
+                break
+    return recs
+
+
+def _compile_group(group):
+    """
+    Returns (fields, known values per field, index) where index maps every combination of
+    known values to either a Recommendation (no weather check left) or a tuple of
+    (checks, Recommendation) alternatives tried in order.
+    """
+    rules = []
+    fields = []
+    for rule in group["rules"]:
+        categorical, checks = {}, []
+        for field, condition in rule.get("when", {}).items():
+            if isinstance(condition, dict):
+                checks.extend((field, COMPARISONS[op], threshold) for op, threshold in condition.items())
+            else:
+                categorical[field] = frozenset(condition)
+                if field not in fields:
+                    fields.append(field)
+        rec = Recommendation(title=rule["title"], explanation=rule["explanation"], urgency=rule["urgency"])
+        rules.append((categorical, tuple(checks), rec))
+
+    values = [frozenset().union(*(cats[field] for cats, _, _ in rules if field in cats)) for field in fields]
+
+    # Bitmask of the rules accepting each value of each field (bit i = rule i), so a key's
+    # candidates are the AND of one mask per field instead of a scan over every rule
+    everything = (1 << len(rules)) - 1
+    masks = []
+    for field, known in zip(fields, values):
+        unconstrained = sum(1 << i for i, (cats, _, _) in enumerate(rules) if field not in cats)
+        field_masks = {value: unconstrained | sum(1 << i for i, (cats, _, _) in enumerate(rules)
+                                                  if field in cats and value in cats[field])
+                       for value in known}
+        field_masks[OTHER] = unconstrained
+        masks.append(field_masks)
+
+    index = {}
+    for key in itertools.product(*(list(known) + [OTHER] for known in values)):
+        candidates = everything
+        for field_masks, value in zip(masks, key):
+            candidates &= field_masks[value]
+        alternatives = []
+        while candidates:
+            lowest = candidates & -candidates
+            _, checks, rec = rules[lowest.bit_length() - 1]
+            candidates ^= lowest
+            if not checks:
+                # Unconditional match: later rules in the group can never be reached
+                alternatives.append(((), rec))
+                break
+            alternatives.append((checks, rec))
+        if len(alternatives) == 1 and not alternatives[0][0]:
+            index[key] = alternatives[0][1]
+        elif alternatives:
+            index[key] = tuple(alternatives)
+    return tuple(fields), values, index
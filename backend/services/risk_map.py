@@ -0,0 +1,134 @@
+import json
+import math
+
+import numpy as np
+
+# Worker profiles scored when a risk map request does not bring its own
+STANDARD_PROFILES = [
+    {"name": "light-work", "exposureDuration": 4, "activityLevel": "light", "hydrationLevel": "well", "ageGroup": "26-35"},
+    {"name": "heavy-work", "exposureDuration": 8, "activityLevel": "heavy", "hydrationLevel": "moderate", "ageGroup": "36-45"},
+    {"name": "vulnerable", "exposureDuration": 10, "activityLevel": "heavy", "hydrationLevel": "poor", "ageGroup": "55+"}
+]
+PROFILE_FIELDS = ('exposureDuration', 'activityLevel', 'hydrationLevel', 'ageGroup')
+FORMATS = ('json', 'ndjson', 'binary')
+
+
+class GridTooLarge(ValueError):
+    pass
+
+
+class RiskGrid:
+    """
+    Regular lat/lon grid over a bounding box. Points are cell centres, numbered row-major
+    from the south-west corner (row = latitude band, col = longitude band).
+    """
+
+    def __init__(self, south, west, north, east, resolution):
+        if not (-90 <= south < north <= 90 and -180 <= west < east <= 180):
+            raise ValueError("bbox must satisfy -90 <= south < north <= 90 and -180 <= west < east <= 180")
+        if not resolution > 0:
+            raise ValueError("resolution must be positive")
+        self.south, self.west, self.north, self.east = south, west, north, east
+        self.resolution = resolution
+        # Tolerate float noise so a 1.0° box at 0.1° is 10 rows, not 11
+        self.rows = max(1, math.ceil(round((north - south) / resolution, 9)))
+        self.cols = max(1, math.ceil(round((east - west) / resolution, 9)))
+
+    @property
+    def cells(self):
+        return self.rows * self.cols
+
+    def points(self, row_start, row_stop):
+        """
+        (lats, lons) of the cell centres in rows [row_start, row_stop), row-major.
+        """
+        lats = self.south + (np.arange(row_start, row_stop) + 0.5) * self.resolution
+        lons = self.west + (np.arange(self.cols) + 0.5) * self.resolution
+        return np.repeat(np.round(lats, 6), self.cols), np.tile(np.round(lons, 6), row_stop - row_start)
+
+    def describe(self):
+        return {"south": self.south, "west": self.west, "north": self.north, "east": self.east,
+                "resolution": self.resolution, "rows": self.rows, "cols": self.cols}
+
+
+def parse_risk_map(body, max_cells, max_profiles, default_resolution):
+    """
+    Validates a /api/risk-map body. Returns (grid, profiles, fmt); raises ValueError.
+    bbox is {"south", "west", "north", "east"} or [south, west, north, east].
+    """
+    bbox = body.get('bbox')
+    if isinstance(bbox, dict):
+        bbox = [bbox.get(side) for side in ('south', 'west', 'north', 'east')]
+    if not isinstance(bbox, list) or len(bbox) != 4 or any(v is None for v in bbox):
+        raise ValueError("bbox must be {south, west, north, east} or [south, west, north, east]")
+    grid = RiskGrid(*(float(v) for v in bbox), float(body.get('resolution') or default_resolution))
+    if grid.cells > max_cells:
+        raise GridTooLarge(f"Grid has {grid.cells} cells, limit is {max_cells}; use a coarser resolution or a smaller bbox")
+
+    profiles = body.get('profiles') or STANDARD_PROFILES
+    if not isinstance(profiles, list) or len(profiles) > max_profiles:
+        raise ValueError(f"profiles must be a list of at most {max_profiles} worker profiles")
+    for i, profile in enumerate(profiles):
+        missing = [field for field in PROFILE_FIELDS if field not in (profile or {})]
+        if missing:
+            raise ValueError(f"profiles[{i}] is missing {', '.join(missing)}")
+        float(profile['exposureDuration'])
+    profiles = [dict(profile, name=profile.get('name') or f"profile-{i}") for i, profile in enumerate(profiles)]
+
+    fmt = body.get('format', 'json')
+    if fmt not in FORMATS:
+        raise ValueError(f"format must be one of {', '.join(FORMATS)}")
+    return grid, profiles, fmt
+
+
+def record_dtype(n_profiles):
+    """
+    Binary layout of one grid cell: weather and every profile's risk, as scaled integers
+    (tenths of a °C / % / risk percent; category indexes the header's "categories").
+    """
+    return np.dtype([('temperature', '<i2'), ('humidity', '<u2'),
+                     ('risk', '<u2', (n_profiles,)), ('category', 'u1', (n_profiles,))])
+
+
+def header(grid, profiles, classes, model_version, fmt):
+    head = {
+        "grid": grid.describe(),
+        "profiles": profiles,
+        "categories": [str(c) for c in classes],
+        "modelVersion": model_version
+    }
+    if fmt == 'binary':
+        head["dtype"] = record_dtype(len(profiles)).descr
+        head["scale"] = {"temperature": 0.1, "humidity": 0.1, "risk": 0.1}
+    return head
+
+
+def encode_binary(chunk):
+    """
+    Packs a chunk from app.score_risk_map into records; concatenated chunks form the
+    (rows, cols) record array of the whole grid.
+    """
+    records = np.empty(len(chunk["temperature"]), dtype=record_dtype(chunk["risk"].shape[1]))
+    records['temperature'] = np.rint(chunk["temperature"] * 10)
+    records['humidity'] = np.rint(chunk["humidity"] * 10)
+    records['risk'] = chunk["risk"]
+    records['category'] = chunk["category"]
+    return records.tobytes()
+
+
+def encode_json(chunk):
+    """
+    Array form of a chunk: flat row-major lists per field, one list per profile for risk.
+    """
+    return {
+        "rowStart": chunk["row_start"],
+        "rows": chunk["rows"],
+        "temperature": chunk["temperature"].tolist(),
+        "humidity": chunk["humidity"].tolist(),
+        "riskPercentage": (chunk["risk"].T / 10).tolist(),
+        "riskCategory": chunk["category"].T.tolist()
+    }
+
+
+def binary_header_line(head):
+    return (json.dumps(head, separators=(',', ':')) + "\n").encode()
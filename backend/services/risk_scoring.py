@@ -0,0 +1,55 @@
+import numpy as np
+
+# Feature Engineering (Must match training data columns)
+FEATURE_COLUMNS = ['temperature', 'humidity', 'exposure_hours', 'activity_level', 'hydration_level', 'age_group']
+
+# Request field -> model feature column
+INPUT_FIELDS = {
+    'exposureDuration': 'exposure_hours',
+    'activityLevel': 'activity_level',
+    'hydrationLevel': 'hydration_level',
+    'ageGroup': 'age_group'
+}
+
+# Weighted Risk Score (Severity) instead of just Confidence
+# This prevents "Extreme Risk (48%)" confusion.
+CLASS_WEIGHTS = {'low': 0.15, 'moderate': 0.45, 'high': 0.75, 'extreme': 0.95}
+
+
+def build_feature_row(inputs, weather):
+    """
+    Maps a request's inputs + weather onto the model's feature columns.
+    """
+    return {
+        'temperature': weather['temperature'],
+        'humidity': weather['humidity'],
+        'exposure_hours': inputs['exposureDuration'],
+        'activity_level': inputs['activityLevel'],
+        'hydration_level': inputs['hydrationLevel'],
+        'age_group': inputs['ageGroup']
+    }
+
+
+def score_probabilities(classes, risk_probs):
+    """
+    Turns a (n_rows, n_classes) probability matrix into risk labels and weighted risk scores.
+    The label is the argmax class, which is exactly what model.predict returns.
+    """
+    indices, risk_scores = score_indices(classes, risk_probs)
+    risk_labels = [str(label) for label in classes[indices]]
+    return risk_labels, risk_scores
+
+
+def score_indices(classes, risk_probs):
+    """
+    Like score_probabilities, with the labels as indices into classes (for bulk outputs).
+    """
+    weights = np.array([CLASS_WEIGHTS.get(label, 0) for label in classes])
+    return np.argmax(risk_probs, axis=1), risk_probs @ weights
+
+
+def risk_percentage(risk_score):
+    """
+    The riskPercentage every API response and the bulk scorer report.
+    """
+    return round(float(risk_score) * 100, 1)
@@ -0,0 +1,194 @@
+import itertools
+import json
+import os
+import numpy as np
+
+
+class RiskTable:
+    """
+    Precomputed predict_proba outputs over the discrete feature space.
+    Layout: table[activity, hydration, age_group, exposure_hours, temperature, humidity, class],
+    with temperature/humidity on a regular grid that is bilinearly interpolated at lookup time.
+    The table is memory-mapped read-only so every gunicorn worker shares the same pages.
+    """
+
+    TABLE_FILE = "table.npy"
+    META_FILE = "meta.json"
+
+    def __init__(self, table, meta):
+        self.table = table
+        self.meta = meta
+        self.classes_ = np.array(meta["classes"], dtype=object)
+        self.categorical_features = meta["categorical_features"]
+        self.category_maps = [{cat: i for i, cat in enumerate(cats)} for cats in meta["categories"]]
+        self.exposure_hours = meta["exposure_hours"]
+        self.temperature = meta["temperature"] # {"min", "max", "step"}
+        self.humidity = meta["humidity"]
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        with open(os.path.join(directory, cls.META_FILE)) as f:
+            meta = json.load(f)
+        table = np.load(os.path.join(directory, cls.TABLE_FILE), mmap_mode='r' if mmap else None)
+        return cls(table, meta)
+
+    @property
+    def error_report(self):
+        return self.meta.get("error_report")
+
+    def predict_proba(self, X):
+        """
+        Returns (probs, covered). Rows outside the table's domain (unknown category,
+        non-integer or out-of-range exposure, temperature/humidity off the grid)
+        have covered=False and zero probabilities; the caller scores them with the live model.
+        """
+        temps = np.asarray(X['temperature'], dtype=np.float64)
+        hums = np.asarray(X['humidity'], dtype=np.float64)
+        exposure = np.asarray(X['exposure_hours'], dtype=np.float64)
+        n = temps.shape[0]
+
+        covered = np.ones(n, dtype=bool)
+        cat_idx = []
+        for col, mapping in zip(self.categorical_features, self.category_maps):
+            idx = np.fromiter((mapping.get(v, -1) for v in X[col]), dtype=np.intp, count=n)
+            covered &= idx >= 0
+            cat_idx.append(idx)
+
+        exp_min, exp_max = self.exposure_hours
+        covered &= (exposure == np.round(exposure)) & (exposure >= exp_min) & (exposure <= exp_max)
+        t_pos, t_ok = _grid_position(temps, self.temperature)
+        h_pos, h_ok = _grid_position(hums, self.humidity)
+        covered &= t_ok & h_ok
+
+        probs = np.zeros((n, len(self.classes_)), dtype=np.float64)
+        if not covered.any():
+            return probs, covered
+
+        sel = np.flatnonzero(covered)
+        a, hy, g = (idx[sel] for idx in cat_idx)
+        e = exposure[sel].astype(np.intp) - exp_min
+
+        t0, tf = _split(t_pos[sel], self.table.shape[4])
+        h0, hf = _split(h_pos[sel], self.table.shape[5])
+        tf = tf[:, None]
+        hf = hf[:, None]
+
+        table = self.table
+        probs[sel] = (
+            table[a, hy, g, e, t0, h0] * (1 - tf) * (1 - hf) +
+            table[a, hy, g, e, t0 + 1, h0] * tf * (1 - hf) +
+            table[a, hy, g, e, t0, h0 + 1] * (1 - tf) * hf +
+            table[a, hy, g, e, t0 + 1, h0 + 1] * tf * hf
+        )
+        return probs, covered
+
+
+def _grid_axis(spec):
+    count = int(round((spec["max"] - spec["min"]) / spec["step"])) + 1
+    return spec["min"] + np.arange(count) * spec["step"]
+
+
+def _grid_position(values, spec):
+    pos = (values - spec["min"]) / spec["step"]
+    upper = (spec["max"] - spec["min"]) / spec["step"]
+    return pos, (pos >= 0) & (pos <= upper + 1e-9)
+
+
+def _split(pos, size):
+    # Lower corner index and fractional offset; the last grid point uses the last cell with frac=1
+    base = np.minimum(np.floor(pos).astype(np.intp), size - 2)
+    return base, pos - base
+
+
+def build_risk_table(predict_proba, classes, categories, directory,
+                     temperature=(20.0, 50.0, 1.0), humidity=(10.0, 100.0, 2.0),
+                     exposure_hours=(1, 12), error_samples=20000, seed=0):
+    """
+    Evaluates predict_proba ({column: values} -> (n, n_classes)) over every categorical
+    combination, integer exposure hour and temperature/humidity grid point, writes the
+    table plus metadata to directory, and measures interpolation error against the live
+    model on random in-domain points.
+    categories: {'activity_level': [...], 'hydration_level': [...], 'age_group': [...]}
+    """
+    categorical_features = list(categories)
+    meta = {
+        "classes": [str(c) for c in classes],
+        "categorical_features": categorical_features,
+        "categories": [list(categories[col]) for col in categorical_features],
+        "exposure_hours": [int(exposure_hours[0]), int(exposure_hours[1])],
+        "temperature": {"min": temperature[0], "max": temperature[1], "step": temperature[2]},
+        "humidity": {"min": humidity[0], "max": humidity[1], "step": humidity[2]}
+    }
+
+    temps = _grid_axis(meta["temperature"])
+    hums = _grid_axis(meta["humidity"])
+    hours = np.arange(exposure_hours[0], exposure_hours[1] + 1)
+    cat_sizes = [len(cats) for cats in meta["categories"]]
+    shape = tuple(cat_sizes) + (len(hours), len(temps), len(hums), len(classes))
+
+    os.makedirs(directory, exist_ok=True)
+    table_path = os.path.join(directory, RiskTable.TABLE_FILE)
+    table = np.lib.format.open_memmap(table_path + ".tmp.npy", mode='w+', dtype=np.float32, shape=shape)
+
+    # One model call per categorical combination over the full (exposure, temp, humidity) grid
+    e_grid, t_grid, h_grid = (a.ravel() for a in np.meshgrid(hours, temps, hums, indexing='ij'))
+    n = e_grid.size
+    for combo in itertools.product(*(range(size) for size in cat_sizes)):
+        columns = {'temperature': t_grid, 'humidity': h_grid, 'exposure_hours': e_grid}
+        for col, cats, i in zip(categorical_features, meta["categories"], combo):
+            columns[col] = [cats[i]] * n
+        table[combo] = np.asarray(predict_proba(columns), dtype=np.float32).reshape(shape[len(combo):])
+    table.flush()
+    del table
+    os.replace(table_path + ".tmp.npy", table_path)
+
+    risk_table = RiskTable(np.load(table_path, mmap_mode='r'), meta)
+    meta["error_report"] = measure_table_error(risk_table, predict_proba, error_samples, seed)
+    with open(os.path.join(directory, RiskTable.META_FILE), 'w') as f:
+        json.dump(meta, f, indent=4)
+    risk_table.meta = meta
+    return risk_table
+
+
+def measure_table_error(risk_table, predict_proba, n_samples=20000, seed=0):
+    """
+    Compares table lookups with the live model on uniformly sampled in-domain inputs.
+    """
+    rng = np.random.default_rng(seed)
+    meta = risk_table.meta
+    columns = {
+        'temperature': np.round(rng.uniform(meta["temperature"]["min"], meta["temperature"]["max"], n_samples), 1),
+        'humidity': np.round(rng.uniform(meta["humidity"]["min"], meta["humidity"]["max"], n_samples), 1),
+        'exposure_hours': rng.integers(meta["exposure_hours"][0], meta["exposure_hours"][1] + 1, n_samples)
+    }
+    for col, cats in zip(meta["categorical_features"], meta["categories"]):
+        columns[col] = [cats[i] for i in rng.integers(0, len(cats), n_samples)]
+
+    expected = np.asarray(predict_proba(columns))
+    actual, _ = risk_table.predict_proba(columns)
+    abs_err = np.abs(expected - actual).max(axis=1)
+    return {
+        "samples": n_samples,
+        "mean_abs_error": round(float(abs_err.mean()), 6),
+        "p99_abs_error": round(float(np.percentile(abs_err, 99)), 6),
+        "max_abs_error": round(float(abs_err.max()), 6),
+        "label_agreement": round(float(np.mean(expected.argmax(axis=1) == actual.argmax(axis=1))), 6)
+    }
+
+
+# Default acceptance bounds for serving a table instead of the live model (see app.py)
+ERROR_BOUNDS = {"min_agreement": 0.98, "max_mean_error": 0.02, "max_p99_error": 0.1, "max_abs_error": 0.3}
+
+
+def error_violations(report, **bounds):
+    """
+    The bounds (ERROR_BOUNDS, overridden by keyword) an error report from measure_table_error
+    breaks; empty if the table may be served. A good mean can hide a few badly wrong cells,
+    so p99 and max error are bounded too. Metrics missing from an older report are violations.
+    """
+    bounds = dict(ERROR_BOUNDS, **bounds)
+    checks = [("label_agreement", report.get("label_agreement", 0) >= bounds["min_agreement"], bounds["min_agreement"]),
+              ("mean_abs_error", report.get("mean_abs_error", 1) <= bounds["max_mean_error"], bounds["max_mean_error"]),
+              ("p99_abs_error", report.get("p99_abs_error", 1) <= bounds["max_p99_error"], bounds["max_p99_error"]),
+              ("max_abs_error", report.get("max_abs_error", 1) <= bounds["max_abs_error"], bounds["max_abs_error"])]
+    return [f"{name} {report.get(name)} (bound {bound})" for name, ok, bound in checks if not ok]
@@ -0,0 +1,148 @@
+import math
+import threading
+import time
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+class WeatherGrid:
+    """
+    Spatial index of weather readings on a fixed lat/lon grid.
+    Every coordinate falls into one cell (cell_size degrees) whose centre is the point actually
+    fetched upstream, so all sites inside a cell share one reading. Lookups return the nearest
+    fresh cell within radius_km: the site's own cell when it is warm, otherwise a neighbour,
+    so a new site next to a known one is served without any upstream call.
+    Cells that were not used within active_window are dropped by prune() and skipped by refreshes.
+    """
+
+    def __init__(self, cell_size=0.05, radius_km=10.0, max_age=600, active_window=3600,
+                 maxsize=4096, clock=time.monotonic):
+        self.cell_size = cell_size
+        self.radius_km = radius_km
+        self.max_age = max_age
+        self.active_window = active_window
+        self.maxsize = maxsize
+        self._clock = clock
+        self._cells = {} # (row, col) -> [weather, updated_at, last_used]
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.neighbour_hits = 0
+        self.misses = 0
+
+    def cell_of(self, lat, lon):
+        return (math.floor(float(lat) / self.cell_size), math.floor(float(lon) / self.cell_size))
+
+    def centre_of(self, cell):
+        row, col = cell
+        return (round((row + 0.5) * self.cell_size, 6), round((col + 0.5) * self.cell_size, 6))
+
+    def nearest(self, lat, lon):
+        """
+        Returns the weather of the nearest fresh cell within radius_km, or None.
+        """
+        lat, lon = float(lat), float(lon)
+        home = self.cell_of(lat, lon)
+        now = self._clock()
+        with self._lock:
+            # On a regular grid the home cell's centre is always the closest one
+            entry = self._cells.get(home)
+            if entry is not None and now - entry[1] < self.max_age:
+                entry[2] = now
+                self.hits += 1
+                return entry[0]
+
+            rows = math.ceil(self.radius_km / (self.cell_size * KM_PER_DEGREE))
+            cos_lat = max(math.cos(math.radians(lat)), 1e-6)
+            cols = min(math.ceil(rows / cos_lat), math.ceil(180 / self.cell_size))
+            best, best_distance = None, self.radius_km
+            for row in range(home[0] - rows, home[0] + rows + 1):
+                for col in range(home[1] - cols, home[1] + cols + 1):
+                    entry = self._cells.get((row, col))
+                    if entry is None or now - entry[1] >= self.max_age:
+                        continue
+                    distance = haversine_km(lat, lon, *self.centre_of((row, col)))
+                    if distance <= best_distance:
+                        best, best_distance = entry, distance
+            if best is None:
+                self.misses += 1
+                return None
+            best[2] = now
+            self.neighbour_hits += 1
+            return best[0]
+
+    def fresh(self, cell):
+        """
+        The cell's own reading if it is fresh, else None (never a neighbour's).
+        """
+        now = self._clock()
+        with self._lock:
+            entry = self._cells.get(cell)
+            if entry is None or now - entry[1] >= self.max_age:
+                return None
+            entry[2] = now
+            self.hits += 1
+            return entry[0]
+
+    def store(self, cell, weather, age=0.0):
+        """
+        age: how old the reading already is (e.g. when it comes from the shared snapshot).
+        """
+        now = self._clock()
+        with self._lock:
+            entry = self._cells.get(cell)
+            self._cells[cell] = [weather, now - age, entry[2] if entry is not None else now]
+            if len(self._cells) > self.maxsize:
+                self._prune(now)
+
+    def active_cells(self):
+        """
+        Cells used within active_window, the set a bulk refresh keeps warm.
+        """
+        cutoff = self._clock() - self.active_window
+        with self._lock:
+            return [cell for cell, entry in self._cells.items() if entry[2] >= cutoff]
+
+    def prune(self):
+        with self._lock:
+            return self._prune(self._clock())
+
+    def stats(self):
+        now = self._clock()
+        with self._lock:
+            lookups = self.hits + self.neighbour_hits + self.misses
+            return {
+                "cells": len(self._cells),
+                "fresh_cells": sum(1 for entry in self._cells.values() if now - entry[1] < self.max_age),
+                "cell_size_deg": self.cell_size,
+                "radius_km": self.radius_km,
+                "hits": self.hits,
+                "neighbour_hits": self.neighbour_hits,
+                "misses": self.misses,
+                "hit_ratio": round((self.hits + self.neighbour_hits) / lookups, 4) if lookups else 0.0
+            }
+
+    def __len__(self):
+        return len(self._cells)
+
+    # --- internals, caller must hold self._lock ---
+
+    def _prune(self, now):
+        idle = [cell for cell, entry in self._cells.items() if now - entry[2] > self.active_window]
+        for cell in idle:
+            del self._cells[cell]
+        # Still over capacity: drop the least recently used cells
+        overflow = len(self._cells) - self.maxsize
+        if overflow > 0:
+            for cell in sorted(self._cells, key=lambda c: self._cells[c][2])[:overflow]:
+                del self._cells[cell]
+            return len(idle) + overflow
+        return len(idle)
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
@@ -0,0 +1,254 @@
+import json
+import os
+import random
+import socket
+import sqlite3
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class WeatherSnapshot:
+    """
+    Weather readings shared by every worker process through a SQLite file (WAL mode:
+    readers never block the writer). Rows are keyed by WeatherService cache keys and stamped
+    with wall-clock fetch times, so any process can judge their age.
+    Also holds the prefetch lease that elects a single fetching process.
+    """
+
+    def __init__(self, path, max_age=600):
+        self.path = path
+        self.max_age = max_age
+        self._local = threading.local()
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("CREATE TABLE IF NOT EXISTS weather (key TEXT PRIMARY KEY, payload TEXT NOT NULL, fetched_at REAL NOT NULL)")
+                conn.execute("CREATE TABLE IF NOT EXISTS lease (id INTEGER PRIMARY KEY CHECK (id = 1), owner TEXT, expires_at REAL)")
+                conn.execute("INSERT OR IGNORE INTO lease VALUES (1, '', 0)")
+        finally:
+            conn.close()
+
+    def get(self, key):
+        """
+        Returns (weather, age_seconds) for a fresh entry, or None.
+        """
+        row = self._connection().execute(
+            "SELECT payload, fetched_at FROM weather WHERE key = ?", (_encode_key(key),)).fetchone()
+        if row is None:
+            return None
+        age = max(0.0, time.time() - row[1])
+        if age >= self.max_age:
+            return None
+        return json.loads(row[0]), age
+
+    def put_many(self, readings):
+        """
+        readings: iterable of (key, weather), written in one transaction.
+        """
+        now = time.time()
+        with self._connection() as conn:
+            conn.executemany("INSERT OR REPLACE INTO weather VALUES (?, ?, ?)",
+                             [(_encode_key(key), json.dumps(weather), now) for key, weather in readings])
+
+    def acquire_lease(self, owner, ttl):
+        """
+        Takes or renews the prefetch lease; only one process holds it until it expires.
+        """
+        now = time.time()
+        with self._connection() as conn:
+            cursor = conn.execute(
+                "UPDATE lease SET owner = ?, expires_at = ? WHERE id = 1 AND (owner = ? OR expires_at < ?)",
+                (owner, now + ttl, owner, now))
+        return cursor.rowcount == 1
+
+    def release_lease(self, owner):
+        with self._connection() as conn:
+            conn.execute("UPDATE lease SET expires_at = 0 WHERE id = 1 AND owner = ?", (owner,))
+
+    def stats(self):
+        cutoff = time.time() - self.max_age
+        total, fresh = self._connection().execute(
+            "SELECT COUNT(*), COALESCE(SUM(fetched_at > ?), 0) FROM weather", (cutoff,)).fetchone()
+        return {"path": self.path, "entries": total, "fresh_entries": fresh, "max_age_s": self.max_age}
+
+    def _connection(self):
+        # One connection per thread and process: sqlite3 connections must not cross either
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = self._local.conn = self._connect()
+            self._local.pid = os.getpid()
+        return conn
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=5)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+
+class WeatherPrefetcher:
+    """
+    Keeps the snapshot warm for a registry of crew locations (cities and coordinates), so
+    requests for them never wait on OpenWeatherMap.
+    Every worker may run a prefetcher thread, but only the holder of the snapshot lease fetches;
+    the others just read. Each location is refreshed every `interval` seconds by a bounded
+    worker pool; failures are retried with jittered exponential backoff capped at max_backoff.
+    """
+
+    def __init__(self, weather_service, locations_path=None, snapshot_path=None, interval=None,
+                 workers=None, retry_base=None, max_backoff=None):
+        self.weather_service = weather_service
+        self.locations_path = locations_path or os.getenv("WEATHER_PREFETCH_LOCATIONS")
+        self.interval = interval or float(os.getenv("WEATHER_PREFETCH_INTERVAL", "300"))
+        self.workers = workers or int(os.getenv("WEATHER_PREFETCH_WORKERS", "8"))
+        self.retry_base = retry_base or float(os.getenv("WEATHER_PREFETCH_RETRY", "15"))
+        self.max_backoff = max_backoff or float(os.getenv("WEATHER_PREFETCH_MAX_BACKOFF", "1800"))
+        self.snapshot = WeatherSnapshot(
+            snapshot_path or os.getenv("WEATHER_SNAPSHOT_PATH",
+                                       os.path.join(tempfile.gettempdir(), "heatshield_weather.sqlite")),
+            max_age=weather_service.cache.ttl
+        )
+
+        self.locations = {} # cache key -> location dict as registered
+        self._next_due = {} # cache key -> wall time of the next attempt
+        self._failures = {} # cache key -> consecutive failures
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._pid = None
+        self.owner = None
+        self.is_leader = False
+        self.last_cycle = None
+        if self.locations_path:
+            self.load_locations(self.locations_path)
+
+    def load_locations(self, path):
+        """
+        JSON list of {"city": "Delhi"} and/or {"lat": 28.61, "lon": 77.21} entries.
+        """
+        with open(path) as f:
+            for entry in json.load(f):
+                self.register(entry.get("city"), entry.get("lat"), entry.get("lon"))
+
+    def register(self, location=None, lat=None, lon=None):
+        # Locations resolving to the same cache key (same city / grid cell) are fetched once
+        key = self.weather_service._cache_key(location, lat, lon)
+        with self._lock:
+            if key not in self.locations:
+                self.locations[key] = {"city": location, "lat": lat, "lon": lon}
+                self._next_due[key] = 0
+        return key
+
+    def ensure_running(self):
+        """
+        Starts the scheduler thread once per process (threads do not survive gunicorn's fork).
+        """
+        if self._pid == os.getpid() or not self.weather_service.api_key:
+            return
+        self._pid = os.getpid()
+        self.owner = f"{socket.gethostname()}:{self._pid}"
+        self._stop.clear()
+        threading.Thread(target=self._run, name="weather-prefetch", daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+        if self.is_leader:
+            self.snapshot.release_lease(self.owner)
+            self.is_leader = False
+
+    def run_once(self):
+        """
+        Fetches every location that is due and writes the results to the snapshot.
+        Returns the cycle report.
+        """
+        start = time.perf_counter()
+        now = time.time()
+        with self._lock:
+            due = [key for key, at in self._next_due.items() if at <= now]
+
+        def fetch(key):
+            try:
+                return key, self.weather_service._fetch_weather(key)
+            except Exception as e:
+                print(f"Weather prefetch failed for {key[1:]}: {e}")
+                return key, None
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            results = list(pool.map(fetch, due))
+
+        fetched = [(key, weather) for key, weather in results if weather is not None]
+        if fetched:
+            self.snapshot.put_many(fetched)
+        now = time.time()
+        with self._lock:
+            for key, weather in results:
+                if weather is not None:
+                    self._failures.pop(key, None)
+                    self._next_due[key] = now + self.interval
+                else:
+                    failures = self._failures[key] = self._failures.get(key, 0) + 1
+                    self._next_due[key] = now + self._backoff(failures)
+
+        self.last_cycle = {
+            "due": len(due),
+            "fetched": len(fetched),
+            "failed": len(due) - len(fetched),
+            "duration_s": round(time.perf_counter() - start, 3)
+        }
+        return self.last_cycle
+
+    def stats(self):
+        with self._lock:
+            backing_off = len(self._failures)
+        return {
+            "locations": len(self.locations),
+            "interval_s": self.interval,
+            "leader": self.is_leader,
+            "backing_off": backing_off,
+            "last_cycle": self.last_cycle,
+            "snapshot": self.snapshot.stats()
+        }
+
+    def _backoff(self, failures):
+        # Equal jitter: half the exponential delay fixed, half random, so workers never retry in lockstep
+        delay = min(self.max_backoff, self.retry_base * 2 ** (failures - 1))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.is_leader = self.snapshot.acquire_lease(self.owner, ttl=self.interval * 3)
+                if self.is_leader:
+                    self.run_once()
+            except Exception as e:
+                print(f"Weather prefetch error: {e}")
+            with self._lock:
+                next_due = min(self._next_due.values(), default=time.time() + self.interval)
+            # Followers poll for the lease once per interval; the leader wakes for its next due location
+            wait = next_due - time.time() if self.is_leader else self.interval
+            self._stop.wait(min(self.interval, max(1.0, wait)))
+
+
+def _encode_key(key):
+    return json.dumps(list(key))
+
+
+if __name__ == "__main__":
+    # One-off warm-up of the snapshot, e.g. from cron or before starting the server:
+    #   python backend/services/weather_prefetcher.py --locations sites.json
+    import argparse
+
+    from weather_service import WeatherService
+
+    parser = argparse.ArgumentParser(description="Fetch weather for registered locations into the shared snapshot.")
+    parser.add_argument("--locations", required=True, help="JSON list of {city} / {lat, lon} entries")
+    parser.add_argument("--snapshot", default=None, help="SQLite snapshot path (default: WEATHER_SNAPSHOT_PATH)")
+    args = parser.parse_args()
+
+    service = WeatherService()
+    if not service.api_key:
+        raise SystemExit("OPENWEATHER_API_KEY is not set")
+    prefetcher = WeatherPrefetcher(service, locations_path=args.locations, snapshot_path=args.snapshot)
+    print(prefetcher.run_once())
+    print(prefetcher.snapshot.stats())
@@ -1,53 +1,340 @@
 
 import requests
+from requests.adapters import HTTPAdapter
+from datetime import datetime, timedelta, timezone
+import math
 import os
 import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from cache import TTLCache
+from metrics import WEATHER_SECONDS
+from weather_grid import WeatherGrid
 
 class WeatherService:
-    def __init__(self, api_key=None):
+    def __init__(self, api_key=None, cache_ttl=None, cache_size=None, grid_size=None):
         self.api_key = api_key or os.getenv("OPENWEATHER_API_KEY")
-        self.base_url = "https://api.openweathermap.org/data/2.5/weather"
+        self.base_url = os.getenv("OPENWEATHER_BASE_URL", "https://api.openweathermap.org/data/2.5/weather")
+        self.forecast_url = os.getenv("OPENWEATHER_FORECAST_URL", self.base_url.rsplit("/", 1)[0] + "/forecast")
+        self.timeout = float(os.getenv("WEATHER_TIMEOUT", "5"))
+
+        # Without the spatial index, coordinates are snapped to this grid (degrees) so nearby sites share a cache entry
+        self.grid_size = grid_size or float(os.getenv("WEATHER_CACHE_GRID", "0.01"))
+        self.cache = TTLCache(
+            maxsize=cache_size or int(os.getenv("WEATHER_CACHE_SIZE", "1024")),
+            ttl=cache_ttl or float(os.getenv("WEATHER_CACHE_TTL", "600"))
+        )
+
+        # Spatial index for coordinate lookups: sites share the reading of the nearest fresh
+        # grid cell within WEATHER_GRID_RADIUS_KM. Replaces the fine WEATHER_CACHE_GRID snapping.
+        self.grid = None
+        if os.getenv("WEATHER_GRID_ENABLED", "true").lower() == "true":
+            self.grid = WeatherGrid(
+                cell_size=float(os.getenv("WEATHER_GRID_CELL", "0.05")),
+                radius_km=float(os.getenv("WEATHER_GRID_RADIUS_KM", "10")),
+                max_age=self.cache.ttl,
+                active_window=float(os.getenv("WEATHER_GRID_ACTIVE_WINDOW", "3600")),
+                maxsize=self.cache.maxsize
+            )
+        self.refresh_interval = float(os.getenv("WEATHER_GRID_REFRESH_INTERVAL", "0"))
+        self.refresh_workers = int(os.getenv("WEATHER_GRID_REFRESH_WORKERS", "8"))
+        self._refresher_pid = None
+        self.last_refresh = None
+
+        # Shared snapshot kept warm by a WeatherPrefetcher (see app.py), read before going upstream
+        self.snapshot = None
+
+        # Pooled keep-alive connections instead of a fresh TCP/TLS handshake per call
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=32)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
 
     def get_weather(self, location=None, lat=None, lon=None):
         """
         Fetches weather data. Prioritizes (lat, lon) if provided.
         Fallback to 'location' string if coords are missing.
+        Live results are cached per city / grid cell; concurrent misses share one upstream call.
         """
+        start = time.perf_counter()
         if not self.api_key:
-            return self._get_mock_weather(location, lat, lon)
+            weather = self._get_mock_weather(location, lat, lon)
+            WEATHER_SECONDS.observe(time.perf_counter() - start, source="mock_data", cache="disabled")
+            return weather
         
         try:
-            params = {
-                "appid": self.api_key,
-                "units": "metric"
-            }
-            
-            if lat and lon:
-                params["lat"] = lat
-                params["lon"] = lon
-            elif location:
-                params["q"] = location
+            if self.grid is not None and lat and lon:
+                self._ensure_refresher()
+                weather = self.grid.nearest(lat, lon)
+                if weather is not None:
+                    WEATHER_SECONDS.observe(time.perf_counter() - start, source=weather["source"], cache="grid")
+                    return dict(weather)
+
+            key = self._cache_key(location, lat, lon)
+            weather, outcome = self._lookup(key)
+            WEATHER_SECONDS.observe(time.perf_counter() - start, source=weather["source"], cache=outcome)
+            return weather if outcome == "snapshot" else dict(weather)
+        except Exception as e:
+            print(f"Weather API Error: {e}")
+            weather = self._get_mock_weather(location, lat, lon)
+            WEATHER_SECONDS.observe(time.perf_counter() - start, source="mock_data", cache="error")
+            return weather
+
+    def get_weather_many(self, points, max_fetches=None):
+        """
+        Weather for many (lat, lon) points, e.g. the cells of a risk map, aligned with points.
+        Points sharing a cache key (grid cell) share one reading. A cell with its own cached
+        reading uses it; of the cold cells, at most max_fetches (spread evenly over them, at
+        least one if nothing is cached) are fetched upstream in parallel, and every other cold
+        cell takes the reading of the nearest cell resolved this way. The result only depends
+        on the points and on what was cached beforehand, never on the order fetches complete in.
+        """
+        if not self.api_key:
+            # Mock data is seeded per exact point and uses the global random generator
+            return [self.get_weather(lat=lat, lon=lon) for lat, lon in points]
+
+        # (Points on the equator / prime meridian cannot be cached by coordinates, see _cache_key)
+        keys = [self._cache_key(None, lat, lon) if lat and lon else ("point", lat, lon) for lat, lon in points]
+        first = {}
+        for key, point in zip(keys, points):
+            first.setdefault(key, point)
+
+        readings, cold = {}, []
+        for key in first:
+            weather = self._cached(key)
+            if weather is None:
+                cold.append(key)
             else:
-                raise ValueError("Either location or (lat, lon) must be provided")
+                readings[key] = weather
 
-            response = requests.get(self.base_url, params=params, timeout=5)
-            response.raise_for_status()
-            data = response.json()
-            
-            # If using coords, get the city name derived by API
-            city_name = data.get("name", "Unknown Location")
-            
-            return {
-                "temperature": data["main"]["temp"],
-                "humidity": data["main"]["humidity"],
-                "wind_speed": data["wind"]["speed"],
-                "condition": data["weather"][0]["main"],
-                "location_name": city_name,
-                "source": "live_api"
-            }
+        fetch = cold
+        if max_fetches is not None:
+            max_fetches = max(max_fetches, 0 if readings else 1)
+            if len(cold) > max_fetches:
+                fetch = [cold[i] for i in np.unique(np.linspace(0, len(cold) - 1, max_fetches).round().astype(int))]
+        with ThreadPoolExecutor(max_workers=self.refresh_workers) as pool:
+            readings.update(zip(fetch, pool.map(lambda key: self._fetch_cell(key, first[key]), fetch)))
+
+        filled = [key for key in cold if key not in readings]
+        if filled:
+            known = list(readings)
+            known_lats = np.array([float(first[key][0]) for key in known])
+            known_lons = np.array([float(first[key][1]) for key in known])
+            for key in filled:
+                lat, lon = float(first[key][0]), float(first[key][1])
+                # Equirectangular distance; ties go to the earliest cell
+                distance = (known_lats - lat) ** 2 + ((known_lons - lon) * math.cos(math.radians(lat))) ** 2
+                readings[key] = readings[known[int(np.argmin(distance))]]
+        return [readings[key] for key in keys]
+
+    def get_hourly_forecast(self, location=None, lat=None, lon=None, start=None, hours=24):
+        """
+        Hourly temperature/humidity from start (an aware datetime, default: the next full hour, UTC).
+        OpenWeatherMap's free forecast is 3-hourly, so points are linearly interpolated to hours;
+        times past the end of the forecast repeat its last value.
+        Returns {"source", "location_name", "hours": [{"time", "temperature", "humidity"}, ...]}.
+        """
+        start = start or (datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0) + timedelta(hours=1))
+        times = [start + timedelta(hours=h) for h in range(hours)]
+
+        if not self.api_key:
+            return self._get_mock_forecast(location, lat, lon, times)
+
+        try:
+            key = self._cache_key(location, lat, lon)
+            forecast = self.cache.get_or_load(("forecast",) + key, lambda: self._fetch_forecast(key))
+        except Exception as e:
+            print(f"Weather Forecast API Error: {e}")
+            return self._get_mock_forecast(location, lat, lon, times)
+
+        stamps = [t.timestamp() for t in times]
+        temps = np.interp(stamps, forecast["timestamps"], forecast["temperature"])
+        hums = np.interp(stamps, forecast["timestamps"], forecast["humidity"])
+        return {
+            "source": "live_api",
+            "location_name": forecast["location_name"],
+            "hours": [
+                {"time": t.isoformat(), "temperature": round(float(temp), 1), "humidity": round(float(hum), 1)}
+                for t, temp, hum in zip(times, temps, hums)
+            ]
+        }
+
+    def refresh_grid(self):
+        """
+        Re-fetches every active grid cell in parallel (one upstream call per cell, however many
+        sites it serves) and drops cells that went idle. Failed cells keep their last reading.
+        """
+        if self.grid is None or not self.api_key:
+            return None
+        start = time.perf_counter()
+        self.grid.prune()
+        cells = self.grid.active_cells()
+
+        def refresh(cell):
+            key = ("coords",) + self.grid.centre_of(cell)
+            try:
+                weather = self._fetch_weather(key)
+            except Exception as e:
+                print(f"Weather grid refresh failed for {key[1:]}: {e}")
+                return False
+            self.cache.set(key, weather)
+            self.grid.store(cell, weather)
+            return True
+
+        with ThreadPoolExecutor(max_workers=self.refresh_workers) as pool:
+            refreshed = sum(pool.map(refresh, cells))
+        self.last_refresh = {
+            "cells": len(cells),
+            "refreshed": refreshed,
+            "failed": len(cells) - refreshed,
+            "duration_s": round(time.perf_counter() - start, 3)
+        }
+        return self.last_refresh
+
+    def cache_stats(self):
+        return self.cache.stats()
+
+    def grid_stats(self):
+        if self.grid is None:
+            return None
+        return dict(self.grid.stats(), refresh_interval_s=self.refresh_interval, last_refresh=self.last_refresh)
+
+    def _ensure_refresher(self):
+        # Started lazily in the serving process: threads from a preloaded gunicorn master do not survive fork
+        if self.refresh_interval <= 0 or self._refresher_pid == os.getpid():
+            return
+        self._refresher_pid = os.getpid()
+        threading.Thread(target=self._refresh_loop, name="weather-grid-refresh", daemon=True).start()
+
+    def _refresh_loop(self):
+        while True:
+            time.sleep(self.refresh_interval)
+            try:
+                self.refresh_grid()
+            except Exception as e:
+                print(f"Weather grid refresh error: {e}")
+
+    def _lookup(self, key):
+        """
+        (weather, outcome) for a cache key: the shared snapshot, else the cache, fetching on a miss.
+        """
+        if self.snapshot is not None:
+            cached = self.snapshot.get(key)
+            if cached is not None:
+                weather, age = cached
+                self._store_grid(key, weather, age)
+                return weather, "snapshot"
+
+        weather, outcome = self.cache.lookup(key, lambda: self._fetch_weather(key))
+        self._store_grid(key, weather)
+        return weather, outcome
+
+    def _cached(self, key):
+        """
+        The key's own reading from the grid, the snapshot or the cache, without going upstream; else None.
+        """
+        if key[0] != "coords":
+            return None
+        if self.grid is not None:
+            weather = self.grid.fresh(self.grid.cell_of(key[1], key[2]))
+            if weather is not None:
+                return weather
+        if self.snapshot is not None:
+            cached = self.snapshot.get(key)
+            if cached is not None:
+                weather, age = cached
+                self._store_grid(key, weather, age)
+                return weather
+        return self.cache.get(key)
+
+    def _fetch_cell(self, key, point):
+        if key[0] != "coords":
+            return self.get_weather(lat=point[0], lon=point[1])
+        start = time.perf_counter()
+        try:
+            weather, outcome = self._lookup(key)
         except Exception as e:
             print(f"Weather API Error: {e}")
-            return self._get_mock_weather(location, lat, lon)
+            WEATHER_SECONDS.observe(time.perf_counter() - start, source="mock_data", cache="error")
+            return self._get_mock_weather(None, point[0], point[1])
+        WEATHER_SECONDS.observe(time.perf_counter() - start, source=weather["source"], cache=outcome)
+        return weather
+
+    def _store_grid(self, key, weather, age=0.0):
+        if self.grid is not None and key[0] == "coords":
+            self.grid.store(self.grid.cell_of(key[1], key[2]), weather, age)
+
+    def _cache_key(self, location, lat, lon):
+        if lat and lon:
+            if self.grid is not None:
+                return ("coords",) + self.grid.centre_of(self.grid.cell_of(lat, lon))
+            grid = self.grid_size
+            return ("coords", round(round(float(lat) / grid) * grid, 6), round(round(float(lon) / grid) * grid, 6))
+        elif location:
+            return ("city", location.strip().lower())
+        raise ValueError("Either location or (lat, lon) must be provided")
+
+    def _fetch_weather(self, key):
+        response = self.session.get(self.base_url, params=self._request_params(key), timeout=self.timeout)
+        response.raise_for_status()
+        return self._parse_weather(response.json())
+
+    def _request_params(self, key):
+        params = {
+            "appid": self.api_key,
+            "units": "metric"
+        }
+        
+        if key[0] == "coords":
+            params["lat"] = key[1]
+            params["lon"] = key[2]
+        else:
+            params["q"] = key[1]
+        return params
+
+    def _parse_weather(self, data):
+        # If using coords, get the city name derived by API
+        city_name = data.get("name", "Unknown Location")
+        
+        return {
+            "temperature": data["main"]["temp"],
+            "humidity": data["main"]["humidity"],
+            "wind_speed": data["wind"]["speed"],
+            "condition": data["weather"][0]["main"],
+            "location_name": city_name,
+            "source": "live_api"
+        }
+
+    def _fetch_forecast(self, key):
+        response = self.session.get(self.forecast_url, params=self._request_params(key), timeout=self.timeout)
+        response.raise_for_status()
+        data = response.json()
+        points = data["list"]
+        return {
+            "timestamps": [p["dt"] for p in points],
+            "temperature": [p["main"]["temp"] for p in points],
+            "humidity": [p["main"]["humidity"] for p in points],
+            "location_name": data.get("city", {}).get("name", "Unknown Location")
+        }
+
+    def _get_mock_forecast(self, location, lat, lon, times):
+        """
+        Mock current weather with a diurnal cycle: warmest/driest mid-afternoon, coolest before dawn.
+        """
+        base = self._get_mock_weather(location, lat, lon)
+        hours = []
+        for t in times:
+            swing = math.sin(2 * math.pi * (t.hour - 9) / 24) # +1 at 15:00, -1 at 03:00
+            hours.append({
+                "time": t.isoformat(),
+                "temperature": round(base["temperature"] + 5 * swing, 1),
+                "humidity": round(min(100, max(10, base["humidity"] - 12 * swing)), 1)
+            })
+        return {"source": "mock_data", "location_name": base["location_name"], "hours": hours}
 
     def _get_mock_weather(self, location, lat, lon):
         """
@@ -0,0 +1,102 @@
+# Train/serve parity of the derived weather features (services/heat_features.py).
+# Run from the repo root:
+#   python -m unittest discover backend/tests
+import os
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+
+backend_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.append(os.path.join(backend_dir, 'services'))
+sys.path.append(os.path.join(backend_dir, 'ml_engine'))
+from heat_features import DERIVED_FEATURES, add_derived_features, dew_point, heat_index, wbgt
+from model_registry import ModelBundle
+
+
+def reference_heat_index(temp_c, humidity):
+    """
+    The scalar formula previously in dataset_generator.py / find_test_cases.py, verbatim.
+    """
+    T = (temp_c * 9/5) + 32
+    RH = humidity
+    HI = 0.5 * (T + 61.0 + ((T-68.0)*1.2) + (RH*0.094))
+    if HI >= 80:
+        HI = -42.379 + 2.04901523*T + 10.14333127*RH - .22475541*T*RH - .00683783*T*T - .05481717*RH*RH + .00122874*T*T*RH + .00085282*T*RH*RH - .00000199*T*T*RH*RH
+    return (HI - 32) * 5/9
+
+
+class RecordingModel:
+    """
+    Stands in for the sklearn Pipeline: records the frame the bundle passes to predict_proba.
+    """
+    classes_ = np.array(['extreme', 'high', 'low', 'moderate'], dtype=object)
+
+    def __init__(self, feature_names):
+        self.feature_names_in_ = np.array(feature_names, dtype=object)
+        self.seen = None
+
+    def predict_proba(self, X):
+        self.seen = X
+        return np.full((len(X), len(self.classes_)), 0.25)
+
+
+class HeatFeaturesTest(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        # Random points plus a regular grid that crosses the 80°F switch to the Rothfusz regression
+        self.temps = np.concatenate([rng.uniform(-20, 60, 20000), np.repeat(np.arange(-20, 60.5, 0.5), 101)])
+        self.hums = np.concatenate([rng.uniform(0, 100, 20000), np.tile(np.arange(0, 101.0), 161)])
+
+    def test_heat_index_matches_reference_formula(self):
+        expected = np.array([reference_heat_index(t, h) for t, h in zip(self.temps.tolist(), self.hums.tolist())])
+        np.testing.assert_allclose(heat_index(self.temps, self.hums), expected, rtol=0, atol=1e-9)
+        for t, h, e in zip(self.temps[:2000].tolist(), self.hums[:2000].tolist(), expected[:2000]):
+            self.assertAlmostEqual(heat_index(t, h), e, delta=1e-9)
+
+    def test_heat_index_broadcasts_scalar_humidity(self):
+        expected = [reference_heat_index(t, 55.0) for t in self.temps[:1000].tolist()]
+        np.testing.assert_allclose(heat_index(self.temps[:1000], 55.0), expected, rtol=0, atol=1e-9)
+
+    def test_array_and_scalar_paths_agree(self):
+        for fn in (heat_index, wbgt, dew_point):
+            values = fn(self.temps[:500], self.hums[:500])
+            scalars = [fn(t, h) for t, h in zip(self.temps[:500].tolist(), self.hums[:500].tolist())]
+            np.testing.assert_allclose(values, scalars, rtol=1e-12, atol=1e-12, err_msg=fn.__name__)
+
+    def test_serving_matches_training_features(self):
+        import pandas as pd
+        from train import FEATURES, load_dataset
+
+        # Training: the derived columns load_dataset adds to a CSV of raw readings
+        n = len(self.temps)
+        raw = {'temperature': np.round(self.temps, 1), 'humidity': np.round(self.hums, 1), 'exposure_hours': [4] * n,
+               'activity_level': ['moderate'] * n, 'hydration_level': ['moderate'] * n, 'age_group': ['26-35'] * n}
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'dataset.csv')
+            pd.DataFrame(dict(raw, risk_label=['low'] * n)).to_csv(path, index=False)
+            trained = load_dataset(path)
+
+        # Serving: ModelBundle.live_predict_proba adds them to the request columns
+        feature_columns = list(raw)
+        model = RecordingModel(FEATURES)
+        bundle = ModelBundle(model, "test", feature_columns)
+        self.assertEqual(bundle.derived_features, DERIVED_FEATURES)
+        bundle.live_predict_proba({col: list(values) for col, values in raw.items()})
+        # The ColumnTransformer selects by name, so only the set of columns matters
+        self.assertEqual(set(model.seen.columns), set(model.feature_names_in_))
+        for name in DERIVED_FEATURES:
+            # Agreement to float32 precision, not bit for bit
+            np.testing.assert_allclose(model.seen[name].to_numpy(), trained[name].to_numpy(), rtol=0, atol=1e-4, err_msg=name)
+
+    def test_add_derived_features_keeps_existing_columns(self):
+        columns = {'temperature': [35.0], 'humidity': [50.0], 'heat_index': [99.0]}
+        result = add_derived_features(columns)
+        self.assertEqual(result['heat_index'], [99.0])
+        self.assertAlmostEqual(float(result['wbgt'][0]), wbgt(35.0, 50.0))
+        self.assertNotIn('wbgt', columns)
+
+
+if __name__ == "__main__":
+    unittest.main()
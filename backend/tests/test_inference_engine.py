@@ -0,0 +1,112 @@
+# The compiled forest (services/inference_engine.py) against the sklearn Pipeline it was exported from.
+# Run from the repo root:
+#   python -m unittest discover backend/tests
+import os
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+
+backend_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.append(os.path.join(backend_dir, 'services'))
+sys.path.append(os.path.join(backend_dir, 'ml_engine'))
+from heat_features import add_derived_features
+from inference_engine import CompiledModel
+
+MODEL_DIR = os.path.join(backend_dir, 'ml_engine')
+ACTIVITIES = ['light', 'moderate', 'heavy', 'extreme']
+HYDRATIONS = ['well', 'moderate', 'poor']
+AGE_GROUPS = ['18-25', '26-35', '36-45', '46-55', '55+']
+
+
+def generated_samples(n, seed=0):
+    """
+    Request-shaped columns over (and a little beyond) the training ranges, with the derived
+    features the API adds. A few categories are unseen, as the API may receive.
+    """
+    rng = np.random.default_rng(seed)
+    columns = {
+        'temperature': rng.uniform(15, 55, n).round(1),
+        'humidity': rng.uniform(5, 100, n).round(1),
+        'exposure_hours': rng.integers(1, 13, n).astype(np.float64),
+        'activity_level': rng.choice(ACTIVITIES + ['unknown'], n).tolist(),
+        'hydration_level': rng.choice(HYDRATIONS, n).tolist(),
+        'age_group': rng.choice(AGE_GROUPS + ['60+'], n).tolist()
+    }
+    return add_derived_features(columns)
+
+
+def threshold_samples(clf, columns):
+    """
+    Rows whose numeric values sit exactly on the forest's split thresholds (mapped back
+    through the scaler), where float32 rounding differences would show up first.
+    """
+    scaler = clf.named_steps['preprocessor'].transformers_[0][1]
+    numerical = clf.named_steps['preprocessor'].transformers_[0][2]
+    rows = {col: np.array(values[:len(numerical) * 200], dtype=object) for col, values in columns.items()}
+    for i, col in enumerate(numerical):
+        thresholds = np.unique(np.concatenate([
+            est.tree_.threshold[est.tree_.feature == i] for est in clf.named_steps['classifier'].estimators_]))
+        picked = np.resize(thresholds * scaler.scale_[i] + scaler.mean_[i], 200)
+        rows[col] = rows[col].copy()
+        rows[col][i * 200:(i + 1) * 200] = picked
+    return {col: values.tolist() for col, values in rows.items()}
+
+
+def has_sklearn():
+    try:
+        import joblib, pandas, sklearn # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+@unittest.skipUnless(has_sklearn(), "needs the training dependencies (requirements.txt)")
+class CompiledModelTest(unittest.TestCase):
+    def assert_matches(self, clf, compiled, columns):
+        import pandas as pd
+        X = pd.DataFrame(columns)[list(clf.feature_names_in_)]
+        X = X.astype({col: np.float64 for col in compiled.numerical_features})
+        expected = clf.predict_proba(X)
+        actual = compiled.predict_proba({col: X[col].tolist() for col in X.columns})
+        self.assertEqual([str(c) for c in clf.classes_], list(compiled.classes_))
+        np.testing.assert_allclose(actual, expected, rtol=0, atol=1e-9)
+        np.testing.assert_array_equal(compiled.predict(columns), clf.classes_[np.argmax(expected, axis=1)])
+
+    @unittest.skipUnless(os.path.exists(os.path.join(MODEL_DIR, 'model.pkl'))
+                         and os.path.exists(os.path.join(MODEL_DIR, 'model_compiled', CompiledModel.META_FILE)),
+                         "no trained model in ml_engine/ (run ml_engine/train.py)")
+    def test_shipped_model_matches_sklearn(self):
+        import joblib
+        clf = joblib.load(os.path.join(MODEL_DIR, 'model.pkl'))
+        compiled = CompiledModel.load(os.path.join(MODEL_DIR, 'model_compiled'))
+        self.assertEqual(compiled.meta["n_trees"], len(clf.named_steps['classifier'].estimators_))
+        columns = generated_samples(20000)
+        self.assert_matches(clf, compiled, columns)
+        self.assert_matches(clf, compiled, threshold_samples(clf, columns))
+
+    def test_export_round_trip(self):
+        import pandas as pd
+        from compile_model import export_compiled_model
+        from train import FEATURES, build_pipeline
+
+        columns = generated_samples(3000, seed=1)
+        X = pd.DataFrame(columns)[FEATURES]
+        y = np.where(X['heat_index'] > 40, 'extreme', np.where(X['heat_index'] > 32, 'high',
+                     np.where(X['exposure_hours'] > 6, 'moderate', 'low')))
+        clf = build_pipeline('rf', n_jobs=1, n_estimators=15, max_depth=10).fit(X, y)
+
+        with tempfile.TemporaryDirectory() as directory:
+            compiled = export_compiled_model(clf, directory)
+            test_columns = generated_samples(5000, seed=2)
+            self.assert_matches(clf, compiled, test_columns)
+            self.assert_matches(clf, compiled, threshold_samples(clf, test_columns))
+            # Memory-mapped and in-memory loads agree
+            np.testing.assert_array_equal(CompiledModel.load(directory, mmap=False).predict_proba(test_columns),
+                                          compiled.predict_proba(test_columns))
+            del compiled
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,160 @@
+# The compiled RecommendationEngine (services/recommendation_engine.py) against the rule file.
+# Run from the repo root:
+#   python -m unittest discover backend/tests
+import itertools
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+backend_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.append(os.path.join(backend_dir, 'services'))
+from recommendation_engine import COMPARISONS, RULES_PATH, RecommendationEngine
+
+RISKS = ['low', 'moderate', 'high', 'extreme']
+ACTIVITIES = ['light', 'moderate', 'heavy', 'extreme', None, 'unknown']
+HYDRATIONS = ['well', 'moderate', 'poor', None]
+AGE_GROUPS = ['18-25', '26-35', '36-45', '46-55', '55+', None]
+TEMPERATURES = [20.0, 35.0, 35.01, 42.0]
+
+
+def reference_recommendations(spec, risk_label, inputs, weather):
+    """
+    The rule file read literally: per group, the first rule whose conditions all hold.
+    """
+    recs = []
+    for group in spec["groups"]:
+        for rule in group["rules"]:
+            matched = True
+            for field, condition in rule.get("when", {}).items():
+                if isinstance(condition, dict):
+                    matched = all(COMPARISONS[op](weather[field], threshold) for op, threshold in condition.items())
+                else:
+                    matched = (risk_label if field == "risk" else inputs.get(field)) in condition
+                if not matched:
+                    break
+            if matched:
+                recs.append({"title": rule["title"], "explanation": rule["explanation"], "urgency": rule["urgency"]})
+                break
+    return recs
+
+
+def request(activity, hydration, age, **extra):
+    inputs = dict(extra, exposureDuration=4)
+    for field, value in (("activityLevel", activity), ("hydrationLevel", hydration), ("ageGroup", age)):
+        if value is not None:
+            inputs[field] = value
+    return inputs
+
+
+def titles(recs):
+    return [rec["title"] for rec in recs]
+
+
+class RecommendationEngineTest(unittest.TestCase):
+    def setUp(self):
+        with open(RULES_PATH) as f:
+            self.spec = json.load(f)
+        self.engine = RecommendationEngine(RULES_PATH)
+
+    def test_matches_rule_file(self):
+        cases = list(itertools.product(RISKS, ACTIVITIES, HYDRATIONS, AGE_GROUPS, TEMPERATURES))
+        risks, inputs_list, weathers = [], [], []
+        for risk, activity, hydration, age, temperature in cases:
+            inputs = request(activity, hydration, age)
+            weather = {"temperature": temperature, "humidity": 50.0}
+            expected = reference_recommendations(self.spec, risk, inputs, weather)
+            self.assertEqual(self.engine.generate_recommendations(risk, inputs, weather), expected,
+                             msg=(risk, inputs, weather))
+            risks.append(risk)
+            inputs_list.append(inputs)
+            weathers.append(weather)
+        batch = self.engine.generate_batch(risks, inputs_list, weathers)
+        self.assertEqual(batch, [reference_recommendations(self.spec, *case) for case in zip(risks, inputs_list, weathers)])
+
+    def test_camel_case_inputs_fire_rules(self):
+        # The request fields the API receives (activityLevel, hydrationLevel, ageGroup)
+        weather = {"temperature": 30.0, "humidity": 50.0}
+        recs = titles(self.engine.generate_recommendations("high", request('heavy', 'poor', '55+'), weather))
+        self.assertEqual(recs, ["Mandatory Rest Breaks", "Critical Hydration Needed", "Reduce Physical Exertion",
+                                "High Vulnerability Alert"])
+        recs = titles(self.engine.generate_recommendations("low", request('extreme', 'well', '46-55'), weather))
+        self.assertEqual(recs, ["Safe to Work"])
+
+    def test_snake_case_inputs_do_not_match(self):
+        inputs = {"activity_level": "heavy", "hydration_level": "poor", "age_group": "55+"}
+        recs = titles(self.engine.generate_recommendations("high", inputs, {"temperature": 36.0, "humidity": 50.0}))
+        self.assertEqual(recs, ["Mandatory Rest Breaks", "Increase Water Intake"])
+
+    def test_hydration_falls_back_to_temperature_rule(self):
+        inputs = request('light', 'moderate', '26-35')
+        self.assertEqual(titles(self.engine.generate_recommendations("low", inputs, {"temperature": 35.0})),
+                         ["Safe to Work"])
+        self.assertEqual(titles(self.engine.generate_recommendations("low", inputs, {"temperature": 35.01})),
+                         ["Safe to Work", "Increase Water Intake"])
+
+    def test_input_key(self):
+        key = self.engine.input_key(request('heavy', 'poor', '55+'))
+        # Fields no rule reads, and values no rule mentions, do not change the key
+        self.assertEqual(self.engine.input_key(request('heavy', 'poor', '55+', city="Delhi", exposureDuration=9)), key)
+        self.assertEqual(self.engine.input_key(request('light', 'well', '18-25')),
+                         self.engine.input_key(request('unknown', 'moderate', '26-35')))
+        self.assertEqual(self.engine.input_key(request(['heavy'], 'poor', '55+')),
+                         self.engine.input_key(request('light', 'poor', '55+')))
+        self.assertNotEqual(self.engine.input_key(request('extreme', 'poor', '55+')), key)
+        self.assertNotEqual(self.engine.input_key(request('heavy', 'well', '55+')), key)
+        # Same rules, same keys: stable across instances (and so across workers)
+        self.assertEqual(RecommendationEngine(RULES_PATH).input_key(request('heavy', 'poor', '55+')), key)
+        hash(key)
+
+    def test_input_key_covers_recommendations(self):
+        # Inputs with the same key always get the same recommendations
+        by_key = {}
+        for risk, activity, hydration, age, temperature in itertools.product(
+                RISKS, ACTIVITIES, HYDRATIONS, AGE_GROUPS, TEMPERATURES):
+            inputs = request(activity, hydration, age)
+            weather = {"temperature": temperature}
+            key = (risk, self.engine.input_key(inputs), self.engine.weather_key(weather))
+            recs = self.engine.generate_recommendations(risk, inputs, weather)
+            self.assertEqual(by_key.setdefault(key, recs), recs, msg=(risk, inputs, weather))
+
+    def test_weather_key(self):
+        self.assertEqual(self.engine.weather_key({"temperature": 20.0}), self.engine.weather_key({"temperature": 35.0}))
+        self.assertNotEqual(self.engine.weather_key({"temperature": 35.0}),
+                            self.engine.weather_key({"temperature": 35.01}))
+
+    def test_recommendations_are_shared_and_read_only(self):
+        inputs = request('heavy', 'poor', '55+')
+        first = self.engine.generate_recommendations("extreme", inputs, {"temperature": 40.0})
+        second = self.engine.generate_recommendations("extreme", dict(inputs), {"temperature": 41.0})
+        self.assertIs(first[0], second[0])
+        with self.assertRaises(TypeError):
+            first[0]["title"] = "changed"
+        self.assertEqual(json.loads(json.dumps(first)), reference_recommendations(
+            self.spec, "extreme", inputs, {"temperature": 40.0}))
+
+    def test_custom_rule_file(self):
+        spec = {"groups": [
+            {"name": "site", "rules": [
+                {"when": {"ageGroup": ["55+"], "humidity": {"gte": 80}}, "title": "A", "explanation": "", "urgency": "high"},
+                {"when": {"temperature": {"gt": 30, "lte": 40}}, "title": "B", "explanation": "", "urgency": "low"},
+                {"when": {"risk": ["extreme"]}, "title": "C", "explanation": "", "urgency": "high"}
+            ]}
+        ]}
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "rules.json")
+            with open(path, 'w') as f:
+                json.dump(spec, f)
+            engine = RecommendationEngine(path)
+        self.assertEqual(engine.rule_count, 3)
+        for risk, age, temperature, humidity in itertools.product(
+                RISKS, AGE_GROUPS, [25.0, 30.0, 35.0, 40.0, 45.0], [50.0, 80.0, 95.0]):
+            inputs = request('light', 'well', age)
+            weather = {"temperature": temperature, "humidity": humidity}
+            self.assertEqual(engine.generate_recommendations(risk, inputs, weather),
+                             reference_recommendations(spec, risk, inputs, weather), msg=(risk, age, weather))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,4 +1,9 @@
+import os
 import random
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend', 'services'))
+from heat_features import heat_index
 
 def get_mock_weather(location):
     seed = sum(ord(c) for c in (location or "default"))
@@ -7,14 +12,7 @@ def get_mock_weather(location):
     temp = round(random.uniform(25, 42), 1)
     humidity = round(random.uniform(30, 80), 1)
     
-    # Simple Heat Index approx for finding cases (matching dataset_generator)
-    # T eq
-    T = (temp * 9/5) + 32
-    RH = humidity
-    HI = 0.5 * (T + 61.0 + ((T-68.0)*1.2) + (RH*0.094))
-    if HI >= 80:
-        HI = -42.379 + 2.04901523*T + 10.14333127*RH - .22475541*T*RH - .00683783*T*T - .05481717*RH*RH + .00122874*T*T*RH + .00085282*T*RH*RH - .00000199*T*T*RH*RH
-    hi_c = (HI - 32) * 5/9
+    hi_c = heat_index(temp, humidity)
     
     return temp, humidity, hi_c
 